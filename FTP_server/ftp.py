@@ -2,8 +2,12 @@ import psutil
 import socket
 import os
 from pyftpdlib.authorizers import DummyAuthorizer
-from pyftpdlib.handlers import FTPHandler
-from pyftpdlib.servers import FTPServer
+from pyftpdlib.handlers import FTPHandler, DTPHandler, ThrottledDTPHandler
+from pyftpdlib.servers import FTPServer, ThreadedFTPServer
+try:
+    from pyftpdlib.servers import MultiprocessFTPServer  # 仅 POSIX
+except ImportError:
+    MultiprocessFTPServer = None
 import argparse
 import multiprocessing
 import tkinter as tk
@@ -11,25 +15,294 @@ from tkinter import messagebox
 from tkinter import filedialog
 import sys
 import logging
+import signal
+import threading
+import time
 
-# 用于存储运行的进程
-running_processes = []
+# FTP 服务器进程监控
+supervisor = None
 # 标记 FTP 服务器状态
 ftp_running = False
 # 日志文件路径，使用绝对路径
 LOG_FILE = 'ftp_server.log'
 # 默认文件编码
 DEFAULT_ENCODING = 'utf-8'
+# 服务器统计项，子进程写入共享数组，主进程读取
+STAT_FIELDS = ('connections', 'total_connections', 'bytes_sent', 'bytes_received', 'files_sent', 'files_received',
+               'user_transfers', 'anonymous_transfers', 'rejected_transfers')
+# 当前值（而非累计值）的统计项，子进程意外退出后清零
+LIVE_STAT_FIELDS = ('connections', 'user_transfers', 'anonymous_transfers')
+# 子进程意外退出后的重启等待时间（秒），连续失败时加倍
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+# 运行不到 QUICK_FAILURE_TIME 秒就退出的计为快速失败，连续 MAX_QUICK_FAILURES 次后不再重启
+QUICK_FAILURE_TIME = 60
+MAX_QUICK_FAILURES = 5
+# 子进程因配置错误（共享目录、端口被占用、没有权限等）无法启动时的退出码，不重启
+EXIT_CONFIG_ERROR = 2
+# 停止时等待子进程关闭所有连接的时间（秒）
+STOP_TIMEOUT = 5.0
+# 命令行模式下输出运行状态的间隔（秒）
+HEALTH_INTERVAL = 60
+# 并发模式: async 单线程异步（可用 workers 预先启动多个进程），thread 每个连接一个线程，
+# process 每个连接一个进程（仅 POSIX）
+CONCURRENCY_MODES = {'async': FTPServer, 'thread': ThreadedFTPServer}
+if MultiprocessFTPServer is not None:
+    CONCURRENCY_MODES['process'] = MultiprocessFTPServer
+CONCURRENCY_LABELS = {'async': "单线程", 'thread': "多线程", 'process': "多进程"}
+# 默认连接数限制（0 表示不限制）
+MAX_CONS = 512
+MAX_CONS_PER_IP = 0
+# 高性能传输: 数据通道每次读写的字节数（sendfile 每次调用的长度）和套接字收发缓冲区大小
+PERFORMANCE_BUFFER_SIZE = 1024 * 1024
+PERFORMANCE_SOCKET_BUFFER = 4 * 1024 * 1024
+# 用户类别: 主用户和匿名用户分别限速、限制同时传输数
+USER_CLASSES = ('user', 'anonymous')
+# 限速时每个数据连接分到的最小带宽（字节/秒）
+MIN_TRANSFER_RATE = 1024
+# 主进程（监控）日志，不传给根日志记录器，避免与子进程的日志重复输出
+supervisor_logger = logging.getLogger('ftp.supervisor')
+
+
+def new_server_stats():
+    """创建进程间共享的统计数组"""
+    return multiprocessing.Array('q', len(STAT_FIELDS))
+
+
+def add_stat(stats, name, n=1):
+    if stats is not None:
+        with stats.get_lock():
+            stats[STAT_FIELDS.index(name)] += n
+
+
+def get_stat(stats, name):
+    return stats[STAT_FIELDS.index(name)] if stats is not None else 0
+
+
+class ServerStartError(Exception):
+    """FTP 服务器因配置错误无法启动，重启也不会成功"""
+
+
+def user_class(username):
+    """用户名所属的类别: 'anonymous' 或 'user'"""
+    return 'anonymous' if username == 'anonymous' else 'user'
+
+
+class StatsFTPHandler(FTPHandler):
+    """
+    记录连接数和传输字节数的 FTPHandler，stats 为 new_server_stats() 创建的共享数组
+
+    只有 RETR/STOR/APPE/STOU 计为传输: 检查上限和计数在 stats 的锁内一起完成，
+    数据通道关闭（传输完成或中止）、命令失败或断开连接时减去；
+    PASV/PORT 建立但未使用的数据连接和目录列表（LIST/NLST/MLSD）不计入。
+    """
+    stats = None
+    connect_pid = None  # 调用 on_connect 的进程；超过连接数限制被拒绝的连接不调用 on_connect
+    transfer_limits = {}  # 用户类别 -> 同时进行的传输数上限，0 表示不限制
+    transfer_class = None  # 本连接正在进行（或等待数据连接）的传输所计入的用户类别
+
+    def on_connect(self):
+        self.connect_pid = os.getpid()
+        add_stat(self.stats, 'connections')
+        add_stat(self.stats, 'total_connections')
+
+    def on_disconnect(self):
+        if self.connect_pid is None:
+            return
+        # 多进程模式下连接交给子进程处理，主进程关闭自己的副本时不计数
+        if (MultiprocessFTPServer is not None and isinstance(self.server, MultiprocessFTPServer)
+                and os.getpid() == self.connect_pid):
+            return
+        add_stat(self.stats, 'connections', -1)
+
+    def reserve_transfer(self):
+        """同一类别用户的传输数未达到上限时计入并返回 True，否则回复 450"""
+        name = user_class(self.username)
+        limit = self.transfer_limits.get(name, 0)
+        if self.stats is None:
+            self.transfer_class = name
+            return True
+        index = STAT_FIELDS.index(f'{name}_transfers')
+        with self.stats.get_lock():
+            if limit and self.stats[index] >= limit:
+                self.stats[STAT_FIELDS.index('rejected_transfers')] += 1
+                allowed = False
+            else:
+                self.stats[index] += 1
+                allowed = True
+        if not allowed:
+            self.respond(f"450 Too many concurrent transfers ({limit}), try again later.")
+            return False
+        self.transfer_class = name
+        return True
+
+    def release_transfer(self):
+        """本连接的传输结束，可重复调用"""
+        name, self.transfer_class = self.transfer_class, None
+        if name is not None:
+            add_stat(self.stats, f'{name}_transfers', -1)
+
+    def _transfer(self, command, *args):
+        """计入传输后执行命令，命令失败（未开始传输）时立即减去"""
+        if not self.reserve_transfer():
+            return None
+        try:
+            result = command(*args)
+        except Exception:
+            self.release_transfer()
+            raise
+        if result is None:
+            self.release_transfer()
+        return result
+
+    def ftp_RETR(self, file):
+        return self._transfer(super().ftp_RETR, file)
+
+    def ftp_STOR(self, file, mode='w'):
+        # APPE 也经过这里
+        return self._transfer(super().ftp_STOR, file, mode)
+
+    def ftp_STOU(self, line):
+        return self._transfer(super().ftp_STOU, line)
+
+    def ftp_ABOR(self, line):
+        super().ftp_ABOR(line)
+        # 传输已中止且没有排队等待数据连接的传输
+        if self.data_channel is None and self._out_dtp_queue is None and self._in_dtp_queue is None:
+            self.release_transfer()
+
+    def flush_account(self):
+        super().flush_account()
+        # REIN/USER 清空了排队的传输；正在进行的传输在数据通道关闭时减去
+        if self.data_channel is None:
+            self.release_transfer()
+
+    def _on_dtp_close(self):
+        self.release_transfer()
+        super()._on_dtp_close()
+
+    def close(self):
+        # 传输排队中（数据连接未建立）时断开
+        self.release_transfer()
+        super().close()
+
+    def log_transfer(self, cmd, filename, receive, completed, elapsed, bytes):
+        # 与 pyftpdlib 的格式相同，另外记录本次传输的速率
+        rate = bytes / elapsed / 1048576 if elapsed > 0 else 0.0
+        self.log(f"{cmd} {filename} completed={int(completed)} bytes={bytes} seconds={elapsed:.3f} "
+                 f"rate={rate:.1f}MB/s")
+        add_stat(self.stats, 'bytes_received' if receive else 'bytes_sent', bytes)
+        if completed:
+            add_stat(self.stats, 'files_received' if receive else 'files_sent')
+
+
+class PerformanceDTPHandler(DTPHandler):
+    """
+    高性能数据通道: 每次读写（含 sendfile）1 MB，并增大套接字收发缓冲区
+
+    大文件传输时每次事件循环处理的数据最多为默认的16倍，瓶颈回到网络和磁盘。
+    """
+    ac_in_buffer_size = PERFORMANCE_BUFFER_SIZE
+    ac_out_buffer_size = PERFORMANCE_BUFFER_SIZE
+
+    def __init__(self, sock, cmd_channel):
+        for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, PERFORMANCE_SOCKET_BUFFER)
+            except OSError as e:
+                logging.debug(f"Failed to set data socket buffer: {e}")
+        super().__init__(sock, cmd_channel)
+
+
+class QuotaDTPHandler(ThrottledDTPHandler):
+    """
+    按用户类别限速的数据通道
+
+    limits 为 {用户类别: (下载, 上传)} 字节/秒，0 表示不限制；同一类别同时进行的
+    传输平分带宽（多进程模式下每个进程分别计算）。不限速的类别仍使用 sendfile。
+    数据通道开始传输文件（命令连接已计入传输）时才参与平分，目录列表不参与。
+    """
+    limits = {}
+    active = {name: set() for name in USER_CLASSES}
+    _lock = threading.Lock()
+
+    def __init__(self, sock, cmd_channel):
+        self.user_class = user_class(cmd_channel.username)
+        # ThrottledDTPHandler 按初始限速调整缓冲区大小，先按加入后的传输数设置
+        with self._lock:
+            self._set_limits(self, len(self.active[self.user_class]) + 1)
+        super().__init__(sock, cmd_channel)
+
+    def _set_limits(self, channel, count):
+        download, upload = self.limits.get(self.user_class, (0, 0))
+        channel.write_limit = max(download // count, MIN_TRANSFER_RATE) if download else 0
+        channel.read_limit = max(upload // count, MIN_TRANSFER_RATE) if upload else 0
+
+    def _rebalance(self):
+        """同类别的传输数变化后重新平分带宽（限速值在每次收发时读取，立即生效）"""
+        channels = self.active[self.user_class]
+        for channel in channels:
+            self._set_limits(channel, len(channels))
+
+    def _join(self):
+        """开始传输文件时加入同类别的带宽分配"""
+        if getattr(self.cmd_channel, 'transfer_class', None) is None:
+            return
+        with self._lock:
+            self.active[self.user_class].add(self)
+            self._rebalance()
+
+    def push_with_producer(self, producer):
+        self._join()
+        return super().push_with_producer(producer)
+
+    def enable_receiving(self, type, cmd):
+        self._join()
+        return super().enable_receiving(type, cmd)
+
+    def use_sendfile(self):
+        if self.read_limit or self.write_limit:
+            return False
+        return DTPHandler.use_sendfile(self)
+
+    def close(self):
+        with self._lock:
+            channels = self.active[getattr(self, 'user_class', 'user')]
+            if self in channels:
+                channels.discard(self)
+                self._rebalance()
+        super().close()
+
+
+class PerformanceQuotaDTPHandler(QuotaDTPHandler, PerformanceDTPHandler):
+    """高性能传输的限速数据通道"""
 
 
 def start_ftp_server(user, password, port, shared_dir, ip='0.0.0.0', allow_anonymous=False, anonymous_perm='r',
-                     passive_ports=(60000, 65535), encoding=DEFAULT_ENCODING):
+                     passive_ports=(60000, 65535), encoding=DEFAULT_ENCODING, stats=None, concurrency='async',
+                     workers=1, max_cons=MAX_CONS, max_cons_per_ip=MAX_CONS_PER_IP, performance=False,
+                     bandwidth=None, transfer_limits=None):
+    """
+    bandwidth 为 {用户类别: (下载, 上传)} 限速（字节/秒），transfer_limits 为
+    {用户类别: 同时传输数}，用户类别为 'user'（主用户）或 'anonymous'，0 表示不限制；
+    在子进程中运行，无法启动时抛出 ServerStartError，由主进程报告
+    """
+    # 配置日志记录到文件和命令行
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    logger = logging.getLogger()
+    logger.addHandler(file_handler)
+    logger.addHandler(stream_handler)
+    logger.setLevel(logging.INFO)
+
     try:
         os.chmod(shared_dir, 0o777)
     except Exception as e:
-        logging.error(f"Failed to set directory permissions: {e}")
-        messagebox.showerror("错误", f"设置共享目录权限失败: {e}")
-        return
+        raise ServerStartError(f"Failed to set directory permissions: {e}")
 
     authorizer = DummyAuthorizer()
     authorizer.add_user(user, password, shared_dir, perm="elradfmw")
@@ -37,57 +310,291 @@ def start_ftp_server(user, password, port, shared_dir, ip='0.0.0.0', allow_anony
     if allow_anonymous:
         authorizer.add_anonymous(shared_dir, perm=anonymous_perm)
 
-    handler = FTPHandler
+    handler = StatsFTPHandler
+    handler.stats = stats
     handler.authorizer = authorizer
     handler.passive_ports = range(passive_ports[0], passive_ports[1] + 1)
 
     # 设置文件编码
     handler.encoding = encoding
 
-    address = (ip, port)
-    server = FTPServer(address, handler)
+    # 高性能传输: 二进制模式下载用 sendfile 由内核直接发送文件（Windows 上没有 sendfile），
+    # 数据通道使用大缓冲区
+    if performance:
+        handler.use_sendfile = hasattr(os, 'sendfile')
+        handler.dtp_handler = PerformanceQuotaDTPHandler
+    else:
+        handler.dtp_handler = QuotaDTPHandler
 
-    # 配置日志记录到文件和命令行
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler = logging.FileHandler(LOG_FILE)
-    file_handler.setFormatter(formatter)
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setFormatter(formatter)
+    # 按用户类别限速和限制同时传输数
+    handler.dtp_handler.limits = dict(bandwidth or {})
+    handler.transfer_limits = dict(transfer_limits or {})
 
-    logger = logging.getLogger()
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-    logger.setLevel(logging.INFO)
+    if concurrency not in CONCURRENCY_MODES:
+        logging.warning(f"Concurrency mode '{concurrency}' is not available here, using 'thread'")
+        concurrency = 'thread'
+    address = (ip, port)
+    try:
+        server = CONCURRENCY_MODES[concurrency](address, handler)
+    except OSError as e:
+        # 端口被占用、没有权限绑定低端口等
+        raise ServerStartError(f"Failed to listen on {ip}:{port}: {e}")
+    server.max_cons = max_cons
+    server.max_cons_per_ip = max_cons_per_ip
 
     logger.info(f"Starting FTP server on {ip}:{port} sharing directory {shared_dir}")
     logger.info(f"Using file encoding: {encoding}")
+    logger.info(f"Concurrency: {concurrency}, workers: {workers if concurrency == 'async' else 1}, "
+                f"max connections: {max_cons or 'unlimited'}, per IP: {max_cons_per_ip or 'unlimited'}")
+    if performance:
+        logger.info(f"Performance profile: sendfile {'on' if handler.use_sendfile else 'unavailable'}, "
+                    f"buffer {PERFORMANCE_BUFFER_SIZE // 1024} KB, socket buffer {PERFORMANCE_SOCKET_BUFFER // 1024} KB")
+    for name in USER_CLASSES:
+        download, upload = handler.dtp_handler.limits.get(name, (0, 0))
+        transfers = handler.transfer_limits.get(name, 0)
+        if download or upload or transfers:
+            download = f"{download // 1024} KB/s" if download else 'unlimited'
+            upload = f"{upload // 1024} KB/s" if upload else 'unlimited'
+            logger.info(f"Limits for {name}: download {download}, upload {upload}, "
+                        f"transfers {transfers or 'unlimited'}")
     try:
-        server.serve_forever()
+        if concurrency == 'async':
+            # workers 不为1时预先启动多个进程共用监听端口（仅 POSIX，0 表示CPU核数）
+            server.serve_forever(worker_processes=workers)
+        else:
+            server.serve_forever()
     except Exception as e:
+        # 运行中出错，以非零退出码退出，由主进程重启
         logger.error(f"FTP server error: {e}")
-        messagebox.showerror("错误", f"FTP 服务器出错: {e}")
+        sys.exit(1)
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_supervised_server(server_args, server_options, stats, errors):
+    """
+    子进程入口：由主进程控制停止，收到 SIGTERM 时关闭所有连接后退出
+
+    POSIX 下子进程自成进程组，预先启动的工作进程和每个连接的进程都在组内，
+    主进程向整个进程组发送信号。子进程没有界面，无法启动时只记录日志，
+    把错误信息放入 errors 队列并以 EXIT_CONFIG_ERROR 退出，由主进程报告。
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    try:
+        start_ftp_server(*server_args, stats=stats, **server_options)
+    except ServerStartError as e:
+        logging.error(str(e))
+        errors.put(str(e))
+        sys.exit(EXIT_CONFIG_ERROR)
+
+
+def _signal_group(process, sig):
+    """向子进程所在的进程组发送信号（其他系统只结束子进程本身）"""
+    if hasattr(os, 'killpg') and process.pid:
+        try:
+            os.killpg(process.pid, sig)
+            return
+        except OSError:
+            pass
+    if sig == getattr(signal, 'SIGKILL', None):
+        process.kill()
+    else:
+        process.terminate()
+
+
+class FTPSupervisor:
+    """
+    FTP 服务器进程监控
+
+    在子进程中运行 start_ftp_server，监控线程阻塞等待子进程退出（不占用CPU），
+    子进程意外退出时等待 RESTART_DELAY 秒后重启，连续失败时等待时间加倍。
+    以下情况不再重启，state 变为 'stopped' 或 'failed'，error 为原因：
+    子进程正常退出（退出码 0）、配置错误（EXIT_CONFIG_ERROR）、
+    连续 MAX_QUICK_FAILURES 次运行不到 QUICK_FAILURE_TIME 秒就退出。
+    stop() 先发送 SIGTERM 让服务器关闭所有连接，STOP_TIMEOUT 秒后仍未退出则强制结束。
+    """
+
+    def __init__(self, server_args, server_options=None):
+        self.server_args = tuple(server_args)
+        self.server_options = dict(server_options or {})
+        self.stats = new_server_stats()
+        self.errors = multiprocessing.SimpleQueue()  # 子进程无法启动时的错误信息
+        self.process = None
+        self.restarts = 0
+        self.started = None
+        self.last_exit = None
+        self.state = 'stopped'  # 'running'、'stopped' 或 'failed'（不再重启）
+        self.error = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        """子进程运行中或等待重启"""
+        return self.state == 'running'
+
+    def start(self):
+        self.started = time.time()
+        self.state = 'running'
+        self.error = None
+        self._spawn()
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        with self._lock:
+            self._stopping.set()
+            process = self.process
+            if self.state == 'running':
+                self.state = 'stopped'
+        if process is not None and process.is_alive():
+            _signal_group(process, signal.SIGTERM)
+            process.join(timeout)
+            if process.is_alive():
+                supervisor_logger.warning("FTP server did not stop in time, killing it")
+                _signal_group(process, getattr(signal, 'SIGKILL', signal.SIGTERM))
+                process.join()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _spawn(self):
+        # 上一个进程退出时未断开的连接不再计入
+        with self.stats.get_lock():
+            self.stats[STAT_FIELDS.index('connections')] = 0
+        self.process = multiprocessing.Process(target=run_supervised_server,
+                                               args=(self.server_args, self.server_options, self.stats,
+                                                     self.errors))
+        self.process.start()
+
+    def _finish(self, state, error):
+        """不再重启"""
+        with self._lock:
+            if self._stopping.is_set():
+                return
+            self.state = state
+            self.error = error
+        if state == 'failed':
+            supervisor_logger.error(f"FTP server will not be restarted: {error}")
+        else:
+            supervisor_logger.info(f"FTP server stopped: {error}")
+
+    def _monitor(self):
+        delay = RESTART_DELAY
+        quick_failures = 0
+        while not self._stopping.is_set():
+            spawned = time.time()
+            self.process.join()
+            if self._stopping.is_set():
+                return
+            self.last_exit = self.process.exitcode
+            # 结束组内残留的工作进程，释放监听端口
+            if hasattr(signal, 'SIGKILL'):
+                _signal_group(self.process, signal.SIGKILL)
+            with self.stats.get_lock():
+                for name in LIVE_STAT_FIELDS:
+                    self.stats[STAT_FIELDS.index(name)] = 0
+
+            if self.last_exit == 0:
+                self._finish('stopped', "server process exited normally")
+                return
+            if self.last_exit == EXIT_CONFIG_ERROR:
+                error = self.errors.get() if not self.errors.empty() else "configuration error"
+                self._finish('failed', error)
+                return
+            # 运行超过 QUICK_FAILURE_TIME 秒后退出的视为偶发故障，重新从最短等待时间开始
+            if time.time() - spawned > QUICK_FAILURE_TIME:
+                delay = RESTART_DELAY
+                quick_failures = 0
+            quick_failures += 1
+            if quick_failures >= MAX_QUICK_FAILURES:
+                self._finish('failed', f"server process exited {quick_failures} times in a row within "
+                                       f"{QUICK_FAILURE_TIME} s (last exit code {self.last_exit})")
+                return
+            supervisor_logger.error(f"FTP server process exited unexpectedly (exit code {self.last_exit}), "
+                                    f"restarting in {delay:g} s")
+            if self._stopping.wait(delay):
+                return
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                self.restarts += 1
+                self._spawn()
+            supervisor_logger.info(f"FTP server restarted (pid {self.process.pid}, restart #{self.restarts})")
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    def health(self):
+        """运行状态: 状态、运行时间、进程号、重启次数、连接数和传输字节数"""
+        with self.stats.get_lock():
+            values = dict(zip(STAT_FIELDS, self.stats[:]))
+        values.update({
+            'state': self.state,
+            'error': self.error,
+            'alive': self.process is not None and self.process.is_alive(),
+            'pid': self.process.pid if self.process else None,
+            'uptime': time.time() - self.started if self.started else 0.0,
+            'restarts': self.restarts,
+            'last_exit': self.last_exit,
+        })
+        return values
+
+
+def format_health(health):
+    """运行状态的单行文字"""
+    uptime = int(health['uptime'])
+    if health['state'] != 'running':
+        state = f"{health['state']} ({health['error']})"
+    else:
+        state = 'running' if health['alive'] else 'restarting'
+    return (f"{state} pid={health['pid']} "
+            f"uptime={uptime // 3600}:{uptime // 60 % 60:02d}:{uptime % 60:02d} restarts={health['restarts']} "
+            f"connections={health['connections']} total={health['total_connections']} "
+            f"sent={health['bytes_sent'] / 1048576:.1f}MB ({health['files_sent']} files) "
+            f"received={health['bytes_received'] / 1048576:.1f}MB ({health['files_received']} files) "
+            f"transfers=user:{health['user_transfers']},anonymous:{health['anonymous_transfers']} "
+            f"rejected={health['rejected_transfers']}")
+
+
+def setup_supervisor_logging():
+    """监控日志写入同一个日志文件和命令行"""
+    if supervisor_logger.handlers:
+        return
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    supervisor_logger.addHandler(file_handler)
+    supervisor_logger.addHandler(stream_handler)
+    supervisor_logger.setLevel(logging.INFO)
+    supervisor_logger.propagate = False
 
 
 def start_all_ftp_servers(user, password, port, shared_dir, allow_anonymous, anonymous_perm, passive_ports, encoding,
-                          ui=True):
-    global running_processes, ftp_running
-    # 只在0.0.0.0地址启动一个FTP服务器
-    process = multiprocessing.Process(target=start_ftp_server, args=(
-        user, password, port, shared_dir, '0.0.0.0', allow_anonymous, anonymous_perm, passive_ports, encoding))
-    running_processes.append(process)
-    process.start()
+                          ui=True, **server_options):
+    """server_options 为 start_ftp_server 的其他参数（concurrency、workers、max_cons 等）"""
+    global supervisor, ftp_running
+    setup_supervisor_logging()
+    # 只在0.0.0.0地址启动一个FTP服务器，由监控线程在进程退出时重启
+    supervisor = FTPSupervisor((user, password, port, shared_dir, '0.0.0.0', allow_anonymous, anonymous_perm,
+                                passive_ports, encoding), server_options)
+    supervisor.start()
     ftp_running = True
     if ui:
         status_label.config(bg="green", text="FTP 服务器已启动")
 
 
 def stop_all_ftp_servers(ui=True):
-    global running_processes, ftp_running
-    for process in running_processes:
-        if process.is_alive():
-            process.terminate()
-            process.join()
-    running_processes = []
+    global supervisor, ftp_running
+    if supervisor is not None:
+        supervisor.stop()
+        supervisor = None
     ftp_running = False
     if ui:
         status_label.config(bg="red", text="FTP 服务器已停止")
@@ -116,11 +623,37 @@ def toggle_ftp_server(button):
         passive_ports = (60000, 65535)
         # 获取选择的文件编码
         encoding = encoding_var.get()
+        # 并发模式和连接数限制
+        concurrency = {label: mode for mode, label in CONCURRENCY_LABELS.items()}[concurrency_var.get()]
+        try:
+            workers = int(workers_entry.get())
+            max_cons = int(max_cons_entry.get())
+            max_cons_per_ip = int(max_cons_per_ip_entry.get())
+        except ValueError:
+            messagebox.showerror("错误", "工作进程数和连接数限制必须是整数。")
+            return
+        performance = performance_var.get()
+        # 限速（KB/s）和同时传输数
+        try:
+            bandwidth = {name: (int(entries[0].get()) * 1024, int(entries[1].get()) * 1024)
+                         for name, entries in limit_entries.items()}
+            transfer_limits = {name: int(entries[2].get()) for name, entries in limit_entries.items()}
+        except ValueError:
+            messagebox.showerror("错误", "限速和同时传输数必须是整数。")
+            return
         start_all_ftp_servers(user, password, port, shared_dir, allow_anonymous, anonymous_perm, passive_ports,
-                              encoding, True)
+                              encoding, True, concurrency=concurrency, workers=workers, max_cons=max_cons,
+                              max_cons_per_ip=max_cons_per_ip, performance=performance, bandwidth=bandwidth,
+                              transfer_limits=transfer_limits)
         button.config(text="停止 FTP 服务器")
 
 
+def on_close():
+    """关闭窗口时停止 FTP 服务器（子进程不是守护进程，且自成进程组，不会随窗口退出）"""
+    stop_all_ftp_servers(False)
+    root.destroy()
+
+
 def select_shared_directory():
     shared_dir = filedialog.askdirectory()
     if shared_dir:
@@ -129,6 +662,24 @@ def select_shared_directory():
 
 
 def update_log():
+    if ftp_running and supervisor is not None and not supervisor.running:
+        # 监控已放弃重启（配置错误、连续快速失败）或服务器自行退出
+        health = supervisor.health()
+        stop_all_ftp_servers(False)
+        toggle_button.config(text="启动 FTP 服务器")
+        if health['state'] == 'failed':
+            status_label.config(bg="red", text=f"FTP 服务器启动失败: {health['error']}")
+            messagebox.showerror("错误", f"FTP 服务器启动失败: {health['error']}")
+        else:
+            status_label.config(bg="red", text="FTP 服务器已停止")
+    elif ftp_running and supervisor is not None:
+        health = supervisor.health()
+        status_label.config(bg="green" if health['alive'] else "orange",
+                            text=f"FTP 服务器{'运行中' if health['alive'] else '正在重启'} | "
+                                 f"连接 {health['connections']} | 发送 {health['bytes_sent'] / 1048576:.1f} MB | "
+                                 f"接收 {health['bytes_received'] / 1048576:.1f} MB | "
+                                 f"传输 用户 {health['user_transfers']} 匿名 {health['anonymous_transfers']} "
+                                 f"拒绝 {health['rejected_transfers']} | 重启 {health['restarts']} 次")
     try:
         with open(LOG_FILE, 'r', encoding='utf-8') as f:
             log_content = f.read()
@@ -153,19 +704,62 @@ if __name__ == "__main__":
                         help='Permissions for anonymous users, "r" for read-only, "elradfmw" for read-write')
     parser.add_argument('-pp', nargs=2, type=int, default=[60000, 65535],
                         help='Passive port range for the FTP server, e.g., 60000 65535')
+    parser.add_argument('-ulimit', nargs=2, type=int, default=[0, 0], metavar=('DOWN', 'UP'),
+                        help='Bandwidth cap for the FTP user in KB/s, shared by its transfers (0 = unlimited)')
+    parser.add_argument('-anylimit', nargs=2, type=int, default=[0, 0], metavar=('DOWN', 'UP'),
+                        help='Bandwidth cap for anonymous users in KB/s, shared by their transfers (0 = unlimited)')
+    parser.add_argument('-utransfers', type=int, default=0,
+                        help='Maximum concurrent transfers for the FTP user (0 = unlimited)')
+    parser.add_argument('-anytransfers', type=int, default=0,
+                        help='Maximum concurrent transfers for anonymous users (0 = unlimited)')
     parser.add_argument('-cmd', action='store_true', help='Run in command-line mode without UI')
     parser.add_argument('-enc', default=DEFAULT_ENCODING, help='File encoding for FTP operations')
+    parser.add_argument('-mode', default='async', choices=list(CONCURRENCY_MODES),
+                        help='Concurrency: "async" single thread, "thread" one thread per connection, '
+                             '"process" one process per connection (POSIX only)')
+    parser.add_argument('-workers', type=int, default=1,
+                        help='Pre-forked worker processes for "async" mode, 0 = one per CPU core (POSIX only)')
+    parser.add_argument('-maxcons', type=int, default=MAX_CONS, help='Maximum simultaneous connections (0 = unlimited)')
+    parser.add_argument('-maxconsip', type=int, default=MAX_CONS_PER_IP,
+                        help='Maximum simultaneous connections per client IP (0 = unlimited)')
+    parser.add_argument('-perf', action='store_true',
+                        help='Performance profile: sendfile for downloads, large data buffers and socket buffers')
+    parser.add_argument('-health', type=float, default=HEALTH_INTERVAL,
+                        help='Seconds between health reports in command-line mode (0 = only on exit)')
 
     args = parser.parse_args()
 
     if args.cmd:
         # 命令行模式，不启动 UI，直接启动 FTP 服务器
-        start_all_ftp_servers(args.u, args.pw, args.p, args.dir, args.any, args.anyrw, tuple(args.pp), args.enc, False)
-        try:
-            while True:
-                pass
-        except KeyboardInterrupt:
-            stop_all_ftp_servers(False)
+        start_all_ftp_servers(args.u, args.pw, args.p, args.dir, args.any, args.anyrw, tuple(args.pp), args.enc, False,
+                              concurrency=args.mode, workers=args.workers, max_cons=args.maxcons,
+                              max_cons_per_ip=args.maxconsip, performance=args.perf,
+                              bandwidth={'user': (args.ulimit[0] * 1024, args.ulimit[1] * 1024),
+                                         'anonymous': (args.anylimit[0] * 1024, args.anylimit[1] * 1024)},
+                              transfer_limits={'user': args.utransfers, 'anonymous': args.anytransfers})
+
+        # 主进程只等待停止信号并定期报告状态，不占用CPU
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            stop_event.set()
+
+        for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), request_stop)
+        next_report = time.time() + args.health
+        # 分段等待，Windows 下也能及时响应 Ctrl+C
+        while not stop_event.wait(1.0):
+            if not supervisor.running:
+                break
+            if args.health > 0 and time.time() >= next_report:
+                next_report += args.health
+                supervisor_logger.info(f"FTP server health: {format_health(supervisor.health())}")
+        health = supervisor.health()
+        stop_all_ftp_servers(False)
+        supervisor_logger.info(f"FTP server stopped: {format_health(health)}")
+        if health['state'] == 'failed':
+            sys.exit(1)
     else:
         # 默认模式，启动 UI
         # 创建主窗口
@@ -232,6 +826,58 @@ if __name__ == "__main__":
         encoding_menu = tk.OptionMenu(left_frame, encoding_var, "utf-8", "gbk", "gb2312", "ascii", "latin-1")
         encoding_menu.pack()
 
+        # 并发模式选择框
+        concurrency_var = tk.StringVar()
+        concurrency_var.set(CONCURRENCY_LABELS[args.mode])
+        concurrency_label = tk.Label(left_frame, text="并发模式:")
+        concurrency_label.pack()
+        concurrency_menu = tk.OptionMenu(left_frame, concurrency_var,
+                                         *[CONCURRENCY_LABELS[mode] for mode in CONCURRENCY_MODES])
+        concurrency_menu.pack()
+
+        # 工作进程数输入框（单线程模式，0 表示CPU核数）
+        workers_label = tk.Label(left_frame, text="工作进程数:")
+        workers_label.pack()
+        workers_entry = tk.Entry(left_frame)
+        workers_entry.insert(0, str(args.workers))
+        workers_entry.pack()
+
+        # 连接数限制输入框（0 表示不限制）
+        max_cons_label = tk.Label(left_frame, text="最大连接数:")
+        max_cons_label.pack()
+        max_cons_entry = tk.Entry(left_frame)
+        max_cons_entry.insert(0, str(args.maxcons))
+        max_cons_entry.pack()
+        max_cons_per_ip_label = tk.Label(left_frame, text="单个IP最大连接数:")
+        max_cons_per_ip_label.pack()
+        max_cons_per_ip_entry = tk.Entry(left_frame)
+        max_cons_per_ip_entry.insert(0, str(args.maxconsip))
+        max_cons_per_ip_entry.pack()
+
+        # 高性能传输复选框
+        performance_var = tk.BooleanVar()
+        performance_var.set(args.perf)
+        performance_checkbox = tk.Checkbutton(left_frame, text="高性能传输（大文件）", variable=performance_var)
+        performance_checkbox.pack()
+
+        # 限速（KB/s）和同时传输数，0 表示不限制
+        limit_frame = tk.LabelFrame(left_frame, text="限速 KB/s 和同时传输数（0 不限制）")
+        limit_frame.pack(pady=5)
+        for column, text in enumerate(("下载", "上传", "传输数"), start=1):
+            tk.Label(limit_frame, text=text).grid(row=0, column=column)
+        limit_entries = {}
+        for row, (name, text, values) in enumerate(
+                (('user', "FTP 用户", (*args.ulimit, args.utransfers)),
+                 ('anonymous', "匿名用户", (*args.anylimit, args.anytransfers))), start=1):
+            tk.Label(limit_frame, text=text).grid(row=row, column=0, sticky=tk.W)
+            entries = []
+            for column, value in enumerate(values, start=1):
+                entry = tk.Entry(limit_frame, width=7)
+                entry.insert(0, str(value))
+                entry.grid(row=row, column=column)
+                entries.append(entry)
+            limit_entries[name] = entries
+
         # 创建切换按钮
         toggle_button = tk.Button(left_frame, text="启动 FTP 服务器",
                                   command=lambda: toggle_ftp_server(toggle_button))
@@ -246,6 +892,9 @@ if __name__ == "__main__":
         log_text = tk.Text(right_frame, height=20, width=40)
         log_text.pack(fill=tk.BOTH, expand=True)
 
+        # 关闭窗口时停止服务器
+        root.protocol("WM_DELETE_WINDOW", on_close)
+
         # 定期更新日志
         root.after(1000, update_log)
 
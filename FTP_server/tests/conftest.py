@@ -0,0 +1,80 @@
+"""FTP 服务器测试: 把 FTP_server 目录加入模块搜索路径，并提供在子进程中启动服务器的夹具"""
+import ftplib
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ftp import FTPSupervisor  # noqa: E402
+
+USER = 'user'
+PASSWORD = '12345'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_listening(port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), 0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"FTP server did not start listening on port {port}")
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    """共享目录；日志文件 ftp_server.log 写到临时目录"""
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'shared'
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def ftp_server(shared_dir):
+    """start(**server_options) 启动受监控的服务器并等待监听，返回 (监控, 端口)"""
+    supervisors = []
+
+    def start(**options):
+        port = free_port()
+        options.setdefault('ip', '127.0.0.1')
+        options.setdefault('passive_ports', (port + 1, port + 100))
+        supervisor = FTPSupervisor((USER, PASSWORD, port, str(shared_dir)), options)
+        supervisor.start()
+        supervisors.append(supervisor)
+        wait_listening(port)
+        return supervisor, port
+    yield start
+    for supervisor in supervisors:
+        supervisor.stop()
+
+
+def connect(port, user=USER, password=PASSWORD):
+    client = ftplib.FTP()
+    client.connect('127.0.0.1', port, timeout=5)
+    if user == 'anonymous':
+        client.login()
+    else:
+        client.login(user, password)
+    return client
+
+
+def wait_stat(supervisor, name, value, timeout=5.0):
+    """等待共享统计项变为 value（数据通道关闭由服务器异步处理）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if supervisor.health()[name] == value:
+            return
+        time.sleep(0.02)
+    assert supervisor.health()[name] == value
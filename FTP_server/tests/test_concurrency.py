@@ -0,0 +1,67 @@
+"""并发模式: 各模式同时服务多个传输，当前连接数统计正确，限制每个 IP 的连接数"""
+import ftplib
+
+import pytest
+
+import ftp
+from conftest import connect, wait_stat
+
+BIG = 8 * 1024 * 1024
+
+MODES = [
+    pytest.param({'concurrency': 'async'}, id='async'),
+    pytest.param({'concurrency': 'async', 'workers': 2}, id='async-workers',
+                 marks=pytest.mark.skipif(ftp.MultiprocessFTPServer is None, reason='POSIX only')),
+    pytest.param({'concurrency': 'thread'}, id='thread'),
+    pytest.param({'concurrency': 'process'}, id='process',
+                 marks=pytest.mark.skipif('process' not in ftp.CONCURRENCY_MODES, reason='POSIX only')),
+]
+
+
+@pytest.fixture
+def files(shared_dir):
+    (shared_dir / 'big.bin').write_bytes(bytes(range(256)) * (BIG // 256))
+    (shared_dir / 'small.txt').write_bytes(b'hello')
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_concurrent_transfers(ftp_server, files, shared_dir, options):
+    supervisor, port = ftp_server(**options)
+    clients = [connect(port) for _ in range(3)]
+    wait_stat(supervisor, 'connections', 3)
+    for client in clients:
+        client.voidcmd('TYPE I')
+
+    # 两个下载都未读完时，第三个连接仍能列目录和下载
+    data = [client.transfercmd('RETR big.bin') for client in clients[:2]]
+    first_blocks = [sock.recv(65536) for sock in data]
+    assert all(first_blocks)
+    assert sorted(clients[2].nlst()) == ['big.bin', 'small.txt']
+    small = []
+    clients[2].retrbinary('RETR small.txt', small.append)
+    assert b''.join(small) == b'hello'
+
+    expected = (shared_dir / 'big.bin').read_bytes()
+    for client, sock, block in zip(clients, data, first_blocks):
+        received = [block]
+        while chunk := sock.recv(1 << 20):
+            received.append(chunk)
+        sock.close()
+        client.voidresp()
+        assert b''.join(received) == expected
+
+    for client in clients:
+        client.quit()
+    wait_stat(supervisor, 'connections', 0)
+
+
+def test_max_connections_per_ip(ftp_server):
+    supervisor, port = ftp_server(max_cons_per_ip=2)
+    clients = [connect(port), connect(port)]
+    with pytest.raises(ftplib.error_temp, match='421'):
+        connect(port)
+    clients.pop().quit()
+    wait_stat(supervisor, 'connections', 1)
+    clients.append(connect(port))
+    for client in clients:
+        client.quit()
@@ -0,0 +1,53 @@
+"""高性能传输: 大缓冲区和 sendfile 下载、上传的数据完整，传输日志记录速率"""
+import io
+import os
+import re
+
+import pytest
+
+import ftp
+from conftest import connect
+
+SIZE = 5 * 1024 * 1024 + 123  # 不是缓冲区大小的整数倍
+
+
+@pytest.fixture
+def payload(shared_dir):
+    data = os.urandom(SIZE)
+    (shared_dir / 'data.bin').write_bytes(data)
+    return data
+
+
+@pytest.mark.parametrize('performance', [False, True], ids=['default', 'performance'])
+def test_transfers_intact(ftp_server, shared_dir, payload, performance):
+    supervisor, port = ftp_server(performance=performance)
+    client = connect(port)
+    blocks = []
+    client.retrbinary('RETR data.bin', blocks.append)
+    assert b''.join(blocks) == payload
+    client.storbinary('STOR copy.bin', io.BytesIO(payload))
+    client.quit()
+    assert (shared_dir / 'copy.bin').read_bytes() == payload
+
+    log = (shared_dir.parent / ftp.LOG_FILE).read_text()
+    assert re.search(rf"RETR \S+data\.bin completed=1 bytes={SIZE} seconds=\S+ rate=\S+MB/s", log)
+    assert re.search(rf"STOR \S+copy\.bin completed=1 bytes={SIZE} seconds=\S+ rate=\S+MB/s", log)
+    if performance:
+        assert 'Performance profile' in log
+    health = supervisor.health()
+    assert (health['bytes_sent'], health['bytes_received']) == (SIZE, SIZE)
+
+
+def test_performance_sockets_use_large_buffers(monkeypatch):
+    """数据连接套接字的收发缓冲区按 PERFORMANCE_SOCKET_BUFFER 设置"""
+    options = {}
+
+    class Socket:
+        def setsockopt(self, level, option, value):
+            options[option] = value
+
+    monkeypatch.setattr(ftp.DTPHandler, '__init__', lambda self, sock, cmd_channel: None)
+    ftp.PerformanceDTPHandler(Socket(), None)
+    assert options == {ftp.socket.SO_SNDBUF: ftp.PERFORMANCE_SOCKET_BUFFER,
+                       ftp.socket.SO_RCVBUF: ftp.PERFORMANCE_SOCKET_BUFFER}
+    assert ftp.PerformanceDTPHandler.ac_out_buffer_size == ftp.PERFORMANCE_BUFFER_SIZE
@@ -0,0 +1,105 @@
+"""同时传输数上限和限速: 只有 RETR/STOR/STOU 计入，空闲的被动模式数据连接和目录列表不计入"""
+import ftplib
+import socket
+import time
+
+import pytest
+
+from conftest import connect, wait_stat
+
+BIG = 16 * 1024 * 1024  # 客户端不读取时服务器发送会阻塞，传输保持进行中
+
+
+@pytest.fixture
+def files(shared_dir):
+    (shared_dir / 'big.bin').write_bytes(b'\x5a' * BIG)
+    (shared_dir / 'small.txt').write_bytes(b'hello')
+
+
+def passive_socket(client):
+    """发送 PASV 并建立数据连接，但还不发送传输命令"""
+    host, port = ftplib.parse227(client.sendcmd('PASV'))
+    return socket.create_connection((host, port), 5)
+
+
+@pytest.mark.parametrize('concurrency', ['async', 'thread'])
+def test_idle_passive_connections_do_not_count(ftp_server, files, concurrency):
+    supervisor, port = ftp_server(allow_anonymous=True, concurrency=concurrency,
+                                  transfer_limits={'anonymous': 1})
+    first, second = connect(port, 'anonymous'), connect(port, 'anonymous')
+    first.voidcmd('TYPE I')
+    second.voidcmd('TYPE I')
+    first_data, second_data = passive_socket(first), passive_socket(second)
+    assert supervisor.health()['anonymous_transfers'] == 0
+
+    # 第一个下载开始，第二个被拒绝
+    assert first.sendcmd('RETR big.bin').startswith('125')
+    wait_stat(supervisor, 'anonymous_transfers', 1)
+    with pytest.raises(ftplib.error_temp, match='450'):
+        second.sendcmd('RETR big.bin')
+    assert supervisor.health()['rejected_transfers'] == 1
+
+    # 第一个下载完成后第二个可以下载
+    received = 0
+    while chunk := first_data.recv(1 << 20):
+        received += len(chunk)
+    first_data.close()
+    assert received == BIG
+    first.voidresp()
+    wait_stat(supervisor, 'anonymous_transfers', 0)
+    assert second.sendcmd('RETR small.txt').startswith('125')
+    assert second_data.makefile('rb').read() == b'hello'
+    second_data.close()
+    second.voidresp()
+    wait_stat(supervisor, 'anonymous_transfers', 0)
+    first.quit()
+    second.quit()
+
+
+@pytest.mark.parametrize('concurrency', ['async', 'thread'])
+def test_concurrent_transfers_up_to_limit(ftp_server, files, concurrency):
+    supervisor, port = ftp_server(concurrency=concurrency, transfer_limits={'user': 2})
+    clients = [connect(port) for _ in range(3)]
+    for client in clients:
+        client.voidcmd('TYPE I')
+    data = [clients[0].transfercmd('RETR big.bin'), clients[1].transfercmd('RETR big.bin')]
+    wait_stat(supervisor, 'user_transfers', 2)
+    with pytest.raises(ftplib.error_temp, match='450'):
+        clients[2].transfercmd('RETR big.bin')
+    # 目录列表不受传输数限制，也不计入
+    assert sorted(clients[2].nlst()) == ['big.bin', 'small.txt']
+    assert supervisor.health()['user_transfers'] == 2
+
+    # 中止一个下载后名额释放
+    data[0].close()
+    clients[0].abort()
+    wait_stat(supervisor, 'user_transfers', 1)
+    assert clients[2].retrbinary('RETR small.txt', lambda block: None).startswith('226')
+    data[1].close()
+    for client in clients:
+        client.close()
+    wait_stat(supervisor, 'user_transfers', 0)
+
+
+def test_failed_command_releases_transfer(ftp_server, files):
+    supervisor, port = ftp_server(transfer_limits={'user': 1})
+    client = connect(port)
+    for _ in range(3):
+        with pytest.raises(ftplib.error_perm, match='550'):
+            client.retrbinary('RETR missing.bin', lambda block: None)
+    wait_stat(supervisor, 'user_transfers', 0)
+    assert client.retrbinary('RETR small.txt', lambda block: None).startswith('226')
+    client.quit()
+
+
+def test_download_bandwidth_limit(ftp_server, shared_dir):
+    (shared_dir / 'limited.bin').write_bytes(b'\x00' * (768 * 1024))
+    _, port = ftp_server(bandwidth={'user': (256 * 1024, 0)})
+    client = connect(port)
+    started = time.monotonic()
+    blocks = []
+    client.retrbinary('RETR limited.bin', blocks.append)
+    elapsed = time.monotonic() - started
+    client.quit()
+    assert len(b''.join(blocks)) == 768 * 1024
+    assert elapsed >= 1.0  # 256 KB/s 下载 768 KB，第一秒的数据可以突发发送
@@ -0,0 +1,90 @@
+"""FTPSupervisor: 配置错误不重启、意外退出后重启、连续快速失败后停止、stop() 结束子进程"""
+import os
+import signal
+import socket
+import time
+
+import pytest
+
+import ftp
+from conftest import USER, PASSWORD, connect, free_port, wait_listening
+
+
+def wait_state(supervisor, predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate(supervisor.health()):
+            return supervisor.health()
+        time.sleep(0.05)
+    raise AssertionError(f"supervisor state not reached: {supervisor.health()}")
+
+
+@pytest.fixture
+def supervisors():
+    started = []
+    yield started
+    for supervisor in started:
+        supervisor.stop()
+
+
+def start(supervisors, shared_dir, port, **options):
+    options.setdefault('ip', '127.0.0.1')
+    options.setdefault('passive_ports', (port + 1, port + 100))
+    supervisor = ftp.FTPSupervisor((USER, PASSWORD, port, str(shared_dir)), options)
+    supervisors.append(supervisor)
+    supervisor.start()
+    return supervisor
+
+
+def test_address_in_use_fails_without_restart(supervisors, shared_dir):
+    with socket.socket() as busy:
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        supervisor = start(supervisors, shared_dir, port)
+        health = wait_state(supervisor, lambda h: h['state'] != 'running')
+    assert health['state'] == 'failed'
+    assert 'Failed to listen' in health['error']
+    assert health['last_exit'] == ftp.EXIT_CONFIG_ERROR
+    assert health['restarts'] == 0
+
+
+def test_stop_ends_server(supervisors, shared_dir):
+    port = free_port()
+    supervisor = start(supervisors, shared_dir, port)
+    wait_listening(port)
+    connect(port).quit()
+    supervisor.stop()
+    health = supervisor.health()
+    assert health['state'] == 'stopped' and not health['alive']
+    assert health['restarts'] == 0
+    with pytest.raises(OSError):
+        socket.create_connection(('127.0.0.1', port), 0.5).close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'killpg'), reason='POSIX process groups')
+def test_restart_after_crash(supervisors, shared_dir, monkeypatch):
+    monkeypatch.setattr(ftp, 'RESTART_DELAY', 0.1)
+    port = free_port()
+    supervisor = start(supervisors, shared_dir, port)
+    wait_listening(port)
+    first_pid = supervisor.health()['pid']
+    os.killpg(first_pid, signal.SIGKILL)
+
+    health = wait_state(supervisor, lambda h: h['restarts'] == 1 and h['alive'])
+    assert health['state'] == 'running' and health['pid'] != first_pid
+    assert health['last_exit'] == -signal.SIGKILL
+    wait_listening(port)
+    connect(port).quit()
+
+
+def test_quick_failures_stop_restarting(supervisors, shared_dir, monkeypatch):
+    monkeypatch.setattr(ftp, 'RESTART_DELAY', 0.05)
+    monkeypatch.setattr(ftp, 'MAX_QUICK_FAILURES', 3)
+    # 被动端口参数无效，子进程启动时出错退出（退出码 1，不是配置错误）
+    supervisor = start(supervisors, shared_dir, free_port(), passive_ports=None)
+    health = wait_state(supervisor, lambda h: h['state'] != 'running')
+    assert health['state'] == 'failed'
+    assert health['restarts'] == 2
+    assert health['last_exit'] == 1
+    assert '3 times in a row' in health['error']
@@ -4,13 +4,23 @@ import serial
 from array import array
 import serial.tools.list_ports
 import threading
+from collections import deque
 import time
 import binascii
 import logging
 from datetime import datetime
 import os
 import json
-import csv  # 新增：导入csv模块
+
+from rs485_protocol import (
+    PacketDecoder, hex_string, CHECKSUM_LEN, PARSE_MODE_NAMES, MODE_DECODERS, FLOW1_SCHEMA,
+    LTC2413_OVER_RANGE, LTC2413_UNDER_RANGE, WORKFLOW_COMMANDS, CommandTable,
+)
+from rs485_async import AsyncSerialTransport
+from rs485_storage import LogWriter, TableWriter, CaptureWriter
+from rs485_scheduler import CommandScheduler
+from rs485_metrics import Metrics, MetricsExporter
+from rs485_plot import StripChart, PLOT_CHANNELS, PLOT_SIGNALS, PLOT_WINDOWS
 
 # 配置日志
 logging.basicConfig(
@@ -22,6 +32,186 @@ logging.basicConfig(
     ]
 )
 
+# 解析结果显示设置
+PARSE_VIEW_PACKETS = 200  # 解析区保留的数据包数，更早的写入解析日志
+RESULT_VIEW_ROWS = 2000  # 数据显示区保留的行数（数据已保存到CSV）
+RECEIVE_VIEW_LINES = 2000  # 接收区保留的行数（数据已保存到接收日志）
+STATUS_VIEW_LINES = 1000  # 状态输出区保留的行数（状态已保存到状态日志）
+VIEW_REFRESH_FPS = 10  # 界面批量刷新频率
+PIPELINE_DRAIN_MS = 50  # 界面线程处理接收结果的间隔
+PIPELINE_DRAIN_ITEMS = 500  # 每次最多处理的接收结果数
+SEND_TIMEOUT = 1.0  # 等待串口写入完成的最长时间（秒）
+AUTO_WORK_TIMEOUT = 10.0  # 自动工作等待“采集完成”的最长时间（秒）
+AUTO_WORK_RETRIES = 2  # 超时后重发次数
+ALL_WORKFLOWS = "全部流程"  # 自动工作依次执行所有工作流程
+METRICS_REFRESH_MS = 1000  # 性能指标显示刷新间隔
+METRICS_EXPORT_INTERVAL = 10.0  # 性能指标文件写入间隔（秒）
+PLOT_CAPACITY = 8192  # 实时曲线逐包保留的数据包数（更早的部分按10秒分段保留最小值和最大值）
+PLOT_FPS = 5  # 实时曲线刷新频率
+
+
+FLOW1_CSV_HEADERS = FLOW1_SCHEMA.headers  # vodata/dndata CSV表头
+FLOW1_TABLES = ('vodata', 'dndata')  # 测试流程1数据保存的CSV文件
+
+
+def checksum_strings(record):
+    """数据包的接收校验和与计算校验和（十六进制字符串）"""
+    return (hex_string(record.received_checksum.to_bytes(CHECKSUM_LEN, 'big')),
+            hex_string(record.calculated_checksum.to_bytes(CHECKSUM_LEN, 'big')))
+
+
+class BoundedTreeView:
+    """
+    有界、批量刷新的 Treeview
+
+    其他线程只把行数据放入待显示队列，由 Tk 线程按固定帧率批量插入；
+    只保留最近 max_groups 组（一组对应一个数据包）的行，更早的行交给
+    on_evict 保存后从控件中删除。
+    """
+    
+    def __init__(self, root, tree, max_groups, fps=VIEW_REFRESH_FPS, on_evict=None, auto_scroll=None):
+        self.root = root
+        self.tree = tree
+        self.max_groups = max_groups
+        self.interval = max(1, int(1000 / fps))
+        self.on_evict = on_evict
+        self.auto_scroll = auto_scroll or (lambda: True)
+        self._lock = threading.Lock()
+        self._pending = deque()  # 等待显示的行组
+        self._groups = deque()  # 已显示的行组: (item列表, 行数据列表)
+        self._clear = False
+        self.root.after(self.interval, self._refresh)
+    
+    def add(self, rows):
+        """添加一组行（可在任意线程调用）"""
+        evicted = None
+        with self._lock:
+            self._pending.append(rows)
+            # 界面来不及刷新时，待显示队列同样有界
+            if len(self._pending) > self.max_groups:
+                evicted = [self._pending.popleft()]
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+    
+    def clear(self):
+        """清空显示内容（可在任意线程调用）"""
+        with self._lock:
+            self._pending.clear()
+            self._clear = True
+    
+    def _refresh(self):
+        """在Tk线程中批量插入待显示的行并删除超出上限的旧行"""
+        try:
+            with self._lock:
+                batch = list(self._pending)
+                self._pending.clear()
+                clear, self._clear = self._clear, False
+            
+            if clear:
+                self.tree.delete(*self.tree.get_children())
+                self._groups.clear()
+            
+            last_item = None
+            for rows in batch:
+                items = [self.tree.insert('', tk.END, values=row) for row in rows]
+                if items:
+                    last_item = items[-1]
+                self._groups.append((items, rows))
+            
+            evicted = []
+            while len(self._groups) > self.max_groups:
+                items, rows = self._groups.popleft()
+                self.tree.delete(*items)
+                evicted.append(rows)
+            if evicted and self.on_evict:
+                self.on_evict(evicted)
+            
+            # 自动滚动到最后一行
+            if last_item and self.auto_scroll():
+                self.tree.see(last_item)
+        except Exception as e:
+            logging.error(f"界面刷新失败: {str(e)}")
+        finally:
+            self.root.after(self.interval, self._refresh)
+
+
+class BoundedTextView:
+    """
+    有界、批量刷新的 Text 控件
+
+    其他线程只把文本放入待显示队列，由 Tk 线程按固定帧率合并后一次插入并
+    滚动；控件只保留最近 max_lines 行。暂停时不刷新控件，待显示内容同样
+    只保留最近 max_lines 行，恢复后显示。
+    """
+    
+    def __init__(self, root, text, max_lines, fps=VIEW_REFRESH_FPS):
+        self.root = root
+        self.text = text
+        self.max_lines = max_lines
+        self.max_chars = max_lines * 256  # 不含换行的文本（如ASCII显示）按字符数限制
+        self.interval = max(1, int(1000 / fps))
+        self.paused = False
+        self._lock = threading.Lock()
+        self._pending = deque()  # 等待显示的文本
+        self._pending_lines = 0
+        self._pending_chars = 0
+        self._clear = False
+        self.root.after(self.interval, self._refresh)
+    
+    def add(self, text, replace=False):
+        """添加文本（可在任意线程调用），replace=True 时先清空已有内容"""
+        with self._lock:
+            if replace:
+                self._pending.clear()
+                self._pending_lines = self._pending_chars = 0
+                self._clear = True
+            self._pending.append(text)
+            self._pending_lines += text.count('\n')
+            self._pending_chars += len(text)
+            # 界面来不及刷新或已暂停时，只保留最近的内容
+            while len(self._pending) > 1 and (self._pending_lines > self.max_lines
+                                              or self._pending_chars > self.max_chars):
+                dropped = self._pending.popleft()
+                self._pending_lines -= dropped.count('\n')
+                self._pending_chars -= len(dropped)
+                self._clear = True  # 控件中的旧内容也已被挤出
+    
+    def clear(self):
+        """清空显示内容（可在任意线程调用）"""
+        with self._lock:
+            self._pending.clear()
+            self._pending_lines = self._pending_chars = 0
+            self._clear = True
+    
+    def _refresh(self):
+        """在Tk线程中一次插入待显示的文本并删除超出上限的旧行"""
+        try:
+            if self.paused:
+                return
+            with self._lock:
+                batch = ''.join(self._pending)
+                self._pending.clear()
+                self._pending_lines = self._pending_chars = 0
+                clear, self._clear = self._clear, False
+            if not batch and not clear:
+                return
+            
+            self.text.config(state=tk.NORMAL)
+            if clear:
+                self.text.delete(1.0, tk.END)
+            if batch:
+                self.text.insert(tk.END, batch)
+            lines = int(self.text.index('end-1c').split('.')[0])
+            if lines > self.max_lines:
+                self.text.delete(1.0, f"{lines - self.max_lines + 1}.0")
+            self.text.see(tk.END)
+            self.text.config(state=tk.DISABLED)
+        except Exception as e:
+            logging.error(f"界面刷新失败: {str(e)}")
+        finally:
+            self.root.after(self.interval, self._refresh)
+
+
 class RS485Tool:
     def __init__(self, root):
         self.root = root
@@ -35,36 +225,33 @@ class RS485Tool:
         # 串口状态
         self.ser = None
         self.is_connected = False
-        self.receive_thread = None
-        self.running = False
-        self.lock = threading.Lock()  # 线程锁，确保数据操作安全
+        self.pipeline = None  # 串口传输：事件循环线程读取解码 → 界面线程
         
         # 自动工作相关变量
         self.auto_working = False
-        self.auto_work_thread = None
+        self.scheduler = None  # 指令调度：收到“采集完成”后立即发送下一条
         self.auto_work_count = 0
         self.auto_work_total = 0
         self.selected_workflow = tk.StringVar(value="流程1")
-        self.workstatusflag = 0
-        
-        # 命令集
-        self.rhcontrol = "00 00 00 00 00 00 02 00"  # 热敏电阻
-        self.ptcontrol = "00 00 00 00 00 00 02 01"  # 铂电阻
-        self.racontrol = "00 00 00 00 00 00 02 02"  # 热辐射
-        self.alcontrol = "00 00 00 00 00 00 02 03"  # 流程1
-        
-        # 工作流程映射
-        self.workflow_commands = {
-            "热敏电阻": self.rhcontrol,
-            "铂电阻": self.ptcontrol,
-            "热辐射": self.racontrol,
-            "流程1": self.alcontrol
-        }
+        
+        # 命令集：内置工作流程指令加上 commands.json 中的设备指令，
+        # 发送的指令和解析方式0x00的命令状态由同一张对照表生成
+        self.commands = self.load_commands()
+        self.command_table = CommandTable(WORKFLOW_COMMANDS)
+        for workflow, command in self.commands.items():
+            try:
+                self.command_table.register(workflow, command)
+            except (TypeError, ValueError) as e:
+                logging.error(f"注册命令失败: {workflow} - {str(e)}")
+        
+        # 工作流程映射（十六进制指令）
+        self.workflow_commands = self.command_table.hex_commands()
         
         # 数据包解析相关
-        self.packet_header = [0x50, 0x52, 0x44, 0x54, 0x49, 0x52, 0x30, 0x31]  # "PRDTIR01"
-        self.packet_footer = [0x24, 0x24, 0x24, 0x24]  # "$$$$"
-        self.buffer = []  # 用于缓存接收的数据
+        # 解码函数：实时接收的数据包逐个到达，每包样本不多，逐个样本解码比 NumPy
+        # 批量解码（rs485_numpy.ARRAY_DECODERS，用于回放和批处理）快
+        self.decoders = dict(MODE_DECODERS)
+        self.decoders[0x00] = self.command_table.decode
         self.packet_count = 0  # 数据包计数器
         
         # 数据存储 - 新增：用于累积数据
@@ -80,18 +267,30 @@ class RS485Tool:
         
         # 日志设置
         self.save_logs_var = tk.BooleanVar(value=True)
+        # 接收数据在事件循环线程中保存，不能读取 Tk 变量，保存选项同步到普通属性
+        self.save_logs = True
+        self.save_logs_var.trace_add('write', lambda *args: setattr(self, 'save_logs', self.save_logs_var.get()))
+        self.save_binary_var = tk.BooleanVar(value=False)  # CSV数据同时保存二进制列文件（按天分区的列存储）
+        self.binary_dtype_var = tk.StringVar(value="float64")  # 二进制列数据类型: float64 / float32
+        self.save_capture_var = tk.BooleanVar(value=False)  # 保存原始二进制数据（带接收时间和数据包索引）
+        self.capture_writer = None
+        self.export_metrics_var = tk.BooleanVar(value=False)  # 定期保存性能指标到 RS_<日期>_metrics.jsonl
+        self.metrics = Metrics()  # 读取、分帧、解码、显示和写盘各阶段的计数和耗时
+        self.metrics_exporter = None
         self.log_timestamp = datetime.now().strftime("%Y%m%d")
         self.log_path_var = tk.StringVar(value=os.getcwd())
         
-        # 保存的命令集
-        self.commands = self.load_commands()
-        
         # 创建界面
         self.create_widgets()
         
         # 加载保存的设置
         self.load_settings()
         
+        # 日志和CSV数据写入（后台线程，文件常开）
+        self.log_writer = LogWriter(os.path.join(self.log_path_var.get(), 'data'), metrics=self.metrics)
+        self.table_writers = {}
+        self.csv_length_warned = set()  # 已提示表头长度不匹配的文件
+        
         # 刷新端口列表
         self.refresh_ports()
         
@@ -100,6 +299,7 @@ class RS485Tool:
         
         # 启动端口自动刷新定时器
         self.port_refresh_timer()
+        self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
     
     def font_config(self):
         """配置字体以支持中文显示"""
@@ -121,16 +321,16 @@ class RS485Tool:
         self.connect_btn.pack(side=tk.LEFT, padx=10, pady=5)
         
         # 功能按钮
-        self.thermistor_btn = ttk.Button(top_button_frame, text="热敏电阻", command=lambda: self.send_control_command(self.rhcontrol))
+        self.thermistor_btn = ttk.Button(top_button_frame, text="热敏电阻", command=lambda: self.send_control_command(self.workflow_commands["热敏电阻"]))
         self.thermistor_btn.pack(side=tk.LEFT, padx=10, pady=5)
         
-        self.pt_btn = ttk.Button(top_button_frame, text="铂电阻", command=lambda: self.send_control_command(self.ptcontrol))
+        self.pt_btn = ttk.Button(top_button_frame, text="铂电阻", command=lambda: self.send_control_command(self.workflow_commands["铂电阻"]))
         self.pt_btn.pack(side=tk.LEFT, padx=10, pady=5)
         
-        self.ifrad_btn = ttk.Button(top_button_frame, text="热辐射", command=lambda: self.send_control_command(self.racontrol))
+        self.ifrad_btn = ttk.Button(top_button_frame, text="热辐射", command=lambda: self.send_control_command(self.workflow_commands["热辐射"]))
         self.ifrad_btn.pack(side=tk.LEFT, padx=10, pady=5)
         
-        self.collect1_btn = ttk.Button(top_button_frame, text="流程1", command=lambda: self.send_control_command(self.alcontrol))
+        self.collect1_btn = ttk.Button(top_button_frame, text="流程1", command=lambda: self.send_control_command(self.workflow_commands["流程1"]))
         self.collect1_btn.pack(side=tk.LEFT, padx=10, pady=5)
         
         # 自动工作区域
@@ -138,7 +338,7 @@ class RS485Tool:
         auto_work_frame.pack(side=tk.LEFT, padx=10, pady=5)
         
         workflow_combo = ttk.Combobox(auto_work_frame, textvariable=self.selected_workflow, width=8, state="readonly")
-        workflow_combo['values'] = list(self.workflow_commands.keys())
+        workflow_combo['values'] = list(self.workflow_commands.keys()) + [ALL_WORKFLOWS]
         workflow_combo.pack(side=tk.LEFT, padx=5)
         
         self.auto_work_count_var = tk.StringVar(value="0")
@@ -160,28 +360,46 @@ class RS485Tool:
         upper_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=False, pady=(0, 10))
         lower_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
         
+        # 实时曲线区域：选中信号在 CH1~CH4 的测试流程1数据
+        plot_frame = ttk.LabelFrame(upper_frame, text="实时曲线", padding="10")
+        plot_frame.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(10, 0))
+        
+        plot_ctrl_frame = ttk.Frame(plot_frame)
+        plot_ctrl_frame.pack(fill=tk.X)
+        self.plot_signal_var = tk.StringVar(value=PLOT_SIGNALS[0])
+        plot_signal_combo = ttk.Combobox(plot_ctrl_frame, textvariable=self.plot_signal_var, values=list(PLOT_SIGNALS),
+                                         width=4, state="readonly")
+        plot_signal_combo.pack(side=tk.LEFT, padx=2)
+        plot_signal_combo.bind("<<ComboboxSelected>>", lambda e: self.update_plot_fields())
+        self.plot_channel_vars = {}
+        for ch in PLOT_CHANNELS:
+            self.plot_channel_vars[ch] = tk.BooleanVar(value=True)
+            ttk.Checkbutton(plot_ctrl_frame, text=f"CH{ch}", variable=self.plot_channel_vars[ch],
+                            command=self.update_plot_fields).pack(side=tk.LEFT, padx=2)
+        self.plot_window_var = tk.StringVar(value="10分钟")
+        plot_window_combo = ttk.Combobox(plot_ctrl_frame, textvariable=self.plot_window_var, values=list(PLOT_WINDOWS),
+                                         width=6, state="readonly")
+        plot_window_combo.pack(side=tk.LEFT, padx=2)
+        plot_window_combo.bind("<<ComboboxSelected>>",
+                               lambda e: self.strip_chart.set_window(PLOT_WINDOWS[self.plot_window_var.get()]))
+        self.pause_plot_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(plot_ctrl_frame, text="暂停", variable=self.pause_plot_var,
+                        command=self.on_pause_plot_toggle).pack(side=tk.LEFT, padx=2)
+        ttk.Button(plot_ctrl_frame, text="清空", width=5,
+                   command=lambda: self.strip_chart.clear()).pack(side=tk.RIGHT, padx=2)
+        
+        plot_canvas = tk.Canvas(plot_frame, width=420, height=200, background='white', highlightthickness=0)
+        plot_canvas.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        self.strip_chart = StripChart(self.root, plot_canvas, PLOT_CAPACITY, PLOT_FPS,
+                                      PLOT_WINDOWS[self.plot_window_var.get()])
+        self.update_plot_fields()
+        
         # 数据显示区域
         rawdata_frame = ttk.LabelFrame(upper_frame, text="数据显示", padding="10")
-        rawdata_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 创建表格
-        columns = [
-            'index', 'time', 
-            # CH1 数据
-            'CH1T1', 'CH1T2', 'CH1T3', 'CH1T4', 'CH1T5', 'CH1PT', 'CH1R',
-            'CH1B1', 'CH1B2', 'CH1B3', 'CH1B4', 'CH1B5',
-            # CH2 数据
-            'CH2T1', 'CH2T2', 'CH2T3', 'CH2T4', 'CH2T5', 'CH2PT', 'CH2R',
-            'CH2B1', 'CH2B2', 'CH2B3', 'CH2B4', 'CH2B5',
-            # CH3 数据
-            'CH3T1', 'CH3T2', 'CH3T3', 'CH3T4', 'CH3T5', 'CH3PT', 'CH3R',
-            'CH3B1', 'CH3B2', 'CH3B3', 'CH3B4', 'CH3B5',
-            # CH4 数据
-            'CH4T1', 'CH4T2', 'CH4T3', 'CH4T4', 'CH4T5', 'CH4PT', 'CH4R',
-            'CH4B1', 'CH4B2', 'CH4B3', 'CH4B4', 'CH4B5',
-            # 环境数据
-            'RT', 'MT', 'RH', 'MH'
-        ]
+        rawdata_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # 创建表格，CH1~CH4 和环境数据列与测试流程1的数据布局一致
+        columns = ['index', 'time'] + FLOW1_SCHEMA.names
         
         self.result_data_display = ttk.Treeview(rawdata_frame, columns=columns, show='headings')
         
@@ -262,6 +480,8 @@ class RS485Tool:
         receive_ctrl_frame.pack(fill=tk.X, pady=(5, 0))
         
         self.hex_receive_var = tk.BooleanVar(value=True)
+        self.hex_receive = True  # 事件循环线程中按此格式保存接收日志
+        self.hex_receive_var.trace_add('write', lambda *args: setattr(self, 'hex_receive', self.hex_receive_var.get()))
         self.hex_receive_check = ttk.Checkbutton(receive_ctrl_frame, text="十六进制显示", variable=self.hex_receive_var)
         self.hex_receive_check.pack(side=tk.LEFT, padx=5)
         
@@ -273,9 +493,17 @@ class RS485Tool:
         self.auto_clear_check = ttk.Checkbutton(receive_ctrl_frame, text="接收新数据前清空", variable=self.auto_clear_var)
         self.auto_clear_check.pack(side=tk.LEFT, padx=5)
         
+        self.pause_receive_var = tk.BooleanVar(value=False)
+        self.pause_receive_check = ttk.Checkbutton(receive_ctrl_frame, text="暂停显示", variable=self.pause_receive_var,
+                                                   command=self.on_pause_receive_toggle)
+        self.pause_receive_check.pack(side=tk.LEFT, padx=5)
+        
         self.clear_receive_btn = ttk.Button(receive_ctrl_frame, text="清空", command=self.clear_receive)
         self.clear_receive_btn.pack(side=tk.RIGHT, padx=5)
         
+        # 接收区按固定帧率批量刷新，只保留最近的行，暂停时数据照常接收和保存
+        self.receive_view = BoundedTextView(self.root, self.receive_text, RECEIVE_VIEW_LINES)
+        
         # 右侧区域
         # 状态输出区域
         status_frame = ttk.LabelFrame(right_frame, text="状态输出", padding="10")
@@ -296,6 +524,9 @@ class RS485Tool:
         self.clear_status_btn = ttk.Button(status_ctrl_frame, text="清空状态", command=self.clear_status)
         self.clear_status_btn.pack(side=tk.RIGHT, padx=5)
         
+        # 状态输出区同样按固定帧率批量刷新，只保留最近的行
+        self.status_view = BoundedTextView(self.root, self.status_text, STATUS_VIEW_LINES)
+        
         # 数据分析区域
         parse_frame = ttk.LabelFrame(right_frame, text="数据解析", padding="10")
         parse_frame.pack(fill=tk.BOTH, expand=True)
@@ -317,11 +548,17 @@ class RS485Tool:
         parse_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.parse_tree.pack(fill=tk.BOTH, expand=True)
         
+        # 解析区和数据显示区只保留最近的数据，按固定帧率批量刷新
+        self.auto_scroll_var = tk.BooleanVar(value=True)
+        self.parse_view = BoundedTreeView(self.root, self.parse_tree, PARSE_VIEW_PACKETS,
+                                          on_evict=self.archive_parse_rows,
+                                          auto_scroll=self.auto_scroll_var.get)
+        self.result_view = BoundedTreeView(self.root, self.result_data_display, RESULT_VIEW_ROWS)
+        
         # 解析控制区
         parse_ctrl_frame = ttk.Frame(parse_frame)
         parse_ctrl_frame.pack(fill=tk.X, pady=(10, 0))
         
-        self.auto_scroll_var = tk.BooleanVar(value=True)
         self.auto_scroll_check = ttk.Checkbutton(parse_ctrl_frame, text="自动滚动到最新", variable=self.auto_scroll_var)
         self.auto_scroll_check.pack(side=tk.LEFT, padx=5)
         
@@ -331,6 +568,13 @@ class RS485Tool:
         # 显示数据包信息
         self.packet_info_var = tk.StringVar(value="等待接收数据包...")
         ttk.Label(parse_ctrl_frame, textvariable=self.packet_info_var).pack(side=tk.LEFT, padx=5)
+        
+        # 性能指标：各阶段吞吐量、耗时分位数和队列深度
+        metrics_frame = ttk.Frame(parse_frame)
+        metrics_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(metrics_frame, text="性能:").pack(side=tk.LEFT, padx=5)
+        self.metrics_var = tk.StringVar(value="未连接")
+        ttk.Label(metrics_frame, textvariable=self.metrics_var).pack(side=tk.LEFT, padx=5)
     
     def toggle_auto_work(self):
         """切换自动工作状态（开始/停止）"""
@@ -362,50 +606,51 @@ class RS485Tool:
             self.auto_work_count = 0
             self.auto_work_status_var.set(f" 0/{'无限' if work_count == 0 else work_count}")
             
-            # 启动自动工作线程
-            self.auto_work_thread = threading.Thread(target=self.auto_work_loop, daemon=True)
-            self.auto_work_thread.start()
+            # 选择的工作流程（或全部流程依次执行）作为一个指令序列
+            workflow = self.selected_workflow.get()
+            names = list(self.workflow_commands) if workflow == ALL_WORKFLOWS else [workflow]
+            sequence = [(name, bytes.fromhex(self.workflow_commands[name])) for name in names]
+            
+            # 启动指令调度
+            self.scheduler = CommandScheduler(self.pipeline, AUTO_WORK_TIMEOUT, AUTO_WORK_RETRIES,
+                                              listener=self.on_auto_work_event)
+            self.scheduler.start(sequence, work_count)
         else:
             # 停止自动工作
             self.auto_working = False
-            self.workstatusflag = 0
+            if self.scheduler:
+                self.scheduler.stop()
+                self.scheduler = None
             self.auto_work_btn.config(text="自动工作")
             self.auto_work_status_var.set(f" {self.auto_work_count}次")
     
-    def auto_work_loop(self):
-        """自动工作循环"""
-        while self.auto_working and self.is_connected:
-            try:
-                # 获取当前选择的工作流程命令
-                workflow = self.selected_workflow.get()
-                command = self.workflow_commands.get(workflow)
-                
-                if self.workstatusflag == 0:
-                    if command:
-                        # 发送命令
-                        self.send_control_command(command)
-                        self.auto_work_count += 1
-                        
-                        # 更新状态
-                        status_text = f"已完成: {self.auto_work_count}/{'无限' if self.auto_work_total == 0 else self.auto_work_total}"
-                        self.root.after(0, lambda: self.auto_work_status_var.set(status_text))
-                        self.log_message(f"自动工作: 发送 {workflow} 命令，第 {self.auto_work_count} 次")
-                        
-                        # 检查是否达到工作次数（0表示无限循环）
-                        if self.auto_work_total > 0 and self.auto_work_count >= self.auto_work_total:
-                            self.root.after(0, self.toggle_auto_work)
-                            break
-                # 等待一段时间再进行下一次操作（可根据需要调整）
-                time.sleep(2)
-                
-            except Exception as e:
-                error_msg = f"自动工作错误: {str(e)}"
-                self.update_status(error_msg)
-                logging.error(error_msg)
-                # 发生错误时停止自动工作
-                self.root.after(0, self.toggle_auto_work)
-                self.workstatusflag = 0
-                break
+    def on_auto_work_event(self, event, workflow, detail):
+        """指令调度的事件回调（在串口传输线程中调用），界面更新交给Tk线程"""
+        self.root.after(0, lambda: self.handle_auto_work_event(event, workflow, detail))
+    
+    def handle_auto_work_event(self, event, workflow, detail):
+        """根据指令调度的事件更新自动工作状态"""
+        if not self.auto_working:
+            return
+        total = '无限' if self.auto_work_total == 0 else self.auto_work_total
+        if event == 'sent':
+            retry = f"（第 {detail} 次重发）" if detail else ""
+            self.log_message(f"自动工作: 发送 {workflow} 命令，第 {self.auto_work_count + 1} 次{retry}")
+        elif event == 'complete':
+            self.update_status(f"自动工作: {workflow} 采集完成，用时 {detail:.2f} s")
+        elif event == 'timeout':
+            self.log_message(f"自动工作: {workflow} 等待采集完成超时")
+        elif event == 'cycle':
+            self.auto_work_count = detail
+            self.auto_work_status_var.set(f"已完成: {self.auto_work_count}/{total}")
+        elif event == 'finished':
+            self.toggle_auto_work()
+        elif event == 'error':
+            error_msg = f"自动工作错误: {detail}"
+            self.update_status(error_msg)
+            logging.error(error_msg)
+            # 发生错误时停止自动工作
+            self.toggle_auto_work()
     
     def on_hex_send_toggle(self):
         """当十六进制发送选项变化时更新自动换行选项状态"""
@@ -419,7 +664,7 @@ class RS485Tool:
         """打开串口设置对话框"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title("串口详细设置")
-        settings_window.geometry("500x400")
+        settings_window.geometry("500x440")
         settings_window.resizable(False, False)
         settings_window.transient(self.root)
         settings_window.grab_set()
@@ -477,6 +722,15 @@ class RS485Tool:
         ttk.Label(settings_frame, text="日志设置:").grid(row=6, column=0, padx=5, pady=10, sticky=tk.W)
         log_check = ttk.Checkbutton(settings_frame, text="自动保存日志", variable=self.save_logs_var)
         log_check.grid(row=6, column=1, padx=5, pady=10, sticky=tk.W)
+        binary_check = ttk.Checkbutton(settings_frame, text="同时保存二进制列数据", variable=self.save_binary_var)
+        binary_check.grid(row=7, column=1, padx=5, pady=10, sticky=tk.W)
+        binary_dtype_combo = ttk.Combobox(settings_frame, textvariable=self.binary_dtype_var,
+                                          values=["float64", "float32"], width=8, state="readonly")
+        binary_dtype_combo.grid(row=7, column=2, padx=5, pady=10)
+        capture_check = ttk.Checkbutton(settings_frame, text="保存原始二进制数据", variable=self.save_capture_var)
+        capture_check.grid(row=8, column=1, padx=5, pady=10, sticky=tk.W)
+        metrics_check = ttk.Checkbutton(settings_frame, text="定期保存性能指标", variable=self.export_metrics_var)
+        metrics_check.grid(row=9, column=1, padx=5, pady=10, sticky=tk.W)
         
         # 刷新按钮
         refresh_btn = ttk.Button(settings_frame, text="刷新端口", 
@@ -497,7 +751,14 @@ class RS485Tool:
             self.parity_var.set(parity_var.get())
             
             # 确保data文件夹存在
-            self.ensure_data_folder_exists()
+            data_path = self.ensure_data_folder_exists()
+            if data_path:
+                self.log_writer.set_directory(data_path)
+                # CSV写入按新的路径和设置重新创建
+                if self.is_connected:
+                    self.open_table_writers()
+                else:
+                    self.close_table_writers()
             
             # 如果启用了日志且是首次设置，更新时间戳
             if self.save_logs_var.get():
@@ -547,37 +808,10 @@ class RS485Tool:
             return None
     
     def save_to_log(self, log_type, content):
-        """保存内容到指定类型的日志文件，保存在data文件夹下"""
-        if not self.save_logs_var.get():
+        """保存内容到指定类型的日志文件，保存在data文件夹下（由后台线程写入，可在任意线程调用）"""
+        if not self.save_logs:
             return
-            
-        try:
-            # 确保data文件夹存在
-            data_path = self.ensure_data_folder_exists()
-            if not data_path:
-                return
-                
-            # 根据日志类型确定文件名
-            if log_type == "receive":
-                filename = os.path.join(data_path, f"RS_{self.log_timestamp}_receive.log")
-            elif log_type == "status":
-                filename = os.path.join(data_path, f"RS_{self.log_timestamp}_status.log")
-            elif log_type == "analysis":
-                filename = os.path.join(data_path, f"RS_{self.log_timestamp}_analysis.log")
-            else:
-                return
-                
-            # 添加时间戳
-            timestamp = datetime.now().strftime("%Y-%m-%d")
-            log_entry = f"[{timestamp}] {content}\n"
-            
-            # 写入文件
-            with open(filename, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-                
-        except Exception as e:
-            error_msg = f"日志保存失败: {str(e)}"
-            logging.error(error_msg)
+        self.log_writer.write(log_type, content)
     
     def get_port_list(self):
         """获取端口列表"""
@@ -658,10 +892,25 @@ class RS485Tool:
                 # 如果启用了日志，记录连接信息
                 self.save_to_log("status", connect_msg)
                 
-                # 启动接收线程
-                self.running = True
-                self.receive_thread = threading.Thread(target=self.receive_data, daemon=True)
-                self.receive_thread.start()
+                # 每次连接单独记录原始数据
+                if self.save_capture_var.get():
+                    self.open_capture()
+                
+                # 测试流程1数据的CSV写入器在连接时创建，由事件循环线程写入
+                self.open_table_writers()
+                
+                # 性能指标按连接重新统计
+                self.metrics.reset()
+                if self.export_metrics_var.get():
+                    self.open_metrics_exporter()
+                
+                # 启动事件驱动的串口传输（有数据时立即唤醒，不轮询），
+                # 接收数据在事件循环线程中保存，界面线程只负责显示
+                self.pipeline = AsyncSerialTransport(self.ser, PacketDecoder(decoders=self.decoders, metrics=self.metrics),
+                                                     consumer=self.store_received, metrics=self.metrics,
+                                                     capture=self.capture_writer)
+                self.pipeline.start()
+                self.root.after(PIPELINE_DRAIN_MS, self.drain_pipeline)
             else:
                 messagebox.showerror("错误", "无法打开串口")
                 
@@ -677,8 +926,13 @@ class RS485Tool:
             if self.auto_working:
                 self.toggle_auto_work()
                 
-            self.running = False
-            time.sleep(0.2)  # 等待接收线程结束
+            # 停止串口传输并处理剩余数据
+            if self.pipeline:
+                self.pipeline.stop()
+                self.process_pipeline_items()
+                self.pipeline = None
+            self.close_capture()
+            self.close_metrics_exporter()
             self.ser.close()
             self.is_connected = False
             self.connect_btn.config(text="连接")
@@ -689,557 +943,292 @@ class RS485Tool:
             # 如果启用了日志，记录断开信息
             self.save_to_log("status", disconnect_msg)
     
-    def receive_data(self):
-        """接收数据的线程函数"""
-        while self.running and self.ser and self.ser.is_open:
-            try:
-                if self.ser.in_waiting:
-                    data = self.ser.read(self.ser.in_waiting)
-                    self.display_received_data(data)
-                    
-                    # 将数据转换为字节列表，用于解析
-                    with self.lock:  # 使用线程锁确保数据安全
-                        byte_data = list(data)
-                        self.buffer.extend(byte_data)
-                        self.parse_packets()  # 尝试解析数据包
-                time.sleep(0.01)
-            except Exception as e:
-                error_msg = f"接收错误: {str(e)}"
-                self.log_message(error_msg)
-                self.update_status(error_msg)
-                self.save_to_log("status", error_msg)
-                logging.error(error_msg)
-                break
-    
-    def parse_packets(self):
-        """解析缓冲区中的数据包，按照协议查找包头和包尾"""
-        header_len = len(self.packet_header)
-        footer_len = len(self.packet_footer)
-        
-        while len(self.buffer) >= header_len + footer_len + 4:  # 额外4字节用于校验和
-            # 查找包头
-            header_index = -1
-            for i in range(len(self.buffer) - header_len + 1):
-                if self.buffer[i:i+header_len] == self.packet_header:
-                    header_index = i
-                    break
-            
-            if header_index == -1:
-                # 未找到包头，清除部分缓冲区
-                if len(self.buffer) > header_len:
-                    self.buffer = self.buffer[-(header_len-1):]
-                break
-            
-            # 从包头之后查找包尾
-            remaining_buffer = self.buffer[header_index+header_len:]
-            footer_index = -1
-            for i in range(len(remaining_buffer) - footer_len + 1):
-                if remaining_buffer[i:i+footer_len] == self.packet_footer:
-                    footer_index = i
-                    break
-            
-            if footer_index == -1:
-                # 未找到包尾，保留当前包头位置开始的缓冲区
-                self.buffer = self.buffer[header_index:]
-                break
-            
-            # 提取完整数据包（包含包头、数据内容、包尾和校验和）
-            # 包尾后还有4字节校验和，所以需要额外+4
-            packet_end = header_index + header_len + footer_index + footer_len + 4
-            if packet_end > len(self.buffer):
-                # 数据包不完整，等待更多数据
-                self.buffer = self.buffer[header_index:]
-                break
-                
-            packet = self.buffer[header_index:packet_end]
-            # 移除已解析的数据包
-            self.buffer = self.buffer[packet_end:]
-            
-            # 解析数据包内容
-            self.parse_packet_content(packet)
+    def drain_pipeline(self):
+        """定时在Tk线程中处理串口传输送来的数据"""
+        if self.pipeline is None:
+            return
+        self.process_pipeline_items()
+        self.root.after(PIPELINE_DRAIN_MS, self.drain_pipeline)
     
-    def calculate_checksum(self, data):
-        """计算数据的校验和（简单求和取低4字节）"""
-        checksum = sum(data) & 0xFFFFFFFF  # 取低4字节
-        # 转换为4字节列表（大端模式）
-        return [(checksum >> 24) & 0xFF,
-                (checksum >> 16) & 0xFF,
-                (checksum >> 8) & 0xFF,
-                checksum & 0xFF]
+    async def store_received(self, kind, received, item):
+        """
+        串口传输的消费者（在事件循环线程中调用）：保存接收数据，再交给界面显示
+
+        保存不受界面刷新速度限制；界面跟不上时只跳过显示。
+        """
+        if kind == 'raw':
+            if self.save_logs:
+                log_content = item.hex(' ') if self.hex_receive else item.decode('utf-8', errors='replace')
+                self.log_writer.write("receive", log_content, received)
+        elif kind == 'record':
+            self.store_record(item)
+        elif kind == 'error':
+            self.save_to_log("status", f"接收错误: {item}")
+        self.pipeline.offer(kind, received, item)
     
-    def parse_packet_content(self, packet):
-        """解析数据包内容并显示，按照协议解析"""
-        # 数据包计数加1
+    def store_record(self, record):
+        """保存一个数据包的解析日志和测试流程1数据（在事件循环线程中调用）"""
+        # 解析区、数据显示区和CSV使用同一个数据包序号
         self.packet_count += 1
-        
-        # 提取包头
-        header_len = len(self.packet_header)
-        header = packet[:header_len]
-        
-        # 提取包尾
-        footer_len = len(self.packet_footer)
-        footer_start = -footer_len - 4  # 包尾前4字节是校验和
-        footer = packet[footer_start:-4]
-        
-        # 提取校验和（包尾后4字节）
-        checksum = packet[-4:]
-        
-        # 提取数据内容（包头后到包尾前）
-        content = packet[header_len:footer_start]
-        
-        # 数据包总长度
-        packet_length = len(packet)
-        
+        record.index = self.packet_count
+        
+        if self.save_logs:
+            timestamp = time.strftime("%H:%M:%S", time.localtime(record.timestamp))
+            lines = [f"数据包 #{record.index} - 长度: {record.packet_length} 字节 - 时间: {timestamp}"]
+            if record.missing_field is None:
+                received_checksum_str, calculated_checksum_str = checksum_strings(record)
+                lines.append(f"原始数据: {hex_string(record.payload)}")
+                lines.append(f"校验和 - 接收: {received_checksum_str}, 计算: {calculated_checksum_str}, "
+                             f"结果: {'有效' if record.checksum_valid else '无效'}")
+                if record.checksum_valid and not record.error:
+                    if record.parse_mode == 0x00:
+                        lines.append(f"命令解析: {hex_string(record.payload)} - {record.values.message}")
+                    elif record.parse_mode in (0x01, 0x02) and len(record.payload) % 4 != 0:
+                        lines.append(f"解析警告: 数据长度为{len(record.payload)}字节，不是4的倍数，无法完全解析")
+            for line in lines:
+                self.log_writer.write("analysis", line)
+        
+        if record.parse_mode == 0x03 and record.checksum_valid and not record.error and record.values:
+            # 保存的数据包含数据包序号和时间戳
+            self.save_data_csv([record.index, record.timestamp] + record.values.vodata, 'vodata')
+            self.save_data_csv([record.index, record.timestamp] + record.values.dndata, 'dndata')
+    
+    def process_pipeline_items(self):
+        """显示原始数据、解析结果和接收错误（数据已在事件循环线程中保存）"""
+        for kind, received, item in self.pipeline.drain(PIPELINE_DRAIN_ITEMS):
+            try:
+                if kind == 'raw':
+                    self.display_received_data(item)
+                elif kind == 'record':
+                    start = time.perf_counter()
+                    self.parse_packet_content(item)
+                    self.metrics.observe('display', time.perf_counter() - start)
+                elif kind == 'error':
+                    error_msg = f"接收错误: {item}"
+                    self.log_message(error_msg)
+                    self.status_view.add(f"[{time.strftime('%H:%M:%S')}] {error_msg}\n")
+                    logging.error(error_msg)
+            except Exception as e:
+                logging.error(f"处理接收数据失败: {str(e)}")
+    
+    def parse_packet_content(self, record):
+        """显示解码线程解析出的数据包内容"""
         # 更新数据包信息
-        timestamp = time.strftime("%H:%M:%S")
-        self.packet_info_var.set(f"最后解析时间: {timestamp} | 总接收包数: {self.packet_count} | 最后包长度: {packet_length} 字节")
+        timestamp = time.strftime("%H:%M:%S", time.localtime(record.timestamp))
+        stats = self.pipeline.stats() if self.pipeline else {}
+        self.packet_info_var.set(f"最后解析时间: {timestamp} | 总接收包数: {record.index} | 最后包长度: {record.packet_length} 字节"
+                                 f" | 校验失败: {stats.get('checksum_failures', 0)} 包"
+                                 f" | 未显示: {stats.get('dropped_display', 0)} 包 | 延迟: {stats.get('late_records', 0)} 包")
         
         # 添加数据包分隔线和标识
-        self.parse_tree.insert('', tk.END, values=('-'*20, '-'*20, '-'*20))
-        self.parse_tree.insert('', tk.END, values=(f'数据包 #{self.packet_count}', f'时间: {timestamp}', '完整数据包解析'))
-        self.parse_tree.insert('', tk.END, values=('-'*20, '-'*20, '-'*20))
+        rows = []
+        rows.append(('-'*20, '-'*20, '-'*20))
+        rows.append((f'数据包 #{record.index}', f'时间: {timestamp}', '完整数据包解析'))
+        rows.append(('-'*20, '-'*20, '-'*20))
         
         # 添加基本信息
-        self.parse_tree.insert('', tk.END, values=('包头', ' '.join(f'{b:02X}' for b in header), '数据包起始标识 "PRDTIR01"'))
-        self.parse_tree.insert('', tk.END, values=('包尾', ' '.join(f'{b:02X}' for b in footer), '数据包结束标识 "$$$$"'))
-        self.parse_tree.insert('', tk.END, values=('包长度', f'{packet_length} 字节', '包括包头、数据、包尾和校验和'))
+        rows.append(('包头', hex_string(record.header), '数据包起始标识 "PRDTIR01"'))
+        rows.append(('包尾', hex_string(record.footer), '数据包结束标识 "$$$$"'))
+        rows.append(('包长度', f'{record.packet_length} 字节', '包括包头、数据、包尾和校验和'))
         
         # 解析数据内容
-        self.parse_specific_content(content, checksum)
-        
-        # 自动滚动到最后一行
-        if self.auto_scroll_var.get() and self.parse_tree.get_children():
-            last_item = self.parse_tree.get_children()[-1]
-            self.parse_tree.see(last_item)
-            
-        # 如果启用了日志，保存解析信息
-        if self.save_logs_var.get():
-            analysis_log = f"数据包 #{self.packet_count} - 长度: {packet_length} 字节 - 时间: {timestamp}"
-            self.save_to_log("analysis", analysis_log)
+        self.parse_specific_content(record, rows)
+        self.parse_view.add(rows)
     
-    def parse_specific_content(self, content, received_checksum):
-        """解析具体数据内容"""
-        self.parse_tree.insert('', tk.END, values=('', '', ''))  # 空行分隔
-        self.parse_tree.insert('', tk.END, values=('解析数据', '', '根据协议解析的具体字段'))
-        
-        offset = 0
-        content_len = len(content)
-        
-        # 1. 解析有用数据长度 (数据头后1-2字节)
-        if content_len >= offset + 2:
-            data_length = (content[offset] << 8) | content[offset + 1]
-            self.parse_tree.insert('', tk.END, values=(f'有用数据长度 (0x{offset:02X}-0x{offset+1:02X})', 
-                                                      f'{data_length} 字节', 
-                                                      '数据头后两位表示的有用数据长度'))
-            offset += 2
-        else:
-            self.parse_tree.insert('', tk.END, values=('数据长度', '解析错误', '数据包长度不足'))
+    def parse_specific_content(self, record, rows):
+        """将解析出的具体数据内容添加到解析区的行列表"""
+        rows.append(('', '', ''))  # 空行分隔
+        rows.append(('解析数据', '', '根据协议解析的具体字段'))
+        
+        # 1. 有用数据长度、设备号、解析方式
+        if record.missing_field == '数据长度':
+            rows.append(('数据长度', '解析错误', '数据包长度不足'))
             return
-        
-        # 2. 解析设备号 (数据头后3字节)
-        if content_len >= offset + 1:  # 设备号是1字节
-            device_id = content[offset]
-            self.parse_tree.insert('', tk.END, values=(f'设备号 (0x{offset:02X})', 
-                                                      f'0x{device_id:02X} ({device_id})', 
-                                                      '数据头后第三位表示的设备标识'))
-            offset += 1
-        else:
-            self.parse_tree.insert('', tk.END, values=('设备号', '解析错误', '数据包长度不足'))
+        rows.append(('有用数据长度 (0x00-0x01)', 
+                                                  f'{record.data_length} 字节', 
+                                                  '数据头后两位表示的有用数据长度'))
+        if record.missing_field == '设备号':
+            rows.append(('设备号', '解析错误', '数据包长度不足'))
             return
-        
-        # 3. 解析数据解析方式 (数据头后4字节)
-        if content_len >= offset + 1:  # 解析方式是1字节
-            parse_mode = content[offset]
-            self.parse_tree.insert('', tk.END, values=(f'解析方式 (0x{offset:02X})', 
-                                                      f'0x{parse_mode:02X} ({parse_mode})', 
-                                                      '数据头后第四位表示的解析方式'))
-            offset += 1
-        else:
-            self.parse_tree.insert('', tk.END, values=('解析方式', '解析错误', '数据包长度不足'))
+        rows.append(('设备号 (0x02)', 
+                                                  f'0x{record.device_id:02X} ({record.device_id})', 
+                                                  '数据头后第三位表示的设备标识'))
+        if record.missing_field == '解析方式':
+            rows.append(('解析方式', '解析错误', '数据包长度不足'))
             return
+        parse_mode = record.parse_mode
+        rows.append(('解析方式 (0x03)', 
+                                                  f'0x{parse_mode:02X} ({parse_mode})', 
+                                                  '数据头后第四位表示的解析方式'))
         
-        # 4. 提取有用数据 (从数据头后第5位开始)
-        self.parse_tree.insert('', tk.END, values=('', '', ''))  # 空行分隔
-        self.parse_tree.insert('', tk.END, values=('有用数据', '', ''))
-        
-        # 检查是否有足够的有用数据
-        if content_len < offset + data_length:
-            self.parse_tree.insert('', tk.END, values=('数据完整性', '不完整', f'实际长度: {content_len - offset} 字节, 预期: {data_length} 字节'))
-            useful_data = content[offset:]
-        else:
-            useful_data = content[offset:offset + data_length]
-        
-        # 显示有用数据
-        useful_data_str = ' '.join(f'{b:02X}' for b in useful_data)
-        self.parse_tree.insert('', tk.END, values=('原始数据', useful_data_str, f'共 {len(useful_data)} 字节'))
+        # 2. 有用数据
+        rows.append(('', '', ''))  # 空行分隔
+        rows.append(('有用数据', '', ''))
         
-        # 如果启用了日志，保存原始数据
-        if self.save_logs_var.get():
-            self.save_to_log("analysis", f"原始数据: {useful_data_str}")
-        
-        # 5. 校验和验证
-        self.parse_tree.insert('', tk.END, values=('', '', ''))  # 空行分隔
-        self.parse_tree.insert('', tk.END, values=('校验和验证', '', ''))
+        useful_data = record.payload
+        if not record.complete:
+            rows.append(('数据完整性', '不完整', f'实际长度: {len(useful_data)} 字节, 预期: {record.data_length} 字节'))
         
-        # 计算有用数据的校验和
-        calculated_checksum = self.calculate_checksum(useful_data)
+        useful_data_str = hex_string(useful_data)
+        rows.append(('原始数据', useful_data_str, f'共 {len(useful_data)} 字节'))
         
-        # 显示接收的校验和和计算的校验和
-        received_checksum_str = ' '.join(f'{b:02X}' for b in received_checksum)
-        calculated_checksum_str = ' '.join(f'{b:02X}' for b in calculated_checksum)
+        # 3. 校验和验证
+        rows.append(('', '', ''))  # 空行分隔
+        rows.append(('校验和验证', '', ''))
         
-        self.parse_tree.insert('', tk.END, values=('接收校验和', received_checksum_str, '数据尾后的4字节校验和'))
-        self.parse_tree.insert('', tk.END, values=('计算校验和', calculated_checksum_str, '根据有用数据计算的校验和'))
+        received_checksum_str, calculated_checksum_str = checksum_strings(record)
+        checksum_valid = record.checksum_valid
         
-        # 验证校验和
-        checksum_valid = (received_checksum == calculated_checksum)
-        self.parse_tree.insert('', tk.END, values=('校验结果', '有效' if checksum_valid else '无效', '校验和匹配则数据有效'))
-        
-        # 如果启用了日志，保存校验和信息
-        if self.save_logs_var.get():
-            self.save_to_log("analysis", f"校验和 - 接收: {received_checksum_str}, 计算: {calculated_checksum_str}, 结果: {'有效' if checksum_valid else '无效'}")
+        rows.append(('接收校验和', received_checksum_str, '数据尾后的4字节校验和'))
+        rows.append(('计算校验和', calculated_checksum_str, '根据有用数据计算的校验和'))
+        rows.append(('校验结果', '有效' if checksum_valid else '无效', '校验和匹配则数据有效'))
         
-        # 6. 根据解析方式解析数据（仅当校验和有效时）
-        self.parse_tree.insert('', tk.END, values=('', '', ''))  # 空行分隔
-        self.parse_tree.insert('', tk.END, values=('数据解析', '', '根据解析方式解析的具体含义'))
+        # 4. 根据解析方式显示解码结果（仅当校验和有效时）
+        rows.append(('', '', ''))  # 空行分隔
+        rows.append(('数据解析', '', '根据解析方式解析的具体含义'))
         
         if not checksum_valid:
-            self.parse_tree.insert('', tk.END, values=('解析提示', '', '校验和无效，不进行数据解析'))
+            rows.append(('解析提示', '', '校验和无效，不进行数据解析'))
+            if self.pipeline and record.device_id is not None:
+                failures = self.pipeline.decoder.checksum_failures_by_device.get(record.device_id, 0)
+                rows.append(('校验失败次数', f'{failures} 包', f'设备 0x{record.device_id:02X} 本次连接累计'))
             self.update_status("校验和无效，不进行数据解析")
             return
         
         # 准备状态信息列表
         status_messages = []
         
-        # 根据解析方式解析数据
-        if parse_mode == 0x00:
-            # 解析方式0x00: 各种设备的命令状态
-            hex_str = ' '.join(f'{b:02X}' for b in useful_data)
+        if parse_mode in PARSE_MODE_NAMES and parse_mode != 0x00:
+            rows.append(('解析方式说明', '', PARSE_MODE_NAMES[parse_mode]))
             
-            # 匹配命令
-            status_message = ""
-            if hex_str == "00 02 00 00 00 00 02 00":
-                status_message = "热敏电阻开始采集"
-            elif hex_str == "00 02 01 00 00 00 02 00":
-                status_message = "热敏电阻采集完成"
-                self.workstatusflag = 0
-            elif hex_str == "00 02 00 00 00 00 02 01":
-                status_message = "铂电阻开始采集"
-            elif hex_str == "00 02 01 00 00 00 02 01":
-                status_message = "铂电阻采集完成"
-                self.workstatusflag = 0
-            elif hex_str == "00 02 00 00 00 00 02 02":
-                status_message = "热辐射开始采集"
-            elif hex_str == "00 02 01 00 00 00 02 02":
-                status_message = "热辐射采集完成"
-                self.workstatusflag = 0
-            elif hex_str == "00 02 00 00 00 00 02 03":
-                status_message = "流程1开始采集"
-            elif hex_str == "00 02 01 00 00 00 02 03":
-                status_message = "流程1采集完成"
-                self.workstatusflag = 0
-            else:
-                status_message = f"未知的命令: {hex_str}"
-                
+            # 如果勾选了自动清空，则先清空数据区域
+            if self.auto_clear_rawdata_var.get():
+                self.clear_data_dispaly()
+        
+        if record.error:
+            rows.append(('解析错误', '', record.error))
+            status_messages.append(f"解析错误: {record.error}")
+        
+        elif parse_mode == 0x00:
+            # 解析方式0x00: 各种设备的命令状态
+            status = record.values
             # 在解析树中显示
-            self.parse_tree.insert('', tk.END, values=('命令解析', hex_str, status_message))
-            status_messages.append(status_message)
-            
-            # 如果启用了日志，保存解析结果
-            if self.save_logs_var.get():
-                self.save_to_log("analysis", f"命令解析: {hex_str} - {status_message}")
+            status_hex = hex_string(record.payload)
+            rows.append(('命令解析', status_hex, status.message))
+            status_messages.append(status.message)
         
         # 解析方式01和02的处理
         elif parse_mode in (0x01, 0x02):
-            self.parse_tree.insert('', tk.END, values=('解析方式说明', '', 'LTC2413'))
-            
-            # 如果勾选了自动清空，则先清空数据区域
-            if self.auto_clear_rawdata_var.get():
-                self.clear_data_dispaly()
-            
             # 检查数据长度是否为4的倍数
             if len(useful_data) % 4 != 0:
-                self.parse_tree.insert('', tk.END, values=('解析警告', '', f'数据长度为{len(useful_data)}字节，不是4的倍数，无法完全解析'))
-                status_messages.append(f"解析警告: 数据长度为{len(useful_data)}字节，不是4的倍数，无法完全解析")
-                
-                # 如果启用了日志，保存警告
-                if self.save_logs_var.get():
-                    self.save_to_log("analysis", f"解析警告: 数据长度为{len(useful_data)}字节，不是4的倍数，无法完全解析")
+                warning = f'数据长度为{len(useful_data)}字节，不是4的倍数，无法完全解析'
+                rows.append(('解析警告', '', warning))
+                status_messages.append(f"解析警告: {warning}")
             
-            # 按4个字节一组进行处理
-            for i in range(0, len(useful_data), 4):
-                # 检查是否有足够的字节
-                if i + 3 >= len(useful_data):
-                    # 处理不完整的组
-                    byte_str = ' '.join([f'0x{b:02X}' for b in useful_data[i:]])
-                    self.parse_tree.insert('', tk.END, values=(f'数据组 #{i//4 + 1}', byte_str, '字节不足，无法拼接为32位数据'))
-                    # 在专用区域显示
-                    status_messages.append(f"数据组 #{i//4 + 1}: 字节不足，无法解析")
-                    continue
-                
-                combined, extracted_value, calculated_value, result = self.data_analy2(useful_data[i], useful_data[i + 1], useful_data[i + 2], useful_data[i + 3])
-                
+            for n, sample in enumerate(record.values):
                 # 显示详细解析过程
-                byte_str = ' '.join([f'0x{b:02X}' for b in useful_data[i:i+4]])
-                self.parse_tree.insert('', tk.END, values=(f'数据组 #{i//4 + 1}', byte_str, f'32位整数: {combined}'))
+                byte_str = ' '.join([f'0x{b:02X}' for b in useful_data[n * 4:n * 4 + 4]])
+                rows.append((f'数据组 #{n + 1}', byte_str, f'32位整数: {sample.combined}'))
                 
                 # 只在不是特殊值的情况下显示位提取信息
-                if combined not in (0x30000000, 0x20000000):
-                    self.parse_tree.insert('', tk.END, values=('', str(extracted_value), '提取位的十进制值'))
-                    self.parse_tree.insert('', tk.END, values=('', f'{calculated_value:.6f}', f'计算结果'))
-                    status_messages.append(f"{hex(combined)[2:].upper()} {extracted_value} {calculated_value:.6f} {result}")
+                if sample.combined not in (LTC2413_OVER_RANGE, LTC2413_UNDER_RANGE):
+                    rows.append(('', str(sample.extracted), '提取位的十进制值'))
+                    rows.append(('', f'{sample.value:.6f}', f'计算结果'))
+                    status_messages.append(f"{hex(sample.combined)[2:].upper()} {sample.extracted} {sample.value:.6f} {sample.result}")
                 else:
-                    self.parse_tree.insert('', tk.END, values=('', '', calculated_value))
-                    status_messages.append(f"{hex(combined)[2:].upper()} {extracted_value} {calculated_value:.6f} {result}")
-                
-                
-        # 解析方式03的处理 - 优化版本
-        elif parse_mode == 0x03:
-            # 初始化数据数组，使用float类型
-            dndata = [0.0 for _ in range(54)]  # 46个数据点
-            vodata = [0.0 for _ in range(54)]  # 46个数据点
-            self.parse_tree.insert('', tk.END, values=('解析方式说明', '', '测试流程1'))
-            
-            # 如果勾选了自动清空，则先清空数据区域
-            if self.auto_clear_rawdata_var.get():
-                self.clear_data_dispaly()
-            group_index=0
-            datapar=0
-            ratimes=1;pttimes=1;rhtime=1
+                    rows.append(('', '', sample.value))
+                    status_messages.append(f"{hex(sample.combined)[2:].upper()} {sample.extracted} {sample.value} {sample.result}")
             
-            for i in range(0,4):
-                for j in range(0,5*ratimes):  # CHT1~CHT5 总共5次4位数据
-                    combined, dndata[group_index], vodata[group_index], result = self.data_analy2(
-                        useful_data[datapar], useful_data[datapar + 1], 
-                        useful_data[datapar + 2], useful_data[datapar + 3]
-                    )
-                    group_index += 1
-                    datapar += 4
-                    
-                for j in range(0,pttimes):  # CHPT 总共1次4位数据
-                    combined, dndata[group_index], vodata[group_index], result = self.data_analy2(
-                        useful_data[datapar], useful_data[datapar + 1], 
-                        useful_data[datapar + 2], useful_data[datapar + 3]
-                    )
-                    group_index += 1
-                    datapar += 4
-
-                for j in range(0,rhtime):  # CHRH 总共1次2位数据
-                    combined, dndata[group_index], vodata[group_index], result = self.data_analy1(
-                        useful_data[datapar], 
-                        useful_data[datapar+ 1]
-                    )
-                    group_index += 1
-                    datapar += 2
-
+            # 处理不完整的组
+            if len(useful_data) % 4:
+                n = len(record.values)
+                byte_str = ' '.join([f'0x{b:02X}' for b in useful_data[n * 4:]])
+                rows.append((f'数据组 #{n + 1}', byte_str, '字节不足，无法拼接为32位数据'))
+                status_messages.append(f"数据组 #{n + 1}: 字节不足，无法解析")
                 
-                # CHB1~CHB5 总共5次4位数据
-                for j in range(0,5*ratimes):  
-                    combined, dndata[group_index], vodata[group_index], result = self.data_analy2(
-                        useful_data[datapar], useful_data[datapar + 1], 
-                        useful_data[datapar + 2], useful_data[datapar + 3]
-                    )
-                    group_index += 1
-                    datapar += 4
-            
-            print(group_index,datapar) 
-            vodata[group_index+1] = int(useful_data[datapar],16)
-            vodata[group_index+2] = int(useful_data[datapar+1],16)
-            
-            # 在专用区域显示vodata数据
-            timestamp = time.strftime("%H:%M:%S")
-            row_data = [f'{self.packet_count}', timestamp]
-            
-            # 映射vodata到表格列（根据实际需求调整映射关系）
-            # 这里简单映射前44个数据到表格的各个字段
-            column_mapping = [
-                # CH1 数据 (索引0-11)
-                0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11,
-                # CH2 数据 (索引12-23)
-                12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23,
-                # CH3 数据 (索引24-35)
-                24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35,
-                # CH4 数据 (索引36-47)
-                36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47,
-                # T H
-                48, 49,
-            ]
-            
-            # 填充表格数据
-            for i, data_idx in enumerate(column_mapping):
-                if data_idx < len(vodata):
-                    row_data.append(f'{vodata[data_idx]:.6f}' if isinstance(vodata[data_idx], float) else str(vodata[data_idx]))
-                else:
-                    row_data.append('N/A')
-            
-            self.result_data_display.insert('', tk.END, values=tuple(row_data))
-            
-            # 自动滚动到最新数据
-            if self.result_data_display.get_children():
-                last_item = self.result_data_display.get_children()[-1]
-                self.result_data_display.see(last_item)
-            
-            # 在parse_specific_content方法中调用时修改为:
-            # 准备要保存的数据，包含数据包索引和时间戳
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            save_vodata = [self.packet_count, timestamp] + vodata
-            save_dndata = [self.packet_count, timestamp] + dndata
+        # 解析方式03的处理
+        elif parse_mode == 0x03:
+            vodata = record.values.vodata
             
-            self.save_data_csv(save_vodata, 'vodata')
-            self.save_data_csv(save_dndata, 'dndata')
+            # 在专用区域显示vodata数据，列顺序与 FLOW1_SCHEMA 一致（已在接收时保存到CSV）
+            timestamp = time.strftime("%H:%M:%S", time.localtime(record.timestamp))
+            row_data = [f'{record.index}', timestamp]
+            row_data.extend(f'{v:.6f}' if isinstance(v, float) else str(v) for v in vodata)
+            self.result_view.add([tuple(row_data)])
+            self.strip_chart.add(record.timestamp, vodata)
             status_messages.append(f"共 {len(useful_data)} 字节")
                 
         # 解析方式04, 05, 07的处理
         elif parse_mode in (0x07, 0x04, 0x05):
-            self.parse_tree.insert('', tk.END, values=('解析方式说明', '', '12bit_ADC计算'))
-            
-            # 如果勾选了自动清空，则先清空数据区域
-            if self.auto_clear_rawdata_var.get():
-                self.clear_data_dispaly()
-            
             # 检查数据长度是否为偶数
             if len(useful_data) % 2 != 0:
-                self.parse_tree.insert('', tk.END, values=('解析警告', '', f'数据长度为{len(useful_data)}字节，不是偶数，无法完全解析'))
+                rows.append(('解析警告', '', f'数据长度为{len(useful_data)}字节，不是偶数，无法完全解析'))
             
-            # 按两个字节一组进行处理
-            for i in range(0, len(useful_data), 2):
-                if i + 1 >= len(useful_data):
-                    # 处理最后一个单独的字节
-                    byte_str = f'0x{useful_data[i]:02X}'
-                    self.parse_tree.insert('', tk.END, values=(f'数据组 #{i//2 + 1}', byte_str, '只有一个字节，无法拼接'))
-                    # 在专用区域显示
-                    status_messages.append(f"数据组 #{i//2 + 1}: 字节不足，无法解析")
-                    continue
-
-                # 使用数据解析方法计算结果
-                combined1, combined2, result1, result2 = self.data_analy1(useful_data[i], useful_data[i + 1])
-                
+            for n, sample in enumerate(record.values):
                 # 显示详细解析过程
-                byte_str = f'0x{useful_data[i]:02X} 0x{useful_data[i+1]:02X}'
-                self.parse_tree.insert('', tk.END, values=(f'数据组 #{i//2 + 1}', byte_str, f'拼接值: 0x{combined1:04X} ({combined1})'))
-                self.parse_tree.insert('', tk.END, values=('', f'{result1:.6f}', f'计算结果: {combined1} / 4096 × 3.258 = {result1:.6f}'))
-                status_messages.append(f"{hex(combined1)[2:].upper()} {combined2} {result1:.6f} {result2:.6f}")          
+                byte_str = f'0x{useful_data[n * 2]:02X} 0x{useful_data[n * 2 + 1]:02X}'
+                rows.append((f'数据组 #{n + 1}', byte_str, f'拼接值: 0x{sample.combined:04X} ({sample.combined})'))
+                rows.append(('', f'{sample.value:.6f}', f'计算结果: {sample.combined} / 4096 × 3.258 = {sample.value:.6f}'))
+                status_messages.append(f"{hex(sample.combined)[2:].upper()} {sample.combined} {sample.value:.6f} {sample.value:.6f}")
+            
+            # 处理最后一个单独的字节
+            if len(useful_data) % 2:
+                n = len(record.values)
+                rows.append((f'数据组 #{n + 1}', f'0x{useful_data[-1]:02X}', '只有一个字节，无法拼接'))
+                status_messages.append(f"数据组 #{n + 1}: 字节不足，无法解析")
                 
         else:
             # 未知解析方式
-            self.parse_tree.insert('', tk.END, values=('解析方式说明', '', f'未知解析方式: 0x{parse_mode:02X}'))
-            self.parse_tree.insert('', tk.END, values=('原始数据', ' '.join(f'{b:02X}' for b in useful_data), ''))
+            rows.append(('解析方式说明', '', f'未知解析方式: 0x{parse_mode:02X}'))
+            rows.append(('原始数据', useful_data_str, ''))
             status_messages.append(f"收到未知解析方式: 0x{parse_mode:02X}")
         
         # 将解析结果添加到状态栏
         for msg in status_messages:
             self.update_status(msg)
     
-    def data_analy1(self, high_byte, low_byte):
-        """计算12位ADC数据，公式：(高字节<<8 | 低字节) / 4096 * 3.258"""
-        combined = (high_byte << 8) | low_byte
-        calculated_value = 3.258 * combined / 4096
-        return combined, combined, calculated_value, calculated_value
-    
-    def rh_data_analy(self, high_byte, low_byte):
-        """计算温湿度数据"""
-        combined = (high_byte << 8) | low_byte
-        calculated_value = 3.258 * combined / 4096
-        return combined, combined, calculated_value, calculated_value
-    
-    def data_analy2(self, useful_data1, useful_data2, useful_data3, useful_data4):
-        """计算LTC2413数据"""
-        combined = (useful_data1 << 24) | (useful_data2 << 16) | (useful_data3 << 8) | useful_data4       
-        if combined == 0x30000000:
-            calculated_value = "超出上限"
-            extracted_value = "N/A"
-            result = "超出测量范围"
-        elif combined == 0x20000000:
-            calculated_value = "超出下限"
-            extracted_value = "N/A"
-            result = "超出测量范围"
-        else:
-            # 转换为32位二进制字符串
-            binary_str = f"{combined:032b}"
-            
-            # 提取第4到27位
-            extracted_bits = binary_str[3:27]
-            extracted_value = int(extracted_bits, 2)
-            
-            # 计算结果
-            if binary_str[2] == '1':
-                calculated_value = extracted_value * 5 / 16777216
-            else:
-                calculated_value = 5 - extracted_value * 5 / 16777216
-            result = f"{calculated_value:.6f}"
-        return combined, extracted_value, calculated_value, result
-    
     def display_received_data(self, data):
-        """显示接收到的数据"""
-        self.receive_text.config(state=tk.NORMAL)
-        
-        # 如果勾选了自动清空，则先清空
-        if self.auto_clear_var.get():
-            self.receive_text.delete(1.0, tk.END)
-        
-        # 添加时间戳
-        if self.timestamp_receive_var.get():
-            timestamp = time.strftime("%H:%M:%S")
-            self.receive_text.insert(tk.END, f"[{timestamp}] ")
+        """显示接收到的数据（由接收区批量刷新，接收日志已在事件循环线程中保存）"""
+        prefix = f"[{time.strftime('%H:%M:%S')}] " if self.timestamp_receive_var.get() else ""
         
         # 以十六进制或ASCII显示
-        log_content = ""
         if self.hex_receive_var.get():
-            hex_str = binascii.hexlify(data).decode('utf-8')
-            # 每两个字符添加一个空格，方便阅读
-            hex_str = ' '.join([hex_str[i:i+2] for i in range(0, len(hex_str), 2)])
-            self.receive_text.insert(tk.END, hex_str + "\n")
-            log_content = hex_str
+            log_content = data.hex(' ')
+            text = f"{prefix}{log_content}\n"
         else:
-            try:
-                # 尝试以ASCII解码
-                text = data.decode('utf-8', errors='replace')
-                self.receive_text.insert(tk.END, text)
-                log_content = text
-            except:
-                # 解码失败则显示十六进制
-                hex_str = binascii.hexlify(data).decode('utf-8')
-                hex_str = ' '.join([hex_str[i:i+2] for i in range(0, len(hex_str), 2)])
-                self.receive_text.insert(tk.END, f"(二进制数据: {hex_str})\n")
-                log_content = f"(二进制数据: {hex_str})"
-        
-        # 如果启用了日志，保存接收数据
-        if self.save_logs_var.get():
-            self.save_to_log("receive", log_content)
+            log_content = data.decode('utf-8', errors='replace')
+            text = f"{prefix}{log_content}"
         
-        self.receive_text.see(tk.END)
-        self.receive_text.config(state=tk.DISABLED)
+        # 如果勾选了自动清空，则只显示最新数据
+        self.receive_view.add(text, replace=self.auto_clear_var.get())
     
     def update_status(self, message):
-        """更新状态输出区域的内容"""
-        self.status_text.config(state=tk.NORMAL)
-        
-        # 如果勾选了自动清空，则先清空
-        if self.auto_clear_status_var.get():
-            self.status_text.delete(1.0, tk.END)
-        
+        """更新状态输出区域的内容（由状态输出区批量刷新）"""
         # 添加时间戳
         timestamp = time.strftime("%H:%M:%S")
         status_line = f"[{timestamp}] {message}\n"
-        self.status_text.insert(tk.END, status_line)
+        
+        # 如果勾选了自动清空，则只显示最新状态
+        self.status_view.add(status_line, replace=self.auto_clear_status_var.get())
         
         # 如果启用了日志，保存状态信息
         if self.save_logs_var.get():
             self.save_to_log("status", message)
-        
-        self.status_text.see(tk.END)
-        self.status_text.config(state=tk.DISABLED)
+    
+    def archive_parse_rows(self, groups):
+        """将移出解析区的旧解析结果写入解析日志"""
+        if not self.save_logs_var.get():
+            return
+        lines = ['\t'.join(str(v) for v in row) for rows in groups for row in rows]
+        self.save_to_log("parse", '\n'.join(lines))
     
     def clear_status(self):
         """清空状态输出区域"""
-        self.status_text.config(state=tk.NORMAL)
-        self.status_text.delete(1.0, tk.END)
-        self.status_text.config(state=tk.DISABLED)
+        self.status_view.clear()
     
     def clear_data_dispaly(self):
         """清空数据显示区域"""
-        for item in self.result_data_display.get_children():
-            self.result_data_display.delete(item)
+        self.result_view.clear()
         self.update_status("数据显示已清空")
     
     def send_data(self):
@@ -1275,8 +1264,8 @@ class RS485Tool:
                 send_bytes = data.encode('utf-8')
                 data_str = data
             
-            # 发送数据
-            self.ser.write(send_bytes)
+            # 发送数据（在串口传输的事件循环中写入）
+            self.pipeline.send(send_bytes).result(SEND_TIMEOUT)
             send_msg = f"已发送 {len(send_bytes)} 字节: {data_str}"
             self.log_message(send_msg)
             self.update_status(send_msg)
@@ -1289,7 +1278,6 @@ class RS485Tool:
             logging.error(error_msg)
     
     def send_control_command(self, hex_data):
-        self.workstatusflag = 1
         """发送控制指令"""
         if not self.is_connected or not self.ser or not self.ser.is_open:
             messagebox.showwarning("警告", "请先连接设备")
@@ -1304,8 +1292,8 @@ class RS485Tool:
             data = hex_data.replace(' ', '')
             send_bytes = binascii.unhexlify(data)
             
-            # 发送数据
-            self.ser.write(send_bytes)
+            # 发送数据（在串口传输的事件循环中写入）
+            self.pipeline.send(send_bytes).result(SEND_TIMEOUT)
             send_msg = f"已发送指令: {hex_data} ({len(send_bytes)} 字节)"
             self.log_message(send_msg)
             logging.info(send_msg)
@@ -1320,11 +1308,12 @@ class RS485Tool:
             logging.error(error_msg)
     
     def load_commands(self):
-        """加载保存的命令"""
+        """加载保存的命令: {"工作流程名": "8字节十六进制指令"}"""
         try:
             if os.path.exists("commands.json"):
                 with open("commands.json", 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    commands = json.load(f)
+                return commands if isinstance(commands, dict) else {}
             return {}
         except Exception as e:
             logging.error(f"加载命令失败: {str(e)}")
@@ -1349,6 +1338,10 @@ class RS485Tool:
                 "stopbits": self.stopbits_var.get(),
                 "parity": self.parity_var.get(),
                 "save_logs": self.save_logs_var.get(),
+                "save_binary": self.save_binary_var.get(),
+                "binary_dtype": self.binary_dtype_var.get(),
+                "save_capture": self.save_capture_var.get(),
+                "export_metrics": self.export_metrics_var.get(),
                 "log_path": self.log_path_var.get()
             }
             with open("settings.json", 'w', encoding='utf-8') as f:
@@ -1369,6 +1362,10 @@ class RS485Tool:
                     self.parity_var.set(settings.get("parity", "N"))
                     # 加载日志设置
                     self.save_logs_var.set(settings.get("save_logs", True))
+                    self.save_binary_var.set(settings.get("save_binary", False))
+                    self.binary_dtype_var.set(settings.get("binary_dtype", "float64"))
+                    self.save_capture_var.set(settings.get("save_capture", False))
+                    self.export_metrics_var.set(settings.get("export_metrics", False))
                     # 加载日志路径设置
                     saved_path = settings.get("log_path")
                     if saved_path and os.path.exists(saved_path):
@@ -1378,9 +1375,20 @@ class RS485Tool:
     
     def clear_receive(self):
         """清空接收区"""
-        self.receive_text.config(state=tk.NORMAL)
-        self.receive_text.delete(1.0, tk.END)
-        self.receive_text.config(state=tk.DISABLED)
+        self.receive_view.clear()
+    
+    def on_pause_receive_toggle(self):
+        """暂停/恢复接收区显示"""
+        self.receive_view.paused = self.pause_receive_var.get()
+    
+    def update_plot_fields(self):
+        """按选中的信号和通道设置实时曲线"""
+        signal = self.plot_signal_var.get()
+        self.strip_chart.set_fields([f"CH{ch}{signal}" for ch, var in self.plot_channel_vars.items() if var.get()])
+    
+    def on_pause_plot_toggle(self):
+        """暂停/恢复实时曲线刷新（数据仍写入缓冲区）"""
+        self.strip_chart.paused = self.pause_plot_var.get()
     
     def clear_send(self):
         """清空发送区"""
@@ -1388,118 +1396,142 @@ class RS485Tool:
     
     def clear_parse_results(self):
         """清空解析结果"""
-        for item in self.parse_tree.get_children():
-            self.parse_tree.delete(item)
-        self.packet_count = 0  # 重置数据包计数器
+        self.parse_view.clear()
+        # 数据包计数器在事件循环线程中递增，也在该线程中重置
+        pipeline = self.pipeline
+        if pipeline is None:
+            self.reset_packet_count()
+        else:
+            try:
+                pipeline.loop.call_soon_threadsafe(self.reset_packet_count)
+            except RuntimeError:
+                self.reset_packet_count()  # 事件循环已关闭
         self.packet_info_var.set("解析结果已清空")
         self.update_status("解析结果已清空")
     
+    def reset_packet_count(self):
+        """重置数据包计数器（连接时在事件循环线程中调用）"""
+        self.packet_count = 0
+    
     def log_message(self, message):
-        """在接收区添加日志消息"""
-        self.receive_text.config(state=tk.NORMAL)
+        """在接收区添加日志消息（可在任意线程调用）"""
         timestamp = time.strftime("%H:%M:%S")
-        log_line = f"[{timestamp}] [系统] {message}\n"
-        self.receive_text.insert(tk.END, log_line)
+        self.receive_view.add(f"[{timestamp}] [系统] {message}\n")
         
         # 如果启用了日志，保存系统消息
-        if self.save_logs_var.get():
-            self.save_to_log("receive", f"[系统] {message}")
-            
-        self.receive_text.see(tk.END)
-        self.receive_text.config(state=tk.DISABLED)
+        self.save_to_log("receive", f"[系统] {message}")
+    
+    def create_table_writer(self, filename):
+        """创建CSV数据写入器，表头只生成一次（在Tk线程中调用）"""
+        data_path = self.ensure_data_folder_exists()
+        if not data_path:
+            return None
+        headers = FLOW1_CSV_HEADERS if filename in FLOW1_TABLES else None
+        writer = TableWriter(data_path, filename, headers, time_column=1,
+                             binary=self.save_binary_var.get(),
+                             column_type='f' if self.binary_dtype_var.get() == "float32" else 'd',
+                             metrics=self.metrics)
+        status_msg = f"{filename} 数据保存到: {os.path.join(data_path, f'<日期>_{filename}.csv')}"
+        self.log_message(status_msg)
+        logging.info(status_msg)
+        return writer
+    
+    def open_table_writers(self):
+        """按当前路径和设置创建 vodata/dndata 写入器，替换后再关闭原来的写入器"""
+        writers = {}
+        for filename in FLOW1_TABLES:
+            writer = self.create_table_writer(filename)
+            if writer:
+                writers[filename] = writer
+        old_writers, self.table_writers = self.table_writers, writers
+        for writer in old_writers.values():
+            writer.close()
+    
+    def open_capture(self):
+        """开始记录原始二进制数据: RS_<日期>_<时间>.bin/.chunks/.idx"""
+        data_path = self.ensure_data_folder_exists()
+        if not data_path:
+            return
+        name = f"RS_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.capture_writer = CaptureWriter(data_path, name, metrics=self.metrics)
+        status_msg = f"原始数据保存到: {os.path.join(data_path, name)}.bin"
+        self.log_message(status_msg)
+        logging.info(status_msg)
+    
+    def close_capture(self):
+        """写入剩余原始数据并关闭记录文件"""
+        if self.capture_writer:
+            self.capture_writer.close()
+            self.capture_writer = None
+    
+    def open_metrics_exporter(self):
+        """开始定期保存性能指标: RS_<日期>_metrics.jsonl"""
+        data_path = self.ensure_data_folder_exists()
+        if not data_path:
+            return
+        self.metrics_exporter = MetricsExporter(self.metrics, data_path, interval=METRICS_EXPORT_INTERVAL)
+        status_msg = f"性能指标保存到: {os.path.join(data_path, 'RS_<日期>_metrics.jsonl')}"
+        self.log_message(status_msg)
+        logging.info(status_msg)
+    
+    def close_metrics_exporter(self):
+        """写入最后一条性能指标并停止"""
+        if self.metrics_exporter:
+            self.metrics_exporter.close()
+            self.metrics_exporter = None
+    
+    def refresh_metrics(self):
+        """定时刷新性能指标显示"""
+        if self.is_connected:
+            self.metrics_var.set(self.metrics.summary())
+        self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
+    
+    def close_table_writers(self):
+        """写入剩余CSV数据并关闭文件"""
+        old_writers, self.table_writers = self.table_writers, {}
+        for writer in old_writers.values():
+            writer.close()
     
     def save_data_csv(self, data, filename):
         """
-        根据提供的数据和文件名保存CSV数据
+        根据提供的数据和文件名保存CSV数据（由后台线程批量写入，可在任意线程调用）
         
         参数:
-            data: 要保存的数据，格式应为列表或列表的列表
-            filename: 要保存的文件名（不包含路径）
+            data: 要保存的数据，格式应为列表或列表的列表，第2列为 time.time() 时间戳
+            filename: 要保存的文件名（不包含路径和日期）
         """
         # 数据验证
         if not data:
-            self.update_status("没有数据可保存到CSV")
+            self.log_message("没有数据可保存到CSV")
             return
             
-        try:
-            # 确保data文件夹存在
-            data_path = self.ensure_data_folder_exists()
-            if not data_path:
-                return
-            # 完整文件路径
-            full_path = os.path.join(data_path, f"{self.log_timestamp}_{filename}.csv")
-            file_exists = os.path.exists(full_path)
+        # 数据格式标准化 - 确保是二维列表
+        if isinstance(data, (list, tuple)):
+            if not isinstance(data[0], (list, tuple)):
+                data = [data]  # 转换为二维列表
+        else:
+            self.log_message(f"保存CSV失败：数据格式不正确，应为列表类型")
+            return
             
-            # 数据格式标准化 - 确保是二维列表
-            if isinstance(data, (list, tuple)):
-                if not isinstance(data[0], (list, tuple)):
-                    data = [data]  # 转换为二维列表
+        # 验证数据行长度一致性
+        row_length = len(data[0])
+        valid_data = []
+        for i, row in enumerate(data):
+            if len(row) != row_length:
+                self.log_message(f"保存CSV警告：第{i+1}行数据长度与表头不一致，已跳过此行")
             else:
-                self.log_message(f"保存CSV失败：数据格式不正确，应为列表类型")
-                return
-                
-            # 验证数据行长度一致性
-            row_length = len(data[0])
-            for i, row in enumerate(data):
-                if len(row) != row_length:
-                    self.log_message(f"保存CSV警告：第{i+1}行数据长度与表头不一致，已跳过此行")
-                    data[i] = []  # 标记为无效行
-            
-            # 过滤无效行
-            valid_data = [row for row in data if row]
-            if not valid_data:
-                self.log_message("保存CSV失败：所有数据行均无效")
-                return
-                
-            # 写入CSV文件
-            with open(full_path, 'a' if file_exists else 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # 如果文件不存在，写入表头
-                if not file_exists:
-                    # 为vodata和dndata创建适当的表头
-                    if filename in ['vodata', 'dndata']:
-                        headers = ['PacketIndex', 'Timestamp']
-                        # 添加CH1-CH4的各个数据项
-                        for ch in range(1, 5):
-                            # T1-T5
-                            for t in range(1, 6):
-                                headers.append(f'CH{ch}T{t}')
-                            # PT和R
-                            headers.append(f'CH{ch}PT')
-                            headers.append(f'CH{ch}R')
-                            # B1-B5
-                            for b in range(1, 6):
-                                headers.append(f'CH{ch}B{b}')
-                        # 添加环境数据
-                        headers.extend(['RT', 'MT', 'RH', 'MH'])
-                        
-                        # 验证表头长度与数据长度是否匹配
-                        if len(headers) != len(valid_data[0]):
-                            self.log_message(
-                                f"CSV表头与数据长度不匹配：表头{len(headers)}列，数据{len(valid_data[0])}列"
-                            )
-                            
-                        writer.writerow(headers)
-                
-                # 写入数据行
-                row_count = len(valid_data)
-                writer.writerows(valid_data)
-            
-            status_msg = f"数据已{'追加到' if file_exists else '保存到'}: {full_path}，共{row_count}行"
-            self.log_message(status_msg)
-            logging.info(status_msg)
-            
-        except PermissionError:
-            error_msg = f"保存CSV数据失败：没有文件写入权限 - {full_path}"
-            self.update_status(error_msg)
-            logging.error(error_msg)
-            messagebox.showerror("权限错误", f"无法写入文件：\n{full_path}\n请检查文件权限")
-        except Exception as e:
-            error_msg = f"保存CSV数据失败: {str(e)}"
-            self.update_status(error_msg)
-            logging.error(error_msg)
-
+                valid_data.append(row)
+        
+        writer = self.table_writers.get(filename)
+        if writer is None:
+            return
+        
+        # 验证表头长度与数据长度是否匹配（每个文件只提示一次）
+        if writer.headers and len(writer.headers) != row_length and filename not in self.csv_length_warned:
+            self.csv_length_warned.add(filename)
+            self.log_message(f"CSV表头与数据长度不匹配：表头{len(writer.headers)}列，数据{row_length}列")
+        
+        writer.write_rows(valid_data)
 
     def on_close(self):
         """关闭窗口时的处理"""
@@ -1508,6 +1540,8 @@ class RS485Tool:
             self.save_to_log("status", "程序已关闭")
             
         self.disconnect()
+        self.close_table_writers()
+        self.log_writer.close()
         self.root.destroy()
 
 
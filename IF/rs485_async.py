@@ -0,0 +1,340 @@
+"""
+基于 asyncio 的串口传输
+
+串口在独立线程的事件循环中读取，数据到达时立即唤醒，不轮询：
+    POSIX:   loop.add_reader(ser.fileno()) ，可读时非阻塞读取
+    其他系统: 在线程池中阻塞读取，停止时用 ser.cancel_read() 唤醒
+
+读到的数据经 PacketDecoder 分帧解码，交给异步消费者 consumer(类型, 接收时间, 内容)。
+消费者跟不上时不丢数据：有界的读取队列满后暂停读取，数据留在串口驱动的缓冲区，
+队列降到一半以下再恢复。保存数据应在消费者中（事件循环线程）完成；
+默认消费者把结果放入有界队列，由界面线程 drain()，队列满时等待界面处理。
+只用于显示的结果用 offer() 放入同一队列，队列满时丢弃，不阻塞接收。
+request() 发送指令并等待匹配的应答数据包，应答在事件循环中直接匹配，不经过界面线程。
+写串口可能阻塞（驱动发送缓冲区满、流控），在线程池中执行并按顺序逐个写入，不阻塞事件循环。
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+from rs485_protocol import PacketDecoder
+
+READ_SIZE = 65536  # 单次最多读取的字节数
+RESULT_RETRY = 0.01  # 默认消费者在结果队列满时重试的间隔（秒）
+
+
+class AsyncSerialTransport:
+    """
+    事件驱动的串口接收/发送
+
+    ser 为已打开的 serial.Serial；consumer 为可选的协程函数，参数为
+    (类型, 接收时间, 内容)，类型为 'raw'、'record' 或 'error'。
+    frame_queue_size 为等待消费者处理的读取次数上限，达到后暂停读取。
+    capture 为 rs485_storage.CaptureWriter 时，每次读到的数据在进入读取队列前写入原始记录。
+    loop 为已在其他线程运行的事件循环时，多个串口共用该循环，不另开线程。
+    metrics 为 rs485_metrics.Metrics 时记录读取字节数和暂停读取次数，并登记消费队列和结果队列的深度。
+    """
+
+    def __init__(self, ser, decoder=None, consumer=None, frame_queue_size=1024,
+                 result_queue_size=2048, late_after=1.0, loop=None, metrics=None, capture=None):
+        self.ser = ser
+        self.decoder = decoder or PacketDecoder(metrics=metrics)
+        self.metrics = metrics
+        self.capture = capture
+        self.consumer = consumer or self._queue_result
+        self.frame_queue_size = frame_queue_size
+        self.result_queue = queue.Queue(result_queue_size)
+        self.late_after = late_after  # 接收后超过该秒数才显示的数据包计为延迟
+        self.loop = loop
+        self.own_loop = loop is None
+        self.thread = None
+        self.running = False
+        self.use_reader = False  # 是否使用 add_reader
+        self.paused = False  # 读取队列满，已暂停 add_reader
+        self._frames = None  # 事件循环内的 asyncio.Queue
+        self._tasks = []
+        self._waiters = []  # 等待应答: (匹配函数, Future)
+        self._write_lock = None  # 事件循环内的 asyncio.Lock，保证各次写入不交错
+        self._ready = threading.Event()
+
+        # 统计信息
+        self.bytes_read = 0
+        self.chunks_read = 0
+        self.records = 0
+        self.read_pauses = 0  # 因消费者跟不上而暂停读取的次数
+        self.dropped_results = 0  # 停止时界面未取走的结果
+        self.dropped_display = 0  # offer() 时结果队列满而未显示的结果
+        self.late_records = 0
+        self.backlog_peak = 0
+        self.bytes_written = 0
+
+    # ---- 在其他线程中调用 ----
+
+    def start(self):
+        """启动事件循环线程（或加入共用的事件循环），开始接收"""
+        self.running = True
+        if self.own_loop:
+            self.thread = threading.Thread(target=self._run_loop, daemon=True)
+            self.thread.start()
+        else:
+            self.loop.call_soon_threadsafe(self._attach)
+        self._ready.wait()
+
+    def stop(self, timeout=1.0):
+        """停止接收，处理完已读到的数据后退出事件循环"""
+        if not self.running:
+            return
+        self.running = False
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        try:
+            future.result(timeout)
+        except Exception as e:
+            logging.error(f"停止串口接收失败: {str(e)}")
+            # 消费者未能按时处理完：取消剩余任务并等它们结束，再停止事件循环
+            future.cancel()
+            try:
+                asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self.loop).result(timeout)
+            except Exception as e:
+                logging.error(f"取消串口接收任务失败: {str(e)}")
+        if self.own_loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self.thread is not threading.current_thread():
+                self.thread.join(timeout)
+
+    def send(self, data):
+        """发送数据（在事件循环中写入），返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self.send_async(data), self.loop)
+
+    def request(self, data, match, timeout=5.0):
+        """
+        发送指令并等待第一个 match(record) 为真的数据包
+
+        返回 concurrent.futures.Future，结果为应答的 PacketRecord；
+        超时则抛出 asyncio.TimeoutError。
+        """
+        return asyncio.run_coroutine_threadsafe(self.request_async(data, match, timeout), self.loop)
+
+    def drain(self, max_items=500):
+        """取出最多 max_items 个结果（在界面线程中调用）"""
+        items = []
+        now = time.time()
+        for _ in range(max_items):
+            try:
+                item = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == 'record' and now - item[1] > self.late_after:
+                self.late_records += 1
+            items.append(item)
+        return items
+
+    def stats(self):
+        """返回统计信息"""
+        return {
+            'bytes_read': self.bytes_read,
+            'chunks_read': self.chunks_read,
+            'records': self.records,
+            'read_pauses': self.read_pauses,
+            'dropped_results': self.dropped_results,
+            'dropped_display': self.dropped_display,
+            'late_records': self.late_records,
+            'backlog_peak': self.backlog_peak,
+            'bytes_written': self.bytes_written,
+            'checksum_failures': self.decoder.checksum_failures,
+            'checksum_failures_by_device': dict(self.decoder.checksum_failures_by_device),
+            'result_queue': self.result_queue.qsize(),
+        }
+
+    # ---- 在事件循环中运行 ----
+
+    def offer(self, kind, received, item):
+        """放入结果队列供界面显示，队列满时丢弃并计数（只用于显示的结果）"""
+        try:
+            self.result_queue.put_nowait((kind, received, item))
+        except queue.Full:
+            self.dropped_display += 1
+
+    async def send_async(self, data):
+        """在线程池中写入串口，等待写完"""
+        async with self._write_lock:
+            await self.loop.run_in_executor(None, self.ser.write, data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    async def request_async(self, data, match, timeout=5.0):
+        """发送指令并等待匹配的应答数据包"""
+        future = self.loop.create_future()
+        waiter = (match, future)
+        self._waiters.append(waiter)
+        try:
+            await self.send_async(data)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _run_loop(self):
+        """事件循环线程"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._attach()
+        try:
+            self.loop.run_forever()
+        finally:
+            # 取消仍未结束的任务（如等待写入的 send），避免关闭时留下挂起的任务
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def _attach(self):
+        """在事件循环中注册读取和消费任务"""
+        self._frames = asyncio.Queue(self.frame_queue_size)
+        self._write_lock = asyncio.Lock()
+        if self.metrics is not None:
+            self.metrics.gauge('frame_queue', self._frames.qsize)
+            self.metrics.gauge('result_queue', self.result_queue.qsize)
+        self._tasks.append(self.loop.create_task(self._consume()))
+        try:
+            fd = self.ser.fileno() if os.name == 'posix' else None
+        except (AttributeError, OSError):
+            fd = None
+        if fd is not None:
+            self.ser.timeout = 0  # 只在可读时读取，不阻塞
+            self.loop.add_reader(fd, self._on_readable)
+            self.use_reader = True
+        else:
+            self.ser.timeout = None  # 阻塞到有数据，停止时由 cancel_read 唤醒
+            self._tasks.append(self.loop.create_task(self._read_in_executor()))
+        self.loop.call_soon(self._ready.set)
+
+    def _on_readable(self):
+        """add_reader 回调：串口可读（只在读取队列未满时注册）"""
+        try:
+            data = self.ser.read(READ_SIZE)
+        except Exception as e:
+            self.loop.remove_reader(self.ser.fileno())
+            self._frames.put_nowait(('error', time.time(), str(e)))
+            return
+        if data:
+            self._frames.put_nowait(self._handle_data(data))
+            self._check_backlog()
+
+    async def _read_in_executor(self):
+        """不支持 add_reader 时，在线程池中阻塞读取，读取队列满时等待消费者"""
+        while self.running:
+            try:
+                data = await self.loop.run_in_executor(None, self._blocking_read)
+            except Exception as e:
+                if self.running:
+                    await self._frames.put(('error', time.time(), str(e)))
+                return
+            if data:
+                await self._frames.put(self._handle_data(data))
+                self._check_backlog()
+
+    def _blocking_read(self):
+        """阻塞读取，至少1字节"""
+        return self.ser.read(max(1, self.ser.in_waiting))
+
+    def _handle_data(self, data):
+        """分帧解码并立即匹配等待中的应答，返回放入读取队列的一项"""
+        received = time.time()
+        self.bytes_read += len(data)
+        self.chunks_read += 1
+        if self.metrics is not None:
+            self.metrics.count('bytes_read', len(data))
+            self.metrics.count('chunks_read')
+        if self.capture is not None:
+            self.capture.write(received, data)
+        try:
+            records = self.decoder.feed(data)
+        except Exception as e:
+            logging.error(f"解码错误: {str(e)}")
+            records = []
+        for record in records:
+            self.records += 1
+            for match, future in list(self._waiters):
+                if not future.done() and match(record):
+                    future.set_result(record)
+        return 'read', received, (data, records)
+
+    def _check_backlog(self):
+        """记录积压峰值，读取队列满时暂停 add_reader"""
+        self.backlog_peak = max(self.backlog_peak, self._frames.qsize())
+        if self._frames.full() and self.use_reader and not self.paused:
+            self.loop.remove_reader(self.ser.fileno())
+            self.paused = True
+            self.read_pauses += 1
+            if self.metrics is not None:
+                self.metrics.count('read_pauses')
+
+    def _resume_reading(self):
+        """读取队列降到一半以下时恢复 add_reader"""
+        if self.paused and self.running and self._frames.qsize() <= self.frame_queue_size // 2:
+            self.paused = False
+            self.loop.add_reader(self.ser.fileno(), self._on_readable)
+
+    async def _consume(self):
+        """把接收结果依次交给消费者"""
+        while True:
+            kind, received, item = await self._frames.get()
+            try:
+                if kind == 'read':
+                    data, records = item
+                    await self._deliver('raw', received, data)
+                    for record in records:
+                        await self._deliver('record', received, record)
+                else:
+                    await self._deliver(kind, received, item)
+            finally:
+                self._frames.task_done()
+                self._resume_reading()
+
+    async def _deliver(self, kind, received, item):
+        """调用消费者，单个结果处理失败不影响后续结果"""
+        try:
+            await self.consumer(kind, received, item)
+        except Exception as e:
+            logging.error(f"处理接收数据失败: {str(e)}")
+
+    async def _queue_result(self, kind, received, item):
+        """默认消费者：放入界面线程的结果队列，队列满时等待界面处理；已停止时丢弃"""
+        while True:
+            try:
+                self.result_queue.put_nowait((kind, received, item))
+                return
+            except queue.Full:
+                if not self.running:
+                    self.dropped_results += 1
+                    return
+                await asyncio.sleep(RESULT_RETRY)
+
+    async def _shutdown(self):
+        """停止读取，等消费者处理完剩余数据"""
+        if self.metrics is not None:
+            self.metrics.remove_gauge('frame_queue', self._frames.qsize)
+            self.metrics.remove_gauge('result_queue', self.result_queue.qsize)
+        if self.use_reader and not self.paused:
+            self.loop.remove_reader(self.ser.fileno())
+        else:
+            try:
+                self.ser.cancel_read()
+            except Exception:
+                pass
+        for match, future in self._waiters:
+            if not future.done():
+                future.cancel()
+        await self._frames.join()
+        await self._cancel_tasks()
+
+    async def _cancel_tasks(self):
+        """取消读取和消费任务并等待结束"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -0,0 +1,301 @@
+"""
+RS-485 数据处理性能测试
+
+分帧、解码、日志写入、CSV写入和端到端（模拟设备 -> AsyncSerialTransport）
+各项分别统计吞吐量、单包耗时分位数和内存增长。结果可保存为JSON，
+下次用 -baseline 对比，吞吐量下降超过 -tolerance 时以返回码1退出，
+用于在修改数据处理代码后发现性能退化。
+
+用法:
+    python rs485_bench.py                       # 使用随机生成的数据包
+    python rs485_bench.py -size 64              # 生成64MB测试数据
+    python rs485_bench.py -f capture.bin        # 使用抓取的原始串口数据
+    python rs485_bench.py -save base.json       # 保存结果
+    python rs485_bench.py -baseline base.json   # 与保存的结果对比
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from rs485_protocol import PacketFramer, PacketDecoder, build_packet, decode_ltc2413, hex_string
+from rs485_numpy import decode_ltc2413_array, ARRAY_DECODERS
+from rs485_storage import LogWriter, TableWriter
+from rs485_sim import SimulatedDevice, SimulatedSerial, ALL_MODES
+from rs485_async import AsyncSerialTransport
+
+PERCENTILES = (50, 90, 99)
+
+
+def generate_traffic(size_mb, seed=0):
+    """生成指定大小的测试数据：随机长度的数据包夹杂少量噪声字节"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    chunks = []
+    total = 0
+    while total < target:
+        payload = rng.randbytes(rng.choice((8, 64, 186, 400, 1024)))
+        packet = build_packet(rng.randrange(256), rng.randrange(8), payload)
+        noise = rng.randbytes(rng.randrange(4)) if rng.random() < 0.1 else b''
+        chunks.append(noise + packet)
+        total += len(noise) + len(packet)
+    return b''.join(chunks)
+
+
+def load_captures(paths):
+    """读取原始二进制抓包文件"""
+    data = bytearray()
+    for path in paths:
+        with open(path, 'rb') as f:
+            data += f.read()
+    return bytes(data)
+
+
+def percentiles(samples, points=PERCENTILES):
+    """耗时样本（秒）的分位数，返回 {'p50': 微秒, ...}"""
+    if not samples:
+        return {f'p{p}': None for p in points}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {f'p{p}': ordered[min(last, round(last * p / 100))] * 1e6 for p in points}
+
+
+def measure_memory(func, *args):
+    """在 tracemalloc 下运行 func，返回 (峰值KB, 运行后仍占用KB)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return (peak - before) / 1024, (current - before) / 1024
+
+
+def bench_framer(data, chunk_size):
+    """按串口读取的块大小把数据喂给分帧器，统计吞吐量"""
+    framer = PacketFramer()
+    view = memoryview(data)
+    packets = 0
+    start = time.perf_counter()
+    for i in range(0, len(data), chunk_size):
+        packets += len(framer.feed(view[i:i + chunk_size]))
+    elapsed = time.perf_counter() - start
+    return packets, framer.discarded_bytes, elapsed
+
+
+def bench_ltc2413(size_mb, seed=0):
+    """比较LTC2413逐个样本解码与NumPy批量解码的耗时"""
+    payload = random.Random(seed).randbytes(int(size_mb * 1024 * 1024) // 4 * 4)
+    start = time.perf_counter()
+    decode_ltc2413(payload)
+    scalar = time.perf_counter() - start
+    start = time.perf_counter()
+    decode_ltc2413_array(payload)
+    vector = time.perf_counter() - start
+    return len(payload) // 4, scalar, vector
+
+
+def simulated_packets(count, modes=ALL_MODES, corrupt=0.01, seed=0):
+    """由模拟设备生成 count 个数据包，分帧后返回完整数据包列表"""
+    device = SimulatedDevice(modes, corrupt=corrupt, seed=seed)
+    return PacketFramer().feed(device.stream(count))
+
+
+def bench_decoder(packets, decoders=None):
+    """逐包解码，返回 (耗时, 单包耗时列表, 解码器)"""
+    decoder = PacketDecoder(decoders=decoders) if decoders else PacketDecoder()
+    timings = []
+    clock = time.perf_counter
+    start = clock()
+    for packet in packets:
+        t = clock()
+        decoder.decode(packet)
+        timings.append(clock() - t)
+    return clock() - start, timings, decoder
+
+
+def bench_log_writer(lines, directory):
+    """LogWriter: 返回 (write()调用耗时, 写完所有行的耗时, write()耗时列表)"""
+    writer = LogWriter(directory, prefix='bench', flush_interval=0.2)
+    timings = []
+    clock = time.perf_counter
+    start = clock()
+    for line in lines:
+        t = clock()
+        writer.write('receive', line)
+        timings.append(clock() - t)
+    queued = clock() - start
+    writer.close(timeout=60)
+    return queued, clock() - start, timings
+
+
+def bench_table_writer(rows, directory, binary=False):
+    """TableWriter: 返回 (write()调用耗时, 写完所有行的耗时, write()耗时列表)"""
+    writer = TableWriter(directory, 'bench', headers=[f'C{i}' for i in range(len(rows[0]))],
+                         time_column=1, binary=binary)
+    timings = []
+    clock = time.perf_counter
+    start = clock()
+    for row in rows:
+        t = clock()
+        writer.write(row)
+        timings.append(clock() - t)
+    queued = clock() - start
+    writer.close(timeout=60)
+    return queued, clock() - start, timings
+
+
+def bench_end_to_end(rate, duration, modes=(0x03, 0x04), corrupt=0.0):
+    """
+    模拟设备 -> SimulatedSerial -> AsyncSerialTransport
+
+    每个数据包带序号，结果从传输队列取出时计算“发送到取出”的延迟。
+    返回 (收到的数据包数, 耗时, 延迟列表, 传输统计, 设备)
+    """
+    device = SimulatedDevice(modes, rate=rate, corrupt=corrupt, tag_sequence=True)
+    ser = SimulatedSerial(device)
+    transport = AsyncSerialTransport(ser, PacketDecoder(decoders=ARRAY_DECODERS))
+    latencies = []
+    received = 0
+    transport.start()
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < duration:
+            time.sleep(0.002)
+            now = time.perf_counter()
+            for kind, _, item in transport.drain(10000):
+                if kind != 'record' or not item.checksum_valid:
+                    continue
+                received += 1
+                sent = device.sent_times.pop(int.from_bytes(bytes(item.payload[:4]), 'big'), None)
+                if sent is not None:
+                    latencies.append(now - sent)
+        elapsed = time.perf_counter() - start
+    finally:
+        transport.stop()
+        ser.close()
+    return received, elapsed, latencies, transport.stats(), device
+
+
+def format_percentiles(values):
+    return ' '.join(f"{k}={v:.1f}" if v is not None else f"{k}=-" for k, v in values.items())
+
+
+def compare(results, baseline, tolerance):
+    """与基准结果对比，返回吞吐量下降超过 tolerance 的项目"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name, {}).get('rate')
+        if old and result.get('rate') is not None and result['rate'] < old * (1 - tolerance):
+            regressions.append((name, old, result['rate']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RS-485 framing, decoding, storage and end-to-end benchmark.')
+    parser.add_argument('-f', nargs='*', default=[], help='Raw capture files to replay')
+    parser.add_argument('-size', type=float, default=16, help='Size of generated traffic in MB')
+    parser.add_argument('-chunk', type=int, nargs='*', default=[64, 4096, 65536],
+                        help='Read chunk sizes in bytes')
+    parser.add_argument('-packets', type=int, default=20000, help='Simulated packets for decode/log/CSV benchmarks')
+    parser.add_argument('-rate', type=float, default=2000, help='Simulated device frames/s for the end-to-end run')
+    parser.add_argument('-duration', type=float, default=3.0, help='Seconds for the end-to-end run (0 = skip)')
+    parser.add_argument('-save', help='Write results to this JSON file')
+    parser.add_argument('-baseline', help='Compare throughput with a JSON file written by -save')
+    parser.add_argument('-tolerance', type=float, default=0.2, help='Allowed throughput drop vs baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    results = {}  # 项目 -> {'rate': 每秒处理数, 分位数(微秒), 内存(KB)}
+
+    if args.f:
+        data = load_captures(args.f)
+        source = ', '.join(os.path.basename(p) for p in args.f)
+    else:
+        data = generate_traffic(args.size)
+        source = '随机生成'
+    size_mb = len(data) / 1024 / 1024
+    print(f"数据来源: {source}，共 {size_mb:.2f} MB")
+
+    samples, scalar, vector = bench_ltc2413(min(size_mb, 4))
+    print(f"LTC2413 解码 {samples} 个样本: 逐个 {scalar:.3f} s, NumPy {vector:.4f} s, "
+          f"加速 {scalar / vector:.0f} 倍")
+
+    for chunk_size in args.chunk:
+        packets, discarded, elapsed = bench_framer(data, chunk_size)
+        results[f'framer_{chunk_size}'] = {'rate': packets / elapsed, 'mb_per_s': size_mb / elapsed}
+        print(f"分帧 chunk={chunk_size:>6}: {packets} 包, 丢弃 {discarded} 字节, "
+              f"{elapsed:.3f} s, {size_mb / elapsed:.1f} MB/s, {packets / elapsed:.0f} 包/s")
+    peak, retained = measure_memory(bench_framer, data, 4096)
+    results['framer_4096'] = dict(results.get('framer_4096', {}), peak_kb=peak, retained_kb=retained)
+    print(f"分帧内存 chunk=4096: 峰值 {peak:.0f} KB, 保留 {retained:.0f} KB")
+
+    packets = simulated_packets(args.packets)
+    print(f"\n模拟设备数据包: {len(packets)} 个（解析方式 {', '.join(f'0x{m:02X}' for m in ALL_MODES)}，1% 错误）")
+    for name, decoders in (('decode', None), ('decode_numpy', ARRAY_DECODERS)):
+        elapsed, timings, decoder = bench_decoder(packets, decoders)
+        peak, retained = measure_memory(bench_decoder, packets, decoders)
+        values = percentiles(timings)
+        results[name] = dict(values, rate=len(packets) / elapsed, peak_kb=peak, retained_kb=retained)
+        print(f"{'解码' if decoders is None else '解码(NumPy)':<10} {len(packets) / elapsed:9.0f} 包/s | "
+              f"单包 µs {format_percentiles(values)} | 校验失败 {decoder.checksum_failures} | "
+              f"内存峰值 {peak:.0f} KB")
+
+    # 日志和CSV写入使用与界面相同的格式
+    lines = [hex_string(p) for p in packets]
+    rows = []
+    for record in PacketDecoder().feed(b''.join(packets)):
+        if record.parse_mode == 0x03 and record.checksum_valid and record.values:
+            rows.append([len(rows) + 1, time.time()] + list(record.values.vodata))
+    directory = tempfile.mkdtemp(prefix='rs485_bench_')
+    try:
+        tests = [('log', '日志写入', bench_log_writer, (lines, os.path.join(directory, 'log')), len(lines))]
+        if rows:
+            tests.append(('csv', 'CSV写入', bench_table_writer, (rows, os.path.join(directory, 'csv')), len(rows)))
+            tests.append(('csv_binary', 'CSV+列文件', bench_table_writer,
+                          (rows, os.path.join(directory, 'bin'), True), len(rows)))
+        for name, label, func, func_args, count in tests:
+            queued, total, timings = func(*func_args)
+            values = percentiles(timings)
+            results[name] = dict(values, rate=count / total, queued_rate=count / queued)
+            print(f"{label:<10} {count / total:9.0f} 行/s（write() {count / queued:.0f} 行/s）| "
+                  f"write() µs {format_percentiles(values)}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.duration > 0:
+        received, elapsed, latencies, stats, device = bench_end_to_end(args.rate, args.duration)
+        values = {k: v / 1000 if v is not None else None for k, v in percentiles(latencies).items()}
+        results['end_to_end'] = dict(values, rate=received / elapsed)
+        print(f"\n端到端 {args.rate:.0f} 包/s × {args.duration:g} s: 发送 {device.frames} 包, 收到 {received} 包 "
+              f"({received / elapsed:.0f} 包/s) | 延迟 ms {format_percentiles(values)} | "
+              f"暂停读取 {stats['read_pauses']} 次, 丢弃 {stats['dropped_results']} 结果, 积压峰值 {stats['backlog_peak']}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n结果已保存到 {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n性能下降超过 {args.tolerance:.0%}:")
+            for name, old, new in regressions:
+                print(f"  {name}: {old:.0f}/s -> {new:.0f}/s ({new / old - 1:+.0%})")
+            sys.exit(1)
+        print(f"\n与基准 {args.baseline} 相比无性能下降（容差 {args.tolerance:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
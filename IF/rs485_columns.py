@@ -0,0 +1,182 @@
+"""
+vodata/dndata 列存储读取
+
+读取 TableWriter(binary=True) 写出的按天分区的二进制列文件：
+    <目录>/<日期>_<名称>_columns/<列名>.f64 或 .f32
+文字列（如多串口采集的 Port）另有 <列名>.labels，读取时由编码换回文字。
+可按时间范围和通道（CH1~CH4，T1~T5、PT、R、B1~B5）只读取需要的列和行，
+列文件以内存映射方式打开，不需要读入整个文件。
+
+用法:
+    python rs485_columns.py data -name vodata -ch 1 2 -sig T1 PT -start "2026-10-01" -end "2026-10-08"
+    python rs485_columns.py data -start "2026-10-17 08:00" -o morning.csv
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from rs485_protocol import FLOW1_CHANNEL_LAYOUT
+
+INDEX_COLUMN = 'PacketIndex'
+TIME_COLUMN = 'Timestamp'
+CHANNELS = (1, 2, 3, 4)
+SIGNALS = tuple(name for name, _ in FLOW1_CHANNEL_LAYOUT)  # T1~T5、PT、R、B1~B5
+PARTITION = re.compile(r'^(?P<date>\d{8})_(?P<name>.+)_columns$')
+COLUMN_DTYPES = {'.f64': np.float64, '.f32': np.float32}
+
+
+def channel_columns(channels=None, signals=None):
+    """由通道号和信号名生成列名，如 (1, 'T1') -> 'CH1T1'"""
+    channels = CHANNELS if channels is None else channels
+    signals = SIGNALS if signals is None else signals
+    for signal in signals:
+        if signal not in SIGNALS:
+            raise ValueError(f"未知的信号: {signal}，可选: {', '.join(SIGNALS)}")
+    return [f"CH{ch}{signal}" for ch in channels for signal in signals]
+
+
+class ColumnStore:
+    """按天分区的列存储"""
+
+    def __init__(self, directory, name='vodata'):
+        self.directory = directory
+        self.name = name
+
+    def partitions(self, start=None, end=None):
+        """返回与时间范围有交集的分区 [(日期, 目录), ...]，按日期排序"""
+        result = []
+        for path in glob.glob(os.path.join(self.directory, f"*_{self.name}_columns")):
+            match = PARTITION.match(os.path.basename(path))
+            if not match or match.group('name') != self.name:
+                continue
+            day = datetime.strptime(match.group('date'), "%Y%m%d")
+            if start is not None and day + timedelta(days=1) <= start:
+                continue
+            if end is not None and day > end:
+                continue
+            result.append((day, path))
+        return sorted(result)
+
+    def columns(self):
+        """所有分区中出现过的列名"""
+        names = set()
+        for _, path in self.partitions():
+            names.update(os.path.splitext(f)[0] for f in os.listdir(path)
+                         if os.path.splitext(f)[1] in COLUMN_DTYPES)
+        return sorted(names)
+
+    def read(self, start=None, end=None, channels=None, signals=None, columns=None):
+        """
+        读取时间范围 [start, end) 内的数据
+
+        start/end 为 datetime 或 time.time() 时间戳；columns 不指定时按
+        channels/signals 选择通道列（都不指定则为全部通道列）。
+        返回 {列名: numpy数组}，总是包含 PacketIndex 和 Timestamp 列；
+        文字列为 object 数组。
+        """
+        start = _to_datetime(start)
+        end = _to_datetime(end)
+        if columns is None:
+            columns = channel_columns(channels, signals)
+        names = [INDEX_COLUMN, TIME_COLUMN] + [c for c in columns if c not in (INDEX_COLUMN, TIME_COLUMN)]
+        start_ts = start.timestamp() if start else None
+        end_ts = end.timestamp() if end else None
+
+        parts = {name: [] for name in names}
+        for _, path in self.partitions(start, end):
+            arrays = {name: _map_column(path, name) for name in names}
+            times = arrays[TIME_COLUMN]
+            if times is None:
+                continue
+            # 中途写入中断时各列长度可能不同，只取都写完的行
+            length = min(len(a) for a in arrays.values() if a is not None)
+            times = times[:length]
+            lo = 0 if start_ts is None else np.searchsorted(times, start_ts, 'left')
+            hi = length if end_ts is None else np.searchsorted(times, end_ts, 'left')
+            for name, values in arrays.items():
+                if values is None:
+                    # 该分区没有这一列，用 NaN 补齐
+                    parts[name].append(np.full(hi - lo, np.nan))
+                    continue
+                labels = _read_labels(path, name)
+                if labels is None:
+                    parts[name].append(np.array(values[lo:hi]))
+                else:
+                    # 编码只在本分区内有效，换回文字后再合并
+                    parts[name].append(labels[values[lo:hi].astype(np.intp)])
+        return {name: np.concatenate(chunks) if chunks else np.empty(0) for name, chunks in parts.items()}
+
+
+def _to_datetime(value):
+    """datetime、时间戳或 None"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromtimestamp(value)
+
+
+def _map_column(path, name):
+    """内存映射一个列文件，不存在时返回 None"""
+    for ext, dtype in COLUMN_DTYPES.items():
+        file_path = os.path.join(path, name + ext)
+        if os.path.exists(file_path):
+            if os.path.getsize(file_path) < np.dtype(dtype).itemsize:
+                return np.empty(0, dtype)
+            return np.memmap(file_path, dtype=dtype, mode='r')
+    return None
+
+
+def _read_labels(path, name):
+    """文字列的编码表（object 数组，下标为编码），不是文字列时返回 None"""
+    label_path = os.path.join(path, name + '.labels')
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path, encoding='utf-8') as f:
+        return np.array([line.rstrip('\n') for line in f], dtype=object)
+
+
+def parse_time(text):
+    """解析命令行中的时间: 2026-10-17 或 2026-10-17 08:00[:00]"""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"无法解析时间: {text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read vodata/dndata column files by time range and channel.')
+    parser.add_argument('directory', help='Data directory containing <date>_<name>_columns folders')
+    parser.add_argument('-name', default='vodata', help='Table name: vodata or dndata')
+    parser.add_argument('-start', type=parse_time, help='Start time, e.g. "2026-10-17 08:00"')
+    parser.add_argument('-end', type=parse_time, help='End time (exclusive)')
+    parser.add_argument('-ch', type=int, nargs='*', choices=CHANNELS, help='Channels 1-4')
+    parser.add_argument('-sig', nargs='*', choices=SIGNALS, help='Signals: T1-T5 PT R B1-B5')
+    parser.add_argument('-o', help='Write the selection to this CSV file')
+    args = parser.parse_args()
+
+    store = ColumnStore(args.directory, args.name)
+    data = store.read(args.start, args.end, args.ch, args.sig)
+    rows = len(data[TIME_COLUMN])
+    print(f"{len(store.partitions(args.start, args.end))} 个分区, {rows} 行, {len(data)} 列")
+    if rows:
+        first = datetime.fromtimestamp(data[TIME_COLUMN][0])
+        last = datetime.fromtimestamp(data[TIME_COLUMN][-1])
+        print(f"时间范围: {first:%Y-%m-%d %H:%M:%S} ~ {last:%Y-%m-%d %H:%M:%S}")
+
+    if args.o:
+        names = list(data)
+        with open(args.o, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(data[name].tolist() for name in names)))
+        print(f"已保存到 {args.o}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+RS-485 数据处理性能指标
+
+Metrics 收集各处理阶段的计数和耗时直方图，不需要调试器即可在现场查看耗时分布：
+    read        串口读取（字节数、块数）
+    frame       分帧（每次读取的耗时，数据包数）
+    decode      单个数据包解码耗时，校验失败数
+    display     界面线程显示一个数据包的耗时
+    log_write   日志批量写盘耗时
+    csv_write:<表名>  CSV批量写盘耗时（每个表格一个写入线程）
+    <阶段>_dropped    写入线程跟不上、等待超时后丢弃的数据条数
+队列深度等瞬时值以 gauge（无参数函数）登记，在 snapshot() 时读取。
+MetricsExporter 在后台线程定期把 snapshot() 追加到 JSON Lines 文件。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+HISTOGRAM_BUCKETS = 32  # 第 i 个桶: [2^(i-1), 2^i) 微秒，最后一个桶不设上限
+
+
+class Histogram:
+    """按2的幂分桶的耗时直方图（微秒），记录开销小，分位数为所在桶的上界"""
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0  # 秒
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """记录一次耗时（秒）"""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, p):
+        """第 p 百分位数（微秒），没有数据时为 None"""
+        if not self.count:
+            return None
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(float(1 << i), self.max * 1e6)
+        return self.max * 1e6
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_us': self.total / self.count * 1e6 if self.count else None,
+            'p50_us': self.percentile(50),
+            'p99_us': self.percentile(99),
+            'max_us': self.max * 1e6,
+            'buckets': {f'<{1 << i}us': n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Metrics:
+    """
+    各阶段的计数、耗时直方图和瞬时值
+
+    计数可在任意线程中更新（如写盘丢弃数由界面线程和事件循环线程共同累加），
+    count() 加锁；每个直方图只在一个线程中更新（分帧和解码在事件循环线程，
+    显示在界面线程，写盘在各自的后台线程），读取快照时不加锁。
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.started = time.time()
+        self._last = None  # 上次 summary() 的 (时间, 计数)，用于计算当前速率
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def histogram(self, name):
+        """返回（必要时创建）指定阶段的直方图"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def gauge(self, name, func):
+        """登记瞬时值（如队列深度），func 为无参数函数"""
+        with self._lock:
+            self.gauges[name] = func
+
+    def remove_gauge(self, name, func=None):
+        """
+        取消登记瞬时值
+
+        func 不为空时只在登记的仍是 func 时取消，已由新的对象（如重新连接后的
+        队列）以同名登记的不受影响。
+        """
+        with self._lock:
+            if func is None or self.gauges.get(name) == func:
+                self.gauges.pop(name, None)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self._last = None
+
+    def snapshot(self):
+        """
+        当前所有指标: {'time', 'elapsed', 'counters', 'rates', 'stages', 'gauges'}
+
+        rates 为开始统计以来的平均速率（每秒）。
+        """
+        now = time.time()
+        elapsed = max(now - self.started, 1e-6)
+        with self._lock:
+            counters = dict(self.counters)
+        gauges = {}
+        for name, func in list(self.gauges.items()):
+            try:
+                gauges[name] = func()
+            except Exception:
+                gauges[name] = None
+        return {
+            'time': now,
+            'elapsed': elapsed,
+            'counters': counters,
+            'rates': {name: value / elapsed for name, value in counters.items()},
+            'stages': {name: h.snapshot() for name, h in list(self.histograms.items())},
+            'gauges': gauges,
+        }
+
+    def summary(self):
+        """界面显示的单行摘要，速率为距上次调用的平均值"""
+        snap = self.snapshot()
+        rates = snap['rates']
+        if self._last is not None and snap['time'] > self._last[0]:
+            last_time, last_counters = self._last
+            elapsed = snap['time'] - last_time
+            rates = {name: (value - last_counters.get(name, 0)) / elapsed
+                     for name, value in snap['counters'].items()}
+        self._last = (snap['time'], snap['counters'])
+        parts = [f"读取 {rates.get('bytes_read', 0) / 1024:.1f} KB/s",
+                 f"分帧 {rates.get('frames', 0):.0f} 包/s",
+                 f"校验失败 {snap['counters'].get('checksum_failures', 0)}"]
+        dropped = sum(value for name, value in snap['counters'].items() if name.endswith('_dropped'))
+        if dropped:
+            parts.append(f"写盘丢弃 {dropped}")
+        for name, label in (('frame', '分帧'), ('decode', '解码'), ('display', '显示'),
+                            ('log_write', '日志写'), ('csv_write', 'CSV写')):
+            # 'csv_write:vodata' 等同类阶段取最慢的一个
+            stages = [stage for key, stage in snap['stages'].items()
+                      if (key == name or key.startswith(name + ':')) and stage['count']]
+            if stages:
+                p50 = max(stage['p50_us'] for stage in stages)
+                p99 = max(stage['p99_us'] for stage in stages)
+                parts.append(f"{label} p50/p99 {_format_us(p50)}/{_format_us(p99)}")
+        queues = [f"{name} {value}" for name, value in snap['gauges'].items() if value is not None]
+        if queues:
+            parts.append("队列 " + ' '.join(queues))
+        return ' | '.join(parts)
+
+
+def _format_us(value):
+    """微秒数显示为 µs 或 ms"""
+    if value is None:
+        return '-'
+    return f"{value:.0f}µs" if value < 1000 else f"{value / 1000:.1f}ms"
+
+
+class MetricsExporter:
+    """后台线程每 interval 秒把指标快照追加到 <目录>/<前缀>_<日期>_metrics.jsonl"""
+
+    def __init__(self, metrics, directory, prefix='RS', interval=10.0):
+        self.metrics = metrics
+        self.directory = directory
+        self.prefix = prefix
+        self.interval = interval
+        self.path = None
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def export(self):
+        """立即写入一条快照"""
+        self.path = os.path.join(self.directory, f"{self.prefix}_{datetime.now():%Y%m%d}_metrics.jsonl")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.metrics.snapshot(), ensure_ascii=False, default=str) + '\n')
+        except Exception as e:
+            logging.error(f"性能指标保存失败: {str(e)}")
+
+    def close(self, timeout=2.0):
+        """写入最后一条快照并停止"""
+        self._stop.set()
+        self.thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+        self.export()
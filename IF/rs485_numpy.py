@@ -0,0 +1,121 @@
+"""
+PRDTIR01 协议的 NumPy 批量解码
+
+与 rs485_protocol 中逐个样本解码的函数结果一致，但整包（或多个包拼接后）
+一次完成，适合回放大量历史数据。超出测量范围的样本电压为 NaN，并在
+over_range/under_range 掩码中标出。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from rs485_protocol import (
+    MODE_DECODERS, FLOW1_SCHEMA, ADC12_VREF, ADC12_FULL_SCALE,
+    LTC2413_OVER_RANGE, LTC2413_UNDER_RANGE, LTC2413_FULL_SCALE, LTC2413_VREF,
+)
+
+# 批量解码结果
+Ltc2413Array = namedtuple('Ltc2413Array', 'raw codes voltages over_range under_range')
+Adc12Array = namedtuple('Adc12Array', 'raw voltages')
+Flow1Array = namedtuple('Flow1Array', 'vodata dndata over_range under_range')
+
+# 测试流程1的结构化类型，由 FLOW1_SCHEMA 生成
+FLOW1_DTYPE = np.dtype(FLOW1_SCHEMA.dtype_fields())
+FLOW1_NAMES = FLOW1_SCHEMA.names
+FLOW1_LTC_FIELDS = FLOW1_SCHEMA.names_of('ltc2413')
+FLOW1_ADC_FIELDS = FLOW1_SCHEMA.names_of('adc12')
+FLOW1_BYTE_FIELDS = FLOW1_SCHEMA.names_of('byte')
+FLOW1_LTC_INDEX = [FLOW1_NAMES.index(name) for name in FLOW1_LTC_FIELDS]
+FLOW1_ADC_INDEX = [FLOW1_NAMES.index(name) for name in FLOW1_ADC_FIELDS]
+FLOW1_BYTE_INDEX = [FLOW1_NAMES.index(name) for name in FLOW1_BYTE_FIELDS]
+
+
+def _columns(frames, names, dtype):
+    """取出结构化数组中的若干字段，组成 (包数, 字段数) 数组"""
+    return np.stack([frames[name].astype(dtype) for name in names], axis=1)
+
+
+def ltc2413_from_words(words):
+    """由32位原始数据计算提取的24位数值、电压和超量程掩码"""
+    words = np.asarray(words, dtype=np.uint32)
+    codes = (words >> 5) & 0xFFFFFF
+    over_range = words == LTC2413_OVER_RANGE
+    under_range = words == LTC2413_UNDER_RANGE
+
+    # 第3位（0x20000000）为1时为正，否则为 5 - x
+    scaled = codes.astype(np.float64) * LTC2413_VREF / LTC2413_FULL_SCALE
+    voltages = np.where(words & 0x20000000, scaled, LTC2413_VREF - scaled)
+    voltages[over_range | under_range] = np.nan
+    return Ltc2413Array(words, codes, voltages, over_range, under_range)
+
+
+def decode_ltc2413_array(payload):
+    """解析方式0x01/0x02: 整段有用数据按大端32位解码，不足4字节的尾部忽略"""
+    count = len(payload) // 4
+    words = np.frombuffer(payload, dtype='>u4', count=count)
+    return ltc2413_from_words(words)
+
+
+def decode_adc12_array(payload):
+    """解析方式0x04/0x05/0x07: 整段有用数据按大端16位解码并换算电压，不足2字节的尾部忽略"""
+    raw = np.frombuffer(payload, dtype='>u2', count=len(payload) // 2).astype(np.uint16)
+    voltages = ADC12_VREF * raw / ADC12_FULL_SCALE
+    return Adc12Array(raw, voltages)
+
+
+def decode_flow1_batch(payloads):
+    """
+    解析方式0x03: 批量解码多个测试流程1数据包
+
+    按 FLOW1_DTYPE 一次 np.frombuffer 得到所有包的字段，返回的 vodata/dndata
+    形状为 (包数, 字段数)，与 decode_flow1 的列表一一对应；超出测量范围的
+    LTC2413 字段在 vodata/dndata 中均为 NaN。
+    """
+    size = FLOW1_SCHEMA.size
+    for payload in payloads:
+        if len(payload) < size:
+            raise ValueError(f"数据长度为{len(payload)}字节，不足{size}字节，无法按布局解析")
+    frames = np.frombuffer(b''.join(bytes(p[:size]) for p in payloads), dtype=FLOW1_DTYPE)
+    count = len(frames)
+    shape = (count, len(FLOW1_NAMES))
+
+    vodata = np.zeros(shape)
+    dndata = np.zeros(shape)
+    over_range = np.zeros(shape, dtype=bool)
+    under_range = np.zeros(shape, dtype=bool)
+
+    # LTC2413 字段
+    ltc = ltc2413_from_words(_columns(frames, FLOW1_LTC_FIELDS, np.uint32))
+    vodata[:, FLOW1_LTC_INDEX] = ltc.voltages
+    dndata[:, FLOW1_LTC_INDEX] = np.where(ltc.over_range | ltc.under_range, np.nan, ltc.codes)
+    over_range[:, FLOW1_LTC_INDEX] = ltc.over_range
+    under_range[:, FLOW1_LTC_INDEX] = ltc.under_range
+
+    # 12位ADC字段
+    combined = _columns(frames, FLOW1_ADC_FIELDS, np.uint16)
+    vodata[:, FLOW1_ADC_INDEX] = ADC12_VREF * combined / ADC12_FULL_SCALE
+    dndata[:, FLOW1_ADC_INDEX] = combined
+
+    # 单字节字段（环境数据）
+    raw = _columns(frames, FLOW1_BYTE_FIELDS, np.uint8)
+    vodata[:, FLOW1_BYTE_INDEX] = raw
+    dndata[:, FLOW1_BYTE_INDEX] = raw
+    return Flow1Array(vodata, dndata, over_range, under_range)
+
+
+def decode_flow1_array(payload):
+    """解析方式0x03: 解码单个测试流程1数据包，返回一维数组"""
+    batch = decode_flow1_batch([payload])
+    return Flow1Array(*(a[0] for a in batch))
+
+
+# 使用批量解码的解析方式，可传给 decode_packet/PacketDecoder
+ARRAY_DECODERS = dict(MODE_DECODERS)
+ARRAY_DECODERS.update({
+    0x01: decode_ltc2413_array,
+    0x02: decode_ltc2413_array,
+    0x03: decode_flow1_array,
+    0x04: decode_adc12_array,
+    0x05: decode_adc12_array,
+    0x07: decode_adc12_array,
+})
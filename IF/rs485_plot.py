@@ -0,0 +1,311 @@
+"""
+测试流程1数据实时曲线
+
+RingBuffer 为定长的 NumPy 环形缓冲区，每个数据包追加一行（CH1~CH4 各字段），
+写入两份使任意时刻的数据都是连续视图，追加 O(1)、读取不复制；
+收到第一个数据包时才分配，历史再长，内存和每帧的绘制量都是固定的。
+RingBuffer 只保留最近的数据包，MinMaxHistory 另外按 PLOT_HISTORY_INTERVAL 秒
+分段保存各字段的最小值和最大值，保留最长的显示窗口（1天），窗口超出
+RingBuffer 的范围时，较早的部分由分段最值补足。
+
+StripChart 在 tk.Canvas 上绘制选中的字段：坐标轴和网格只在窗口大小或纵轴
+范围变化时重画，每帧只用 canvas.coords() 更新曲线的坐标（与 matplotlib 的
+blitting 作用相同）；绘制前按屏幕宽度做 min/max 抽取，每个像素列最多两个点，
+尖峰不会被抽掉。刷新按固定帧率在 Tk 线程中进行，没有新数据时不重画。
+"""
+import tkinter as tk
+
+import numpy as np
+
+from rs485_protocol import FLOW1_SCHEMA, FLOW1_CHANNEL_LAYOUT
+
+PLOT_CHANNELS = (1, 2, 3, 4)
+PLOT_SIGNALS = tuple(name for name, _ in FLOW1_CHANNEL_LAYOUT)  # T1~T5、PT、R、B1~B5
+PLOT_FIELDS = [f"CH{ch}{signal}" for ch in PLOT_CHANNELS for signal in PLOT_SIGNALS]
+PLOT_FIELD_INDEX = {name: FLOW1_SCHEMA.names.index(name) for name in PLOT_FIELDS}
+PLOT_COLORS = {1: '#1f77b4', 2: '#d62728', 3: '#2ca02c', 4: '#ff7f0e'}
+PLOT_WINDOWS = {"1分钟": 60, "10分钟": 600, "1小时": 3600, "1天": 86400}
+PLOT_HISTORY_INTERVAL = 10  # 长时间窗口的分段长度（秒）
+PLOT_HISTORY_CAPACITY = max(PLOT_WINDOWS.values()) // PLOT_HISTORY_INTERVAL  # 分段数，覆盖最长的窗口
+PLOT_MARGIN = (50, 10, 10, 20)  # 左、上、右、下边距（像素）
+
+
+class RingBuffer:
+    """
+    定长环形缓冲区: 时间戳 (float64) 和 columns 列数值 (float32)
+
+    每行写在 i 和 i + capacity 两处，有效数据总是 [start, start + size) 的连续切片；
+    数组在第一次 append() 时分配，不使用时不占内存。
+    """
+
+    def __init__(self, columns, capacity=8192):
+        self.capacity = capacity
+        self.columns = columns
+        self._times = None
+        self._values = None
+        self._next = 0  # 下一行写入位置（0 ~ capacity-1）
+        self.size = 0
+
+    def append(self, timestamp, row):
+        """追加一行，缓冲区满时覆盖最早的一行"""
+        if self._times is None:
+            self._times = np.zeros(2 * self.capacity)
+            self._values = np.empty((2 * self.capacity, self.columns), dtype=np.float32)
+        i = self._next
+        j = i + self.capacity
+        row = np.asarray(row, dtype=np.float32)
+        self._times[i] = self._times[j] = timestamp
+        self._values[i] = self._values[j] = row
+        self._next = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def clear(self):
+        self._next = 0
+        self.size = 0
+
+    def view(self):
+        """按时间顺序的 (时间戳, 数值) 视图，不复制数据"""
+        if self._times is None:
+            return np.zeros(0), np.zeros((0, self.columns), dtype=np.float32)
+        start = self._next if self.size == self.capacity else 0
+        return self._times[start:start + self.size], self._values[start:start + self.size]
+
+    def window(self, t0=None, t1=None):
+        """时间范围 [t0, t1] 内的数据视图"""
+        times, values = self.view()
+        lo = 0 if t0 is None else np.searchsorted(times, t0, 'left')
+        hi = len(times) if t1 is None else np.searchsorted(times, t1, 'right')
+        return times[lo:hi], values[lo:hi]
+
+
+class MinMaxHistory:
+    """
+    按 interval 秒分段的最小值/最大值历史
+
+    每段在 RingBuffer 中占两行（段起点时间，先最小值后最大值），与
+    minmax_decimate() 的输出格式相同；正在累计的一段在 view() 中一并返回。
+    """
+
+    def __init__(self, columns, interval=PLOT_HISTORY_INTERVAL, capacity=PLOT_HISTORY_CAPACITY):
+        self.interval = interval
+        self.columns = columns
+        self.buffer = RingBuffer(columns, 2 * capacity)
+        self._bucket = None  # 正在累计的段序号
+        self._low = None
+        self._high = None
+
+    def append(self, timestamp, row):
+        bucket = int(timestamp // self.interval)
+        row = np.asarray(row, dtype=np.float32)
+        if bucket != self._bucket:
+            self._flush()
+            self._bucket = bucket
+            self._low = row.copy()
+            self._high = row.copy()
+        else:
+            np.fmin(self._low, row, out=self._low)
+            np.fmax(self._high, row, out=self._high)
+
+    def _flush(self):
+        if self._bucket is None:
+            return
+        start = self._bucket * self.interval
+        self.buffer.append(start, self._low)
+        self.buffer.append(start, self._high)
+
+    def clear(self):
+        self.buffer.clear()
+        self._bucket = None
+
+    def window(self, t0=None, t1=None):
+        """起点在 [t0, t1] 内的各段（含正在累计的一段），每段两行"""
+        times, values = self.buffer.window(t0, t1)
+        if self._bucket is None:
+            return times, values
+        start = self._bucket * self.interval
+        if (t0 is not None and start < t0) or (t1 is not None and start > t1):
+            return times, values
+        return (np.concatenate((times, [start, start])),
+                np.concatenate((values, [self._low, self._high])))
+
+
+def minmax_decimate(times, values, buckets):
+    """
+    按时间均分为 buckets 段，每段取各列的最小值和最大值
+
+    返回 (时间, 数值)，每段两行（段起点时间，先最小值后最大值）；
+    数据点不多于 2 * buckets 时原样返回。NaN（超出量程）不参与比较。
+    """
+    n = len(times)
+    if n <= 2 * buckets or buckets <= 0:
+        return times, values
+    edges = np.linspace(times[0], times[-1], buckets + 1)
+    starts = np.searchsorted(times, edges[:-1], 'left')
+    # 去掉空段，reduceat 的每段到下一个起点为止
+    starts = np.unique(starts[starts < n])
+    with np.errstate(invalid='ignore'):
+        lows = np.fmin.reduceat(values, starts, axis=0)
+        highs = np.fmax.reduceat(values, starts, axis=0)
+    out_times = np.repeat(times[starts], 2)
+    out_values = np.empty((2 * len(starts), values.shape[1]), dtype=values.dtype)
+    out_values[0::2] = lows
+    out_values[1::2] = highs
+    return out_times, out_values
+
+
+class StripChart:
+    """
+    滚动曲线
+
+    add() 在 Tk 线程中调用，只把数值写入环形缓冲区和分段最值历史；曲线由定时器按
+    fps 刷新。fields 为显示的字段名（PLOT_FIELDS 中的名称），window 为显示的时间
+    范围（秒，PLOT_WINDOWS 中的值）；capacity 个数据包以前的部分按分段最值绘制。
+    """
+
+    def __init__(self, root, canvas, capacity=8192, fps=5, window=600):
+        self.root = root
+        self.canvas = canvas
+        self.buffer = RingBuffer(len(PLOT_FIELDS), capacity)
+        self.history = MinMaxHistory(len(PLOT_FIELDS))
+        self.interval = max(1, int(1000 / fps))
+        self.window = window
+        self.fields = []
+        self.paused = False
+        self._columns = [PLOT_FIELD_INDEX[name] for name in PLOT_FIELDS]
+        self._lines = {}  # 字段名 -> 曲线
+        self._dirty = False
+        self._layout = None  # 上次画坐标轴时的 (宽, 高, 纵轴最小, 纵轴最大, 时间范围)
+        self.root.after(self.interval, self._refresh)
+
+    def add(self, timestamp, vodata):
+        """追加一个测试流程1数据包（vodata 中超出量程的说明文字记为 NaN）"""
+        row = [vodata[i] for i in self._columns]
+        try:
+            row = np.asarray(row, dtype=np.float32)
+        except (TypeError, ValueError):
+            row = np.array([v if isinstance(v, (int, float)) else np.nan for v in row], dtype=np.float32)
+        self.buffer.append(timestamp, row)
+        self.history.append(timestamp, row)
+        self._dirty = True
+
+    def set_fields(self, fields):
+        """设置显示的字段"""
+        for name in list(self._lines):
+            if name not in fields:
+                self.canvas.delete(self._lines.pop(name))
+        self.fields = [name for name in fields if name in PLOT_FIELD_INDEX]
+        for name in self.fields:
+            if name not in self._lines:
+                channel = int(name[2])
+                self._lines[name] = self.canvas.create_line(0, 0, 0, 0, fill=PLOT_COLORS[channel], tags='curve')
+        self._layout = None
+        self._dirty = True
+
+    def set_window(self, window):
+        self.window = window
+        self._layout = None
+        self._dirty = True
+
+    def clear(self):
+        self.buffer.clear()
+        self.history.clear()
+        for line in self._lines.values():
+            self.canvas.coords(line, 0, 0, 0, 0)
+        self._layout = None
+
+    def _refresh(self):
+        """定时刷新：有新数据时更新曲线坐标"""
+        try:
+            if self._dirty and not self.paused and self.fields:
+                self._dirty = False
+                self.draw()
+        finally:
+            self.root.after(self.interval, self._refresh)
+
+    def draw(self):
+        """按当前窗口大小抽取数据并更新曲线"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        left, top, right, bottom = PLOT_MARGIN
+        plot_w = width - left - right
+        plot_h = height - top - bottom
+        if plot_w < 10 or plot_h < 10 or not self.buffer.size:
+            return
+
+        t1 = self.buffer.view()[0][-1]
+        t0 = t1 - self.window
+        times, values = self.visible(plot_w)
+
+        finite = values[np.isfinite(values)]
+        if finite.size:
+            y0, y1 = float(finite.min()), float(finite.max())
+        else:
+            y0, y1 = 0.0, 1.0
+        if y1 - y0 < 1e-9:
+            y0, y1 = y0 - 0.5, y1 + 0.5
+
+        # 纵轴范围变化不大时沿用，避免每帧重画坐标轴
+        layout = self._layout
+        span = self.window
+        if (layout is None or layout[:2] != (width, height) or span != layout[4]
+                or y0 < layout[2] or y1 > layout[3] or (y1 - y0) < 0.5 * (layout[3] - layout[2])):
+            pad = (y1 - y0) * 0.1
+            layout = (width, height, y0 - pad, y1 + pad, span)
+            self._layout = layout
+            self._draw_axes(layout)
+        _, _, y_min, y_max, span = layout
+
+        xs = left + (times - t0) * (plot_w / span)
+        for n, name in enumerate(self.fields):
+            ys = values[:, n]
+            mask = np.isfinite(ys)
+            if mask.sum() < 2:
+                self.canvas.coords(self._lines[name], 0, 0, 0, 0)
+                continue
+            points = np.empty((int(mask.sum()), 2))
+            points[:, 0] = xs[mask]
+            points[:, 1] = top + (y_max - ys[mask]) * (plot_h / (y_max - y_min))
+            self.canvas.coords(self._lines[name], *points.ravel().tolist())
+
+    def visible(self, buckets):
+        """
+        当前窗口内选中字段的 (时间, 数值)，按 buckets 段抽取
+
+        窗口起点早于环形缓冲区中最早的数据包时，较早的部分取分段最值历史。
+        """
+        times, values = self.buffer.view()
+        if not len(times):
+            return times, values[:, :0]
+        t1 = times[-1]
+        t0 = t1 - self.window
+        if times[0] > t0:
+            older_times, older_values = self.history.window(t0, times[0])
+            older = older_times < times[0]
+            times = np.concatenate((older_times[older], times))
+            values = np.concatenate((older_values[older], values))
+        else:
+            times, values = self.buffer.window(t0, t1)
+        columns = [PLOT_FIELDS.index(name) for name in self.fields]
+        return minmax_decimate(times, values[:, columns], buckets)
+
+    def _draw_axes(self, layout):
+        """重画坐标轴、网格和刻度（曲线保留在最上层）"""
+        width, height, y_min, y_max, span = layout
+        left, top, right, bottom = PLOT_MARGIN
+        canvas = self.canvas
+        canvas.delete('axis')
+        canvas.create_rectangle(left, top, width - right, height - bottom, outline='#888888', tags='axis')
+        for i in range(5):
+            y = top + (height - top - bottom) * i / 4
+            value = y_max - (y_max - y_min) * i / 4
+            canvas.create_line(left, y, width - right, y, fill='#e0e0e0', tags='axis')
+            canvas.create_text(left - 4, y, text=f"{value:.4g}", anchor=tk.E, tags='axis')
+        label = f"最近 {span:.0f} 秒"
+        canvas.create_text(width - right, height - bottom + 2, text=label, anchor=tk.NE, tags='axis')
+        legend_x = left + 4
+        for name in self.fields:
+            canvas.create_text(legend_x, top + 2, text=name, anchor=tk.NW,
+                               fill=PLOT_COLORS[int(name[2])], tags='axis')
+            legend_x += 60
+        canvas.tag_raise('curve')
@@ -0,0 +1,227 @@
+"""
+RS-485 历史数据批量解析
+
+把 RS_<日期>_receive.log 十六进制日志或原始二进制抓包文件按块读入，
+经 PRDTIR01 分帧、校验后批量解码测试流程1（解析方式0x03）数据，
+为每个输入文件输出 <文件名>_vodata.csv 和 <文件名>_dndata.csv。
+多个文件由进程池并行处理。CaptureWriter 记录的 .bin 文件即原始数据，用 -raw 解析。
+Timestamp 列取自日志行开头或 .chunks 索引中的接收时间（精确到秒，格式与实时保存的CSV相同）；
+没有 .chunks 索引的原始数据文件不输出 Timestamp，
+旧版日志只记录了日期，这类日志输出的 Timestamp 只有日期。
+
+用法:
+    python rs485_replay.py data/RS_*_receive.log -o replay
+    python rs485_replay.py capture1.bin capture2.bin -raw -j 4
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from rs485_protocol import PacketDecoder, FLOW1_SCHEMA
+from rs485_storage import CaptureReader
+from rs485_numpy import decode_flow1_batch, FLOW1_LTC_INDEX, FLOW1_ADC_INDEX, FLOW1_BYTE_INDEX
+
+CHUNK_SIZE = 4 * 1024 * 1024  # 每次读取的字节数
+FLOW1_BATCH = 4096  # 攒够多少个测试流程1数据包批量解码一次
+
+# 接收日志行: "[YYYY-MM-DD HH:MM:SS.mmm] 十六进制数据"，系统消息行以 "[系统]" 开头
+LOG_LINE = re.compile(r'^\[(?P<time>[^\]]*)\] (?P<data>.*)$')
+TIME_LABEL_LEN = len('YYYY-MM-DD HH:MM:SS')  # 输出的时间精确到秒
+BINARY_PREFIX = '(二进制数据: '
+
+INTEGER_INDEX = FLOW1_LTC_INDEX + FLOW1_ADC_INDEX + FLOW1_BYTE_INDEX
+
+
+def iter_log_chunks(path, chunk_size=CHUNK_SIZE):
+    """逐块读取十六进制接收日志，返回 (接收时间, 字节) 序列，同一秒内接收的数据合并"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            label = ''
+            data = bytearray()
+            for line in lines:
+                match = LOG_LINE.match(line)
+                if not match:
+                    continue
+                text = match.group('data')
+                if text.startswith(BINARY_PREFIX):
+                    text = text[len(BINARY_PREFIX):].rstrip(')\n')
+                try:
+                    chunk = bytes.fromhex(text)
+                except ValueError:
+                    continue  # 系统消息或文本模式接收的数据
+                line_label = match.group('time')[:TIME_LABEL_LEN]
+                if line_label != label:
+                    if data:
+                        yield label, bytes(data)
+                        data.clear()
+                    label = line_label
+                data += chunk
+            if data:
+                yield label, bytes(data)
+
+
+def iter_raw_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    逐块读取原始二进制抓包文件，返回 (接收时间, 字节) 序列
+
+    CaptureWriter 的记录按 .chunks 中的接收时间输出，同一秒内接收的数据合并；
+    其他原始数据文件没有接收时间，时间为空。
+    """
+    base = os.path.splitext(path)[0]
+    if not os.path.exists(base + '.chunks'):
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                yield '', data
+        return
+
+    with CaptureReader(path) as reader:
+        label = ''
+        data = bytearray()
+        for timestamp, chunk in reader.iter_chunks():
+            chunk_label = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            if data and (chunk_label != label or len(data) >= chunk_size):
+                yield label, bytes(data)
+                data.clear()
+            label = chunk_label
+            data += chunk
+        if data:
+            yield label, bytes(data)
+
+
+def flow1_rows(payloads, labels, first_index):
+    """批量解码测试流程1数据，返回 vodata 行和 dndata 行"""
+    result = decode_flow1_batch(payloads)
+
+    # 原始数值和环境数据按整数输出，与逐包解析写出的CSV一致
+    vodata = result.vodata.astype(object)
+    dndata = result.dndata.astype(object)
+    dndata[:, INTEGER_INDEX] = np.nan_to_num(result.dndata[:, INTEGER_INDEX]).astype(np.int64)
+    vodata[:, FLOW1_BYTE_INDEX] = result.vodata[:, FLOW1_BYTE_INDEX].astype(np.int64)
+    vodata = vodata.tolist()
+    dndata = dndata.tolist()
+
+    # 超出量程的字段与逐包解析一致，写入说明文字
+    for mask, vo_label in ((result.over_range, "超出上限"), (result.under_range, "超出下限")):
+        for row, col in zip(*mask.nonzero()):
+            vodata[row][col] = vo_label
+            dndata[row][col] = "N/A"
+
+    vo_rows = [[first_index + i, labels[i]] + vodata[i] for i in range(len(payloads))]
+    dn_rows = [[first_index + i, labels[i]] + dndata[i] for i in range(len(payloads))]
+    return vo_rows, dn_rows
+
+
+def replay_file(path, out_dir, raw=False, chunk_size=CHUNK_SIZE):
+    """解析单个文件（在子进程中运行），返回统计信息"""
+    start = time.perf_counter()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+
+    # 只做分帧和校验，测试流程1数据攒批后用 NumPy 解码
+    decoder = PacketDecoder(decoders={})
+    modes = {}
+    payloads, labels = [], []
+    flow1_count = 0
+    bytes_read = 0
+
+    vo_path = os.path.join(out_dir, f"{stem}_vodata.csv")
+    dn_path = os.path.join(out_dir, f"{stem}_dndata.csv")
+    with open(vo_path, 'w', newline='', encoding='utf-8') as vo_file, \
+            open(dn_path, 'w', newline='', encoding='utf-8') as dn_file:
+        vo_writer = csv.writer(vo_file)
+        dn_writer = csv.writer(dn_file)
+        vo_writer.writerow(FLOW1_SCHEMA.headers)
+        dn_writer.writerow(FLOW1_SCHEMA.headers)
+
+        def write_batch():
+            nonlocal flow1_count
+            if not payloads:
+                return
+            vo_rows, dn_rows = flow1_rows(payloads, labels, flow1_count + 1)
+            vo_writer.writerows(vo_rows)
+            dn_writer.writerows(dn_rows)
+            flow1_count += len(payloads)
+            payloads.clear()
+            labels.clear()
+
+        chunks = iter_raw_chunks(path, chunk_size) if raw else iter_log_chunks(path, chunk_size)
+        for label, data in chunks:
+            bytes_read += len(data)
+            for record in decoder.feed(data):
+                if not record.checksum_valid:
+                    continue
+                modes[record.parse_mode] = modes.get(record.parse_mode, 0) + 1
+                if record.parse_mode == 0x03 and len(record.payload) >= FLOW1_SCHEMA.size:
+                    payloads.append(record.payload)
+                    labels.append(label)
+                    if len(payloads) >= FLOW1_BATCH:
+                        write_batch()
+        write_batch()
+
+    return {
+        'file': path,
+        'bytes': bytes_read,
+        'packets': decoder.packet_count,
+        'checksum_failures': decoder.checksum_failures,
+        'checksum_failures_by_device': decoder.checksum_failures_by_device,
+        'discarded_bytes': decoder.framer.discarded_bytes,
+        'modes': modes,
+        'flow1_rows': flow1_count,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def expand_paths(patterns):
+    """展开通配符（Windows命令行不会自动展开）"""
+    paths = []
+    for pattern in patterns:
+        matched = sorted(glob.glob(pattern))
+        paths.extend(matched if matched else [pattern])
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch decode RS-485 receive logs or raw captures.')
+    parser.add_argument('files', nargs='+', help='RS_*_receive.log files or raw captures (wildcards allowed)')
+    parser.add_argument('-o', default='replay', help='Output directory for vodata/dndata CSV files')
+    parser.add_argument('-raw', action='store_true', help='Inputs are raw binary captures instead of hex logs')
+    parser.add_argument('-j', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('-chunk', type=int, default=CHUNK_SIZE, help='Read chunk size in bytes')
+    args = parser.parse_args()
+
+    paths = expand_paths(args.files)
+    start = time.perf_counter()
+    total_bytes = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.j, len(paths)))) as pool:
+        futures = {pool.submit(replay_file, path, args.o, args.raw, args.chunk): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"解析失败: {futures[future]} - {str(e)}")
+                continue
+            total_bytes += stats['bytes']
+            modes = ', '.join(f"0x{mode:02X}:{count}" for mode, count in sorted(stats['modes'].items()))
+            print(f"{stats['file']}: {stats['packets']} 包, 校验失败 {stats['checksum_failures']}, "
+                  f"丢弃 {stats['discarded_bytes']} 字节, 流程1 {stats['flow1_rows']} 行, "
+                  f"解析方式 [{modes}], {stats['seconds']:.1f} s")
+
+    elapsed = time.perf_counter() - start
+    print(f"共 {len(paths)} 个文件, {total_bytes / 1024 / 1024:.1f} MB, 用时 {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+自动工作指令调度
+
+在串口传输的事件循环中依次发送工作流程指令，收到对应的“采集完成”
+状态包（解析方式0x00）后立即发送下一条，不再固定等待；超时未完成则
+重发，重试次数用完后停止。指令序列可以跨多个工作流程，按顺序循环执行。
+"""
+import asyncio
+import logging
+
+from rs485_protocol import COMMAND_COMPLETE, status_payload
+
+
+def completion_matcher(command):
+    """返回判断数据包是否为该指令“采集完成”状态的函数"""
+    expected = status_payload(command, COMMAND_COMPLETE)
+
+    def match(record):
+        return record.parse_mode == 0x00 and record.checksum_valid and record.payload == expected
+    return match
+
+
+class CommandScheduler:
+    """
+    请求/应答式指令调度
+
+    transport 为 AsyncSerialTransport；listener(事件, 工作流程, 内容) 在事件循环
+    线程中调用，事件为 'sent'、'complete'、'timeout'、'cycle'、'finished' 或 'error'。
+    """
+
+    def __init__(self, transport, timeout=10.0, retries=2, listener=None):
+        self.transport = transport
+        self.timeout = timeout  # 等待采集完成的最长时间（秒）
+        self.retries = retries  # 超时后重发次数
+        self.listener = listener
+        self.future = None
+
+        # 统计信息
+        self.sent = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.cycles = 0
+        self.last_latency = None  # 最近一条指令从发送到完成的时间（秒）
+
+    @property
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+    def start(self, sequence, cycles=0):
+        """
+        开始执行指令序列
+
+        sequence 为 [(工作流程名, 指令字节), ...]，整个序列执行 cycles 次（0表示无限）。
+        """
+        self.future = asyncio.run_coroutine_threadsafe(self._run(list(sequence), cycles), self.transport.loop)
+        return self.future
+
+    def stop(self):
+        """停止调度，正在等待的指令不再重发"""
+        if self.future:
+            self.future.cancel()
+
+    def _notify(self, event, workflow, detail=None):
+        if self.listener:
+            try:
+                self.listener(event, workflow, detail)
+            except Exception as e:
+                logging.error(f"自动工作回调错误: {str(e)}")
+
+    async def _run(self, sequence, cycles):
+        """循环执行指令序列"""
+        try:
+            while cycles == 0 or self.cycles < cycles:
+                for workflow, command in sequence:
+                    await self.execute(workflow, command)
+                self.cycles += 1
+                self._notify('cycle', None, self.cycles)
+            self._notify('finished', None, self.cycles)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._notify('error', None, str(e))
+            raise
+
+    async def execute(self, workflow, command):
+        """发送一条指令并等待采集完成，超时重发，返回完成状态的数据包"""
+        loop = asyncio.get_running_loop()
+        match = completion_matcher(command)
+        for attempt in range(self.retries + 1):
+            start = loop.time()
+            self.sent += 1
+            self._notify('sent', workflow, attempt)
+            try:
+                record = await self.transport.request_async(command, match, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._notify('timeout', workflow, attempt)
+                continue
+            self.completed += 1
+            self.last_latency = loop.time() - start
+            self._notify('complete', workflow, self.last_latency)
+            return record
+        raise TimeoutError(f"{workflow} 指令 {self.retries + 1} 次均未在 {self.timeout:g} 秒内完成")
@@ -0,0 +1,282 @@
+"""
+RS-485 多串口同时采集
+
+一个事件循环线程同时读取多个串口，每个串口有独立的分帧/解码状态；
+各串口的数据按接收时间合并成一个结果流，测试流程1数据写入同一组
+CSV文件（第一列为串口名），并分别统计每个串口的吞吐量和错误数。
+
+合并时每个结果在堆中保留 reorder_window 秒后才按接收时间依次取出，
+消费者处理延迟不超过该时间时，结果流和CSV中的行严格按接收时间排序；
+延迟更长（如磁盘或界面卡顿）时迟到的结果直接输出，可能早于已输出的行。
+
+用法:
+    python rs485_session.py COM3 COM4 COM5 -b 115200 -o data
+    python rs485_session.py /dev/ttyUSB0 /dev/ttyUSB1 -t 60 -binary
+"""
+import argparse
+import asyncio
+import heapq
+import logging
+import queue
+import threading
+import time
+
+import serial
+
+from rs485_protocol import PacketDecoder, MODE_DECODERS, FLOW1_SCHEMA
+from rs485_async import AsyncSerialTransport
+from rs485_storage import TableWriter
+
+SESSION_CSV_HEADERS = ['Port'] + FLOW1_SCHEMA.headers  # 多串口 vodata/dndata CSV表头
+REORDER_WINDOW = 0.05  # 合并结果前等待其他串口较早数据的时间（秒）
+
+
+class PortStats:
+    """单个串口的统计信息"""
+
+    def __init__(self, name):
+        self.name = name
+        self.records = 0
+        self.flow1_rows = 0
+        self.decode_errors = 0  # 校验通过但解码失败的数据包
+        self.read_errors = 0
+        self.last_error = None
+        self.last_received = None
+
+
+class MultiPortSession:
+    """
+    多串口采集会话
+
+    ports 为 {串口名: 已打开的 serial.Serial}；所有串口共用一个事件循环线程。
+    drain() 按接收时间顺序返回 (串口名, 类型, 接收时间, 内容) 列表（见模块说明）；
+    directory 不为空时测试流程1数据写入 <日期>_<prefix>_vodata.csv /
+    <日期>_<prefix>_dndata.csv，binary=True 时串口名列在二进制文件中为编码。
+    """
+
+    def __init__(self, ports, decoders=MODE_DECODERS, directory=None, prefix='session',
+                 binary=False, result_queue_size=8192, reorder_window=REORDER_WINDOW):
+        self.ports = dict(ports)
+        self.decoders = decoders
+        self.result_queue = queue.Queue(result_queue_size)
+        self.loop = None
+        self.thread = None
+        self.transports = {}
+        self.port_stats = {name: PortStats(name) for name in self.ports}
+        self.packet_index = 0  # 合并后的测试流程1数据包序号
+        self.dropped_results = 0
+        self.late_results = 0  # 超过 reorder_window 才到达、无法按顺序合并的结果
+        self.started = None
+        self.reorder_window = reorder_window
+        self._pending = []  # 等待合并的结果: (接收时间, 序号, 串口名, 类型, 内容)
+        self._sequence = 0
+        self._released = 0.0  # 最近输出的结果的接收时间
+        self._release_handle = None
+
+        self.table_writers = {}
+        if directory:
+            for name in ('vodata', 'dndata'):
+                self.table_writers[name] = TableWriter(directory, f"{prefix}_{name}",
+                                                       headers=SESSION_CSV_HEADERS, time_column=2,
+                                                       binary=binary, label_columns=(0,))
+
+    def start(self):
+        """启动事件循环线程并开始接收所有串口"""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.started = time.time()
+        for name, ser in self.ports.items():
+            consumer = self._make_consumer(name)
+            transport = AsyncSerialTransport(ser, PacketDecoder(decoders=self.decoders),
+                                             consumer=consumer, loop=self.loop)
+            transport.start()
+            self.transports[name] = transport
+
+    def stop(self, timeout=1.0):
+        """停止所有串口，写完剩余数据后关闭文件"""
+        for transport in self.transports.values():
+            transport.stop(timeout)
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(self._flush_pending(), self.loop).result(timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+            self.loop.close()
+            self.loop = None
+        for writer in self.table_writers.values():
+            writer.close()
+
+    def send(self, name, data):
+        """向指定串口发送数据，返回 concurrent.futures.Future"""
+        return self.transports[name].send(data)
+
+    def request(self, name, data, match, timeout=5.0):
+        """向指定串口发送指令并等待匹配的应答数据包"""
+        return self.transports[name].request(data, match, timeout)
+
+    def broadcast(self, data):
+        """向所有串口发送相同的数据"""
+        return {name: transport.send(data) for name, transport in self.transports.items()}
+
+    def drain(self, max_items=1000):
+        """取出最多 max_items 个合并后的结果（已按接收时间排序）"""
+        items = []
+        for _ in range(max_items):
+            try:
+                items.append(self.result_queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def stats(self):
+        """返回每个串口的统计信息: {串口名: dict}"""
+        elapsed = max(time.time() - self.started, 1e-6) if self.started else 1.0
+        result = {}
+        for name, port in self.port_stats.items():
+            transport = self.transports.get(name)
+            decoder = transport.decoder if transport else None
+            bytes_read = transport.bytes_read if transport else 0
+            result[name] = {
+                'bytes_read': bytes_read,
+                'bytes_per_s': bytes_read / elapsed,
+                'records': port.records,
+                'records_per_s': port.records / elapsed,
+                'flow1_rows': port.flow1_rows,
+                'checksum_failures': decoder.checksum_failures if decoder else 0,
+                'checksum_failures_by_device': dict(decoder.checksum_failures_by_device) if decoder else {},
+                'discarded_bytes': decoder.framer.discarded_bytes if decoder else 0,
+                'decode_errors': port.decode_errors,
+                'read_errors': port.read_errors,
+                'read_pauses': transport.read_pauses if transport else 0,
+                'last_error': port.last_error,
+                'last_received': port.last_received,
+            }
+        return result
+
+    def _make_consumer(self, name):
+        """生成指定串口的消费者协程函数"""
+        async def consumer(kind, received, item):
+            self._consume(name, kind, received, item)
+        return consumer
+
+    def _consume(self, name, kind, received, item):
+        """在事件循环中处理一个串口的结果：统计后放入合并堆，reorder_window 秒后输出"""
+        port = self.port_stats[name]
+        if kind == 'record':
+            port.records += 1
+            port.last_received = received
+            if item.error:
+                port.decode_errors += 1
+                port.last_error = item.error
+            elif item.parse_mode == 0x03 and item.checksum_valid and item.values:
+                port.flow1_rows += 1
+        elif kind == 'error':
+            port.read_errors += 1
+            port.last_error = item
+            logging.error(f"{name} 接收错误: {item}")
+
+        self._sequence += 1
+        heapq.heappush(self._pending, (received, self._sequence, name, kind, item))
+        if self._release_handle is None:
+            self._release_handle = self.loop.call_later(self.reorder_window, self._release)
+
+    def _release(self, flush=False):
+        """按接收时间输出等待超过 reorder_window 秒的结果（flush=True 时全部输出）"""
+        self._release_handle = None
+        horizon = time.time() - self.reorder_window
+        while self._pending and (flush or self._pending[0][0] <= horizon):
+            received, _, name, kind, item = heapq.heappop(self._pending)
+            self._emit(name, kind, received, item)
+        if self._pending:
+            delay = max(0.0, self._pending[0][0] - horizon)
+            self._release_handle = self.loop.call_later(delay, self._release)
+
+    async def _flush_pending(self):
+        """停止时输出堆中剩余的结果"""
+        if self._release_handle is not None:
+            self._release_handle.cancel()
+        self._release(flush=True)
+
+    def _emit(self, name, kind, received, item):
+        """按合并后的顺序保存测试流程1数据并放入结果队列"""
+        if received < self._released:
+            self.late_results += 1
+        self._released = max(self._released, received)
+        if kind == 'record' and not item.error and item.parse_mode == 0x03 and item.checksum_valid and item.values:
+            self._save_flow1(name, received, item.values)
+        try:
+            self.result_queue.put_nowait((name, kind, received, item))
+        except queue.Full:
+            self.dropped_results += 1
+
+    def _save_flow1(self, name, received, values):
+        """测试流程1数据写入合并的CSV文件"""
+        self.packet_index += 1
+        if not self.table_writers:
+            return
+        self.table_writers['vodata'].write([name, self.packet_index, received] + list(values.vodata))
+        self.table_writers['dndata'].write([name, self.packet_index, received] + list(values.dndata))
+
+
+def open_ports(names, baudrate, bytesize=8, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE):
+    """按相同参数打开多个串口"""
+    ports = {}
+    try:
+        for name in names:
+            ports[name] = serial.Serial(port=name, baudrate=baudrate, bytesize=bytesize,
+                                        parity=parity, stopbits=stopbits)
+    except Exception:
+        for ser in ports.values():
+            ser.close()
+        raise
+    return ports
+
+
+def print_stats(session):
+    """打印每个串口的统计信息"""
+    for name, s in session.stats().items():
+        print(f"{name:>12}: {s['bytes_per_s'] / 1024:8.1f} KB/s {s['records_per_s']:7.1f} 包/s | "
+              f"包 {s['records']} 流程1 {s['flow1_rows']} | 校验失败 {s['checksum_failures']} "
+              f"丢弃 {s['discarded_bytes']} 字节 解码错误 {s['decode_errors']} 读取错误 {s['read_errors']}")
+        if s['checksum_failures_by_device']:
+            devices = ', '.join(f"0x{d:02X}: {n}" if d is not None else f"不完整: {n}"
+                                for d, n in sorted(s['checksum_failures_by_device'].items(), key=lambda x: (x[0] is None, x[0] or 0)))
+            print(f"{'':>12}  校验失败（按设备号）: {devices}")
+    if session.late_results or session.dropped_results:
+        print(f"{'合并':>12}: 未按顺序 {session.late_results} 结果队列满丢弃 {session.dropped_results}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Acquire from several RS-485 ports at once.')
+    parser.add_argument('ports', nargs='+', help='Serial ports, e.g. COM3 COM4 or /dev/ttyUSB0')
+    parser.add_argument('-b', type=int, default=9600, help='Baud rate for all ports')
+    parser.add_argument('-o', default='data', help='Directory for the merged vodata/dndata CSV files')
+    parser.add_argument('-t', type=float, default=0, help='Stop after this many seconds (0 = until Ctrl+C)')
+    parser.add_argument('-binary', action='store_true', help='Also write float64 column files')
+    parser.add_argument('-interval', type=float, default=5.0, help='Seconds between stats reports')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    session = MultiPortSession(open_ports(args.ports, args.b), directory=args.o, binary=args.binary)
+    session.start()
+    print(f"已打开 {len(args.ports)} 个串口，数据保存到 {args.o}")
+    deadline = time.time() + args.t if args.t > 0 else None
+    next_report = time.time() + args.interval
+    try:
+        while deadline is None or time.time() < deadline:
+            time.sleep(0.1)
+            session.drain(session.result_queue.maxsize)
+            if time.time() >= next_report:
+                next_report += args.interval
+                print_stats(session)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session.stop()
+        for ser in session.ports.values():
+            ser.close()
+        print_stats(session)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+RS-485 设备模拟器
+
+SimulatedDevice 按设定速率生成各解析方式的 PRDTIR01 数据包，可按比例注入
+错误（校验和错误、丢字节、噪声字节），并对工作流程指令回复“开始采集”、
+测试数据和“采集完成”状态包。
+
+SimulatedSerial 是内存中的串口，可代替 serial.Serial 传给 AsyncSerialTransport、
+MultiPortSession 或 RS485Tool；PtySerialLink 在 POSIX 上创建伪终端，
+真实的 serial.Serial 可直接打开其 port。
+
+用法:
+    python rs485_sim.py -rate 200 -modes 3 4 -corrupt 0.01   # 创建伪终端并打印设备路径
+"""
+import argparse
+import os
+import random
+import select
+import struct
+import threading
+import time
+from collections import deque
+
+from rs485_protocol import (
+    build_packet, status_payload, COMMAND_TABLE, COMMAND_STARTED, COMMAND_COMPLETE, FLOW1_SCHEMA,
+    LTC2413_OVER_RANGE, LTC2413_UNDER_RANGE, LTC2413_FULL_SCALE, LTC2413_VREF, ADC12_FULL_SCALE,
+)
+
+ALL_MODES = (0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x07)
+CORRUPTIONS = ('checksum', 'truncate', 'noise')
+WORKFLOW_DATA_MODES = {"流程1": 0x03}  # 工作流程采集完成前发送的数据（其余流程发送12位ADC数据）
+
+
+def encode_ltc2413(voltage, over_range=False, under_range=False):
+    """由电压生成LTC2413原始32位数据（ltc2413_word 的逆运算）"""
+    if over_range:
+        return LTC2413_OVER_RANGE
+    if under_range:
+        return LTC2413_UNDER_RANGE
+    code = int(round(voltage / LTC2413_VREF * LTC2413_FULL_SCALE)) & 0xFFFFFF
+    return 0x20000000 | (code << 5)
+
+
+class SimulatedDevice:
+    """
+    模拟设备：生成数据包并响应指令
+
+    modes 为随机生成的解析方式；corrupt 为注入错误的比例；
+    samples 为解析方式0x01/0x02/0x04/0x05/0x07 每包的样本数；
+    tag_sequence=True 时有用数据前4字节为数据包序号，用于统计延迟。
+    """
+
+    def __init__(self, modes=ALL_MODES, rate=100.0, corrupt=0.0, device_id=1, samples=16,
+                 acquisition_time=0.05, command_table=COMMAND_TABLE, tag_sequence=False, seed=0):
+        self.modes = tuple(modes)
+        self.rate = rate  # 每秒数据包数，0 表示只响应指令
+        self.corrupt = corrupt
+        self.device_id = device_id
+        self.samples = samples
+        self.acquisition_time = acquisition_time
+        self.command_table = command_table
+        self.tag_sequence = tag_sequence
+        self.rng = random.Random(seed)
+        self.sequence = 0
+        self.sent_times = {}  # 数据包序号 -> 发送时间（tag_sequence=True 时记录）
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.frames = 0
+        self.corrupted = {name: 0 for name in CORRUPTIONS}
+        self.commands = 0
+
+    def payload(self, mode):
+        """生成指定解析方式的有用数据"""
+        rng = self.rng
+        if mode == 0x00:
+            command = rng.choice(list(self.command_table.commands.values()))
+            return status_payload(command, rng.choice((COMMAND_STARTED, COMMAND_COMPLETE)))
+        if mode in (0x01, 0x02):
+            words = [encode_ltc2413(rng.uniform(0, LTC2413_VREF), rng.random() < 0.01, rng.random() < 0.01)
+                     for _ in range(self.samples)]
+            return struct.pack(f'>{len(words)}I', *words)
+        if mode == 0x03:
+            values = []
+            for _, kind in FLOW1_SCHEMA.fields:
+                if kind == 'ltc2413':
+                    values.append(encode_ltc2413(rng.uniform(0, LTC2413_VREF), rng.random() < 0.01))
+                elif kind == 'adc12':
+                    values.append(rng.randrange(ADC12_FULL_SCALE))
+                elif kind == 'byte':
+                    values.append(rng.randrange(256))
+            return FLOW1_SCHEMA.struct.pack(*values)
+        return struct.pack(f'>{self.samples}H', *(rng.randrange(ADC12_FULL_SCALE) for _ in range(self.samples)))
+
+    def frame(self, mode=None):
+        """生成一个数据包（可能被注入错误）"""
+        with self._lock:
+            mode = self.rng.choice(self.modes) if mode is None else mode
+            payload = self.payload(mode)
+            if self.tag_sequence and mode != 0x00 and len(payload) >= 4:
+                self.sequence += 1
+                payload = self.sequence.to_bytes(4, 'big') + payload[4:]
+                self.sent_times[self.sequence] = time.perf_counter()
+            packet = build_packet(self.device_id, mode, payload)
+            self.frames += 1
+            if self.corrupt and self.rng.random() < self.corrupt:
+                packet = self._corrupt(packet)
+            return packet
+
+    def _corrupt(self, packet):
+        """注入一种错误"""
+        kind = self.rng.choice(CORRUPTIONS)
+        self.corrupted[kind] += 1
+        if kind == 'checksum':
+            return packet[:-1] + bytes((packet[-1] ^ 0xFF,))
+        if kind == 'truncate':
+            i = self.rng.randrange(len(packet))
+            return packet[:i] + packet[i + 1:]
+        return self.rng.randbytes(self.rng.randrange(1, 16)) + packet
+
+    def stream(self, count, mode=None):
+        """连续生成 count 个数据包"""
+        return b''.join(self.frame(mode) for _ in range(count))
+
+    def respond(self, data):
+        """
+        响应主机发送的数据
+
+        返回 [(延迟秒数, 数据包), ...]：识别为工作流程指令时依次为开始采集、
+        测试数据和采集完成状态，其余数据不响应。
+        """
+        responses = []
+        for i in range(0, len(data) - 7, 8):
+            command = bytes(data[i:i + 8])
+            status = self.command_table.decode(status_payload(command, COMMAND_COMPLETE))
+            if status.workflow is None:
+                continue
+            self.commands += 1
+            mode = WORKFLOW_DATA_MODES.get(status.workflow, 0x04)
+            with self._lock:
+                started = build_packet(self.device_id, 0x00, status_payload(command, COMMAND_STARTED))
+                complete = build_packet(self.device_id, 0x00, status_payload(command, COMMAND_COMPLETE))
+            responses.append((0.0, started))
+            responses.append((self.acquisition_time, self.frame(mode)))
+            responses.append((self.acquisition_time, complete))
+        return responses
+
+
+class _DeviceRunner:
+    """在后台线程中按速率发送数据包和指令响应"""
+
+    def __init__(self, device, write):
+        self.device = device
+        self.write = write
+        self.scheduled = deque()  # (发送时间, 数据)
+        self.running = True
+        self._wake = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, responses):
+        now = time.perf_counter()
+        for delay, data in responses:
+            self.scheduled.append((now + delay, data))
+        self._wake.set()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        self.thread.join(1.0)
+
+    def _run(self):
+        start = time.perf_counter()
+        sent = 0
+        while self.running:
+            now = time.perf_counter()
+            out = []
+            while self.scheduled and self.scheduled[0][0] <= now:
+                out.append(self.scheduled.popleft()[1])
+            if self.device.rate > 0:
+                due = int((now - start) * self.device.rate)
+                # 积压过多时（如被暂停）不补发
+                if due - sent > self.device.rate:
+                    sent = due - 1
+                while sent < due:
+                    out.append(self.device.frame())
+                    sent += 1
+            if out:
+                try:
+                    self.write(b''.join(out))
+                except OSError:
+                    return
+            wait = 0.001 if self.device.rate > 0 else None
+            if self.scheduled:
+                wait = max(0.0, min(wait or 1.0, self.scheduled[0][0] - time.perf_counter()))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+
+class SimulatedSerial:
+    """
+    内存中的串口，接口与 serial.Serial 相同的部分：
+    read/write/in_waiting/timeout/cancel_read/close/is_open
+    """
+
+    def __init__(self, device=None, port='SIM', timeout=None, **kwargs):
+        self.device = device or SimulatedDevice()
+        self.port = port
+        self.timeout = timeout
+        self.is_open = True
+        self.written = 0
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._cancel = False
+        self._runner = _DeviceRunner(self.device, self._receive)
+
+    def _receive(self, data):
+        """设备发来的数据"""
+        with self._cond:
+            self._buffer += data
+            self._cond.notify_all()
+
+    @property
+    def in_waiting(self):
+        return len(self._buffer)
+
+    def read(self, size=1):
+        """与 serial.Serial.read 相同：timeout=None 时阻塞到有数据，0 时不等待"""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._cond:
+            while not self._buffer and self.is_open and not self._cancel:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._cancel = False
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+    def write(self, data):
+        self.written += len(data)
+        self._runner.schedule(self.device.respond(data))
+        return len(data)
+
+    def cancel_read(self):
+        with self._cond:
+            self._cancel = True
+            self._cond.notify_all()
+
+    def close(self):
+        self._runner.stop()
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+
+class PtySerialLink:
+    """
+    伪终端上的模拟设备（仅 POSIX）
+
+    port 为从设备路径，可用 serial.Serial(link.port) 打开。
+    """
+
+    def __init__(self, device=None):
+        import pty
+        import tty
+        self.device = device or SimulatedDevice()
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self._runner = _DeviceRunner(self.device, lambda data: os.write(self.master, data))
+        self._reader = threading.Thread(target=self._read_commands, daemon=True)
+        self._reader.start()
+
+    def _read_commands(self):
+        """读取主机发送的指令"""
+        while self._runner.running:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            self._runner.schedule(self.device.respond(data))
+
+    def close(self):
+        self._runner.stop()
+        self._reader.join(1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated PRDTIR01 device on a pseudo terminal.')
+    parser.add_argument('-rate', type=float, default=10, help='Unsolicited frames per second (0 = commands only)')
+    parser.add_argument('-modes', type=lambda s: int(s, 0), nargs='*', default=list(ALL_MODES),
+                        help='Parse modes to generate')
+    parser.add_argument('-corrupt', type=float, default=0.0, help='Fraction of corrupted frames')
+    parser.add_argument('-id', type=int, default=1, help='Device id')
+    parser.add_argument('-acq', type=float, default=0.5, help='Seconds between start and complete status')
+    args = parser.parse_args()
+
+    device = SimulatedDevice(args.modes, args.rate, args.corrupt, args.id, acquisition_time=args.acq)
+    link = PtySerialLink(device)
+    print(f"模拟设备已启动: {link.port}（Ctrl+C 退出）")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"已发送 {device.frames} 包, 错误 {sum(device.corrupted.values())}, 指令 {device.commands}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        link.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,615 @@
+"""
+RS-485 数据存储
+
+LogWriter: 后台线程写日志，文件句柄常开、批量写入，按日期和大小切换文件
+TableWriter: 后台线程写CSV表格，表头只生成一次，可同时输出二进制列数据
+CaptureWriter/CaptureReader: 原始串口数据的二进制记录，带接收时间和数据包索引，
+    读取时内存映射，可直接取出任意范围的数据包
+"""
+import bisect
+import csv
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from rs485_protocol import PacketFramer, MODE_DECODERS, decode_packet
+
+_FLUSH = object()  # 立即写入标记
+_STOP = object()  # 停止标记
+_DIRECTORY = object()  # 修改保存目录标记
+
+
+class _BackgroundWriter:
+    """
+    后台写入线程的公共部分
+
+    调用方只把数据放入队列；后台线程攒够 flush_size 或距上次写入超过
+    flush_interval 秒时调用 _write_batch() 批量写盘；metrics 为 rs485_metrics.Metrics
+    时记录每批的写盘耗时（阶段名为 metric_stage）、队列深度和丢弃数
+    （计数 <metric_stage>_dropped）。队列满时调用方最多等待 put_timeout 秒。
+    """
+
+    metric_stage = 'write'
+
+    def __init__(self, directory, flush_interval, flush_size, queue_size, metrics=None, put_timeout=1.0):
+        self.directory = directory
+        self.metrics = metrics
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(queue_size)
+        self._flushed = threading.Event()
+        self.dropped = 0  # 等待超时后丢弃的数量
+        if metrics is not None:
+            metrics.gauge(f'{self.metric_stage}_queue', self.queue.qsize)
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        """放入队列，队列满时等待写盘，超过 put_timeout 秒仍然满则丢弃并计数"""
+        try:
+            self.queue.put((None, item), timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+            if self.metrics is not None:
+                self.metrics.count(f'{self.metric_stage}_dropped')
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logging.warning(f"{self.metric_stage} 写盘跟不上，已丢弃 {self.dropped} 条数据")
+
+    def set_directory(self, directory):
+        """修改保存目录，先写完已缓存的数据并关闭当前文件"""
+        self.queue.put((_DIRECTORY, directory))
+
+    def flush(self, timeout=2.0):
+        """立即写入已缓存的数据并等待完成"""
+        self._flushed.clear()
+        self.queue.put((_FLUSH, None))
+        return self._flushed.wait(timeout)
+
+    def close(self, timeout=2.0):
+        """写入剩余数据，关闭文件并停止后台线程"""
+        if self.metrics is not None:
+            self.metrics.remove_gauge(f'{self.metric_stage}_queue', self.queue.qsize)
+        if self.thread.is_alive():
+            self.queue.put((_STOP, None))
+            self.thread.join(timeout)
+
+    def _item_size(self, item):
+        """单条数据计入 flush_size 的大小"""
+        return 1
+
+    def _run(self):
+        """后台线程：合并数据，按大小或时间写盘"""
+        pending = []
+        pending_size = 0
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                control, item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                control, item = None, None
+
+            if control is _DIRECTORY:
+                if pending:
+                    self._write_pending(pending)
+                pending, pending_size = [], 0
+                self._close_files()
+                self.directory = item
+                continue
+
+            if item is not None:
+                pending.append(item)
+                pending_size += self._item_size(item)
+                if pending_size < self.flush_size and time.monotonic() - last_flush < self.flush_interval:
+                    continue
+
+            if pending:
+                self._write_pending(pending)
+            pending, pending_size = [], 0
+            last_flush = time.monotonic()
+            if control is _FLUSH:
+                self._flushed.set()
+            elif control is _STOP:
+                self._close_files()
+                return
+
+    def _write_pending(self, items):
+        """写一批数据，记录耗时"""
+        if self.metrics is None:
+            self._write_batch(items)
+            return
+        start = time.perf_counter()
+        self._write_batch(items)
+        self.metrics.observe(self.metric_stage, time.perf_counter() - start)
+        self.metrics.count(f'{self.metric_stage}_items', len(items))
+
+    def _write_batch(self, items):
+        raise NotImplementedError
+
+    def _close_files(self):
+        raise NotImplementedError
+
+
+class _LogFile:
+    """当前打开的日志文件"""
+
+    def __init__(self, path, date):
+        self.path = path
+        self.date = date
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class LogWriter(_BackgroundWriter):
+    """
+    后台日志写入
+
+    write() 只把日志行放入队列，由后台线程按类型合并后写入
+    <目录>/<前缀>_<日期>_<类型>.log；攒够 flush_bytes 字节或距上次写入超过
+    flush_interval 秒时写盘。日期变化时换新文件，单个文件超过 max_bytes
+    时依次写入 _1、_2 ... 后缀的文件。
+    """
+
+    metric_stage = 'log_write'
+
+    def __init__(self, directory, prefix='RS', log_types=('receive', 'status', 'analysis', 'parse'),
+                 max_bytes=64 * 1024 * 1024, flush_interval=1.0, flush_bytes=64 * 1024, queue_size=100000,
+                 metrics=None):
+        self.prefix = prefix
+        self.log_types = set(log_types)
+        self.max_bytes = max_bytes
+        self._files = {}  # 日志类型 -> _LogFile
+
+        # 统计信息
+        self.lines_written = 0
+        self.bytes_written = 0
+
+        super().__init__(directory, flush_interval, flush_bytes, queue_size, metrics)
+
+    def write(self, log_type, content, timestamp=None):
+        """
+        添加一条日志（可在任意线程调用），未知类型忽略
+
+        每行以 "[YYYY-MM-DD HH:MM:SS.mmm]" 开头，timestamp 为 time.time()，默认为当前时间。
+        """
+        if log_type not in self.log_types:
+            return
+        when = datetime.now() if timestamp is None else datetime.fromtimestamp(timestamp)
+        self._put((log_type, f"[{when.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}] {content}\n"))
+
+    def _item_size(self, item):
+        return len(item[1])
+
+    def _write_batch(self, items):
+        """把各类型的日志行合并后写入对应文件"""
+        pending = {}
+        for log_type, line in items:
+            pending.setdefault(log_type, []).append(line)
+        for log_type, lines in pending.items():
+            data = ''.join(lines).encode('utf-8')
+            try:
+                log_file = self._get_file(log_type, len(data))
+                log_file.file.write(data)
+                log_file.file.flush()
+                log_file.size += len(data)
+                self.lines_written += len(lines)
+                self.bytes_written += len(data)
+            except Exception as e:
+                logging.error(f"日志保存失败: {str(e)}")
+
+    def _get_file(self, log_type, incoming):
+        """返回日志类型当前应写入的文件，必要时按日期或大小切换"""
+        date = datetime.now().strftime("%Y%m%d")
+        log_file = self._files.get(log_type)
+        if log_file and log_file.date == date and (log_file.size == 0 or log_file.size + incoming <= self.max_bytes):
+            return log_file
+        if log_file:
+            log_file.close()
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{self.prefix}_{date}_{log_type}")
+        # 接着当天最后一个文件写，写满则换下一个
+        index = 0
+        while os.path.exists(f"{base}_{index + 1}.log"):
+            index += 1
+        path = f"{base}_{index}.log" if index else f"{base}.log"
+        if os.path.exists(path) and 0 < os.path.getsize(path) and os.path.getsize(path) + incoming > self.max_bytes:
+            path = f"{base}_{index + 1}.log"
+        log_file = _LogFile(path, date)
+        self._files[log_type] = log_file
+        return log_file
+
+    def _close_files(self):
+        """关闭所有日志文件"""
+        for log_file in self._files.values():
+            try:
+                log_file.close()
+            except Exception as e:
+                logging.error(f"关闭日志文件失败: {str(e)}")
+        self._files.clear()
+
+
+def _column_path(column_dir, header, typecode):
+    """二进制列文件路径: <列名>.f64 或 <列名>.f32"""
+    return os.path.join(column_dir, f"{header}.f{array(typecode).itemsize * 8}")
+
+
+def _to_float(value):
+    """转换为浮点数，无法转换的（如"超出上限"）记为 NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class TableWriter(_BackgroundWriter):
+    """
+    后台CSV表格写入
+
+    数据写入 <目录>/<日期>_<名称>.csv，文件常开，新文件先写表头；
+    time_column 列传入 time.time() 时间戳，CSV中格式化为日期时间。
+    binary=True 时同时在 <日期>_<名称>_columns 目录下为每列追加一个
+    二进制文件，可直接用 numpy.fromfile 读取（rs485_columns.ColumnStore）。
+    column_type 为 'd'（float64，<列名>.f64）或 'f'（float32，<列名>.f32）；
+    序号列（label_columns 之后的第一列）和时间戳列始终为 float64。
+    label_columns 为文字列（如串口名）的列号，二进制文件中写入编码（float64），
+    编码对应的文字按出现顺序逐行追加到 <列名>.labels，第 n 行为编码 n。
+    """
+
+    def __init__(self, directory, name, headers=None, time_column=None, binary=False, column_type='d',
+                 label_columns=(), flush_interval=1.0, flush_rows=200, queue_size=100000, metrics=None):
+        self.name = name
+        self.headers = list(headers) if headers else None
+        self.time_column = time_column
+        self.binary = binary
+        self.column_type = column_type
+        self.label_columns = tuple(label_columns)
+        self._date = None
+        self._file = None
+        self._writer = None
+        self._columns = None  # 二进制列文件
+        self._typecodes = None
+        self._labels = None  # 文字列: 列号 -> ({文字: 编码}, .labels 文件)
+
+        # 统计信息
+        self.rows_written = 0
+        self.path = None
+
+        self.metric_stage = f'csv_write:{name}'  # 每个表格一个写入线程，分别统计
+        super().__init__(directory, flush_interval, flush_rows, queue_size, metrics)
+
+    def write(self, row):
+        """添加一行（可在任意线程调用）"""
+        self._put(list(row))
+
+    def write_rows(self, rows):
+        """添加多行"""
+        for row in rows:
+            self.write(row)
+
+    def _write_batch(self, rows):
+        """把缓存的行写入CSV和二进制列文件"""
+        try:
+            self._open(datetime.now().strftime("%Y%m%d"))
+            self._writer.writerows(self._format_rows(rows))
+            self._file.flush()
+            if self._columns is not None:
+                self._write_columns(rows)
+            self.rows_written += len(rows)
+        except Exception as e:
+            logging.error(f"保存CSV数据失败: {self.path} - {str(e)}")
+
+    def _format_rows(self, rows):
+        """格式化时间戳列"""
+        if self.time_column is None:
+            return rows
+        formatted = []
+        for row in rows:
+            row = list(row)
+            value = row[self.time_column]
+            if isinstance(value, (int, float)):
+                row[self.time_column] = datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+            formatted.append(row)
+        return formatted
+
+    def _write_columns(self, rows):
+        """每列追加到对应的二进制文件"""
+        for i, column in enumerate(zip(*rows)):
+            if i >= len(self._columns):
+                break
+            if i in self._labels:
+                # 先写文字再写编码，列文件中的编码总能在 .labels 中找到
+                column = [self._label_code(i, value) for value in column]
+                self._labels[i][1].flush()
+            array(self._typecodes[i], map(_to_float, column)).tofile(self._columns[i])
+        for f in self._columns:
+            f.flush()
+
+    def _label_code(self, i, value):
+        """文字列的编码，新出现的文字追加到 .labels 文件"""
+        codes, label_file = self._labels[i]
+        label = str(value)
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(codes)
+            label_file.write(label + '\n')
+        return code
+
+    def _open(self, date):
+        """打开当天的文件，新文件写入表头"""
+        if self._file and self._date == date:
+            return
+        self._close_files()
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{date}_{self.name}.csv")
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if self.headers and self._file.tell() == 0:
+            self._writer.writerow(self.headers)
+        if self.binary and self.headers:
+            column_dir = os.path.join(self.directory, f"{date}_{self.name}_columns")
+            os.makedirs(column_dir, exist_ok=True)
+            self._typecodes = []
+            self._columns = []
+            self._labels = {}
+            index_column = next(i for i in range(len(self.headers)) if i not in self.label_columns)
+            for i, header in enumerate(self.headers):
+                typecode = 'd' if i in (index_column, self.time_column) or i in self.label_columns \
+                    else self.column_type
+                # 当天已有的列文件沿用原来的类型，同一列不会分成两个文件
+                for existing in ('d', 'f'):
+                    if os.path.exists(_column_path(column_dir, header, existing)):
+                        typecode = existing
+                        break
+                self._typecodes.append(typecode)
+                self._columns.append(open(_column_path(column_dir, header, typecode), 'ab'))
+                if i in self.label_columns:
+                    # 当天已有的编码继续使用
+                    label_path = os.path.join(column_dir, f"{header}.labels")
+                    codes = {}
+                    if os.path.exists(label_path):
+                        with open(label_path, encoding='utf-8') as f:
+                            codes = {line.rstrip('\n'): n for n, line in enumerate(f)}
+                    self._labels[i] = (codes, open(label_path, 'a', encoding='utf-8'))
+        self._date = date
+
+    def _close_files(self):
+        """关闭CSV和二进制列文件"""
+        label_files = [label_file for _, label_file in (self._labels or {}).values()]
+        for f in [self._file] + (self._columns or []) + label_files:
+            if f:
+                try:
+                    f.close()
+                except Exception as e:
+                    logging.error(f"关闭数据文件失败: {str(e)}")
+        self._file = None
+        self._writer = None
+        self._columns = None
+        self._labels = None
+        self._date = None
+
+
+CAPTURE_CHUNK = struct.Struct('<Qd')  # 每次读取: 在 .bin 中的位置, 接收时间
+CAPTURE_PACKET = struct.Struct('<QI')  # 每个数据包: 在 .bin 中的位置, 长度
+
+
+class CaptureWriter(_BackgroundWriter):
+    """
+    原始串口数据的二进制记录（只追加）
+
+    <名称>.bin     接收到的原始字节按顺序拼接，本身就是原始抓包文件
+    <名称>.chunks  每次读取一条 CAPTURE_CHUNK 记录，保留准确的接收时间
+    <名称>.idx     每个完整数据包一条 CAPTURE_PACKET 记录
+    三个文件都只追加写入；先写数据再写索引，索引中的位置总在 .bin 范围内。
+    """
+
+    metric_stage = 'capture_write'
+
+    def __init__(self, directory, name, flush_interval=1.0, flush_bytes=256 * 1024, queue_size=100000,
+                 metrics=None):
+        self.name = name
+        self.framer = PacketFramer()
+        self._files = None  # (.bin, .chunks, .idx)
+        self._stream_start = 0  # 本次打开时 .bin 的长度
+        self._offset = 0  # 下一块数据在 .bin 中的位置
+
+        # 统计信息
+        self.bytes_written = 0
+        self.chunks_written = 0
+        self.packets_indexed = 0
+        self.base_path = os.path.join(directory, name)
+
+        super().__init__(directory, flush_interval, flush_bytes, queue_size, metrics)
+
+    def write(self, timestamp, data):
+        """添加一块接收数据（可在任意线程调用），timestamp 为 time.time()"""
+        self._put((timestamp, bytes(data)))
+
+    def _item_size(self, item):
+        return len(item[1])
+
+    def _write_batch(self, items):
+        """追加数据、接收时间和数据包索引"""
+        try:
+            self._open()
+            chunks = bytearray()
+            index = bytearray()
+            for timestamp, data in items:
+                chunks += CAPTURE_CHUNK.pack(self._offset, timestamp)
+                for offset, packet in self.framer.feed_with_offsets(data):
+                    index += CAPTURE_PACKET.pack(self._stream_start + offset, len(packet))
+                self._offset += len(data)
+            data_file, chunk_file, index_file = self._files
+            data_file.write(b''.join(data for _, data in items))
+            data_file.flush()
+            chunk_file.write(chunks)
+            index_file.write(index)
+            chunk_file.flush()
+            index_file.flush()
+            self.bytes_written += sum(len(data) for _, data in items)
+            self.chunks_written += len(items)
+            self.packets_indexed += len(index) // CAPTURE_PACKET.size
+        except Exception as e:
+            logging.error(f"保存原始数据失败: {self.base_path} - {str(e)}")
+
+    def _open(self):
+        """打开（或接着写）记录文件"""
+        if self._files:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.base_path = os.path.join(self.directory, self.name)
+        self._files = tuple(open(self.base_path + ext, 'ab') for ext in ('.bin', '.chunks', '.idx'))
+        self._stream_start = self._offset = self._files[0].tell()
+
+    def _close_files(self):
+        """关闭记录文件，未组成完整数据包的数据不再建立索引"""
+        for f in self._files or ():
+            try:
+                f.close()
+            except Exception as e:
+                logging.error(f"关闭原始数据文件失败: {str(e)}")
+        self._files = None
+        self.framer = PacketFramer()
+
+
+class _MappedRecords:
+    """把文件中的定长记录内存映射为只读序列"""
+
+    def __init__(self, path, record):
+        self.record = record
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // record.size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.record.unpack_from(self.map, i * self.record.size)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+class _Column:
+    """记录序列中的一列（供 bisect 使用）"""
+
+    def __init__(self, records, field):
+        self.records = records
+        self.field = field
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        return self.records[i][self.field]
+
+
+class _PacketTimes:
+    """各数据包的接收时间（供 bisect 使用）"""
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, i):
+        return self.reader.packet_time(i)
+
+
+class CaptureReader:
+    """
+    读取 CaptureWriter 的记录
+
+    .bin 和两个索引文件都内存映射，不需要读入整个文件；数据包的接收时间为
+    其最后一个字节所在读取块的接收时间。
+    """
+
+    def __init__(self, path):
+        base, ext = os.path.splitext(path)
+        self.base_path = base if ext in ('.bin', '.chunks', '.idx') else path
+        self.data_file = open(self.base_path + '.bin', 'rb')
+        self.size = os.fstat(self.data_file.fileno()).st_size
+        self.data = mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.chunks = _MappedRecords(self.base_path + '.chunks', CAPTURE_CHUNK)
+        self.index = _MappedRecords(self.base_path + '.idx', CAPTURE_PACKET)
+        self._chunk_offsets = _Column(self.chunks, 0)
+
+    def __len__(self):
+        """已建立索引的数据包数"""
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.chunks.close()
+        self.index.close()
+        if self.size:
+            self.data.close()
+        self.data_file.close()
+
+    def arrival_time(self, offset):
+        """.bin 中某个字节的接收时间"""
+        i = bisect.bisect_right(self._chunk_offsets, offset) - 1
+        return self.chunks[max(i, 0)][1] if len(self.chunks) else None
+
+    def packet(self, i):
+        """第 i 个数据包（bytes）"""
+        offset, length = self.index[i]
+        return self.data[offset:offset + length]
+
+    def packet_time(self, i):
+        """第 i 个数据包的接收时间"""
+        offset, length = self.index[i]
+        return self.arrival_time(offset + length - 1)
+
+    def find_time(self, timestamp):
+        """接收时间不早于 timestamp 的第一个数据包序号"""
+        return bisect.bisect_left(_PacketTimes(self), timestamp)
+
+    def iter_packets(self, start=0, stop=None):
+        """依次返回 (接收时间, 数据包)"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop):
+            yield self.packet_time(i), self.packet(i)
+
+    def decode(self, start=0, stop=None, decoders=MODE_DECODERS):
+        """解析指定范围的数据包，返回 PacketRecord 列表（timestamp 为接收时间）"""
+        records = []
+        for i, (timestamp, packet) in enumerate(self.iter_packets(start, stop), start):
+            record = decode_packet(packet, i + 1, decoders)
+            record.timestamp = timestamp
+            records.append(record)
+        return records
+
+    def iter_chunks(self, start=0, stop=None):
+        """按原始读取块依次返回 (接收时间, 数据)，用于按原节奏回放"""
+        count = len(self.chunks)
+        stop = count if stop is None else min(stop, count)
+        for i in range(start, stop):
+            offset, timestamp = self.chunks[i]
+            end = self.chunks[i + 1][0] if i + 1 < count else self.size
+            yield timestamp, self.data[offset:end]
@@ -0,0 +1,5 @@
+"""测试时把 IF 目录加入模块搜索路径（IF 下的模块按脚本方式互相导入）"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+"""AsyncSerialTransport：界面处理慢时不丢数据，写串口不阻塞事件循环，停止超时时取消剩余任务"""
+import asyncio
+import threading
+import time
+
+from rs485_async import AsyncSerialTransport
+from rs485_protocol import build_packet
+from rs485_sim import SimulatedDevice, SimulatedSerial
+
+
+def test_slow_gui_loses_no_records():
+    ser = SimulatedSerial(SimulatedDevice(rate=0))
+    transport = AsyncSerialTransport(ser, frame_queue_size=4, result_queue_size=16, late_after=0.05)
+    transport.start()
+    try:
+        # 界面线程暂不 drain：结果队列满后消费者等待，读取队列满后停止读取，数据留在串口缓冲区
+        for i in range(60):
+            ser._receive(build_packet(i % 256, 0x04, i.to_bytes(2, 'big')))
+            time.sleep(0.002)
+        time.sleep(0.1)
+        assert transport.result_queue.full()
+        assert transport.backlog_peak == transport.frame_queue_size
+
+        records = []
+        deadline = time.monotonic() + 5.0
+        while len(records) < 60 and time.monotonic() < deadline:
+            records += [item for kind, _, item in transport.drain() if kind == 'record']
+            time.sleep(0.01)
+        assert [int.from_bytes(record.payload, 'big') for record in records] == list(range(60))
+        assert transport.dropped_results == 0 and transport.dropped_display == 0
+        assert transport.late_records > 0
+    finally:
+        transport.stop()
+        ser.close()
+
+
+class BlockingSerial(SimulatedSerial):
+    """write 阻塞到 release 被设置的模拟串口"""
+
+    def __init__(self):
+        super().__init__(SimulatedDevice(rate=0))
+        self.release = threading.Event()
+
+    def write(self, data):
+        self.release.wait(5.0)
+        return super().write(data)
+
+
+def test_blocked_write_does_not_block_loop():
+    ser = BlockingSerial()
+    transport = AsyncSerialTransport(ser)
+    transport.start()
+    try:
+        sent = transport.send(b'\x01\x02')
+        # 写入阻塞期间事件循环仍能运行其他协程
+        assert asyncio.run_coroutine_threadsafe(asyncio.sleep(0, 'ok'), transport.loop).result(1.0) == 'ok'
+        assert not sent.done()
+        ser.release.set()
+        assert sent.result(1.0) == 2
+        assert transport.bytes_written == 2
+    finally:
+        ser.release.set()
+        transport.stop()
+        ser.close()
+
+
+def test_writes_keep_order():
+    ser = SimulatedSerial(SimulatedDevice(rate=0))
+    written = []
+    ser.write = lambda data: written.append(data) or len(data)
+    transport = AsyncSerialTransport(ser)
+    transport.start()
+    try:
+        futures = [transport.send(bytes([i])) for i in range(50)]
+        for future in futures:
+            future.result(1.0)
+        assert written == [bytes([i]) for i in range(50)]
+    finally:
+        transport.stop()
+        ser.close()
+
+
+def test_stop_cancels_tasks_after_timeout():
+    release = asyncio.Event()
+    consumed = []
+
+    async def stuck(kind, received, item):
+        consumed.append(kind)
+        await release.wait()
+
+    ser = SimulatedSerial(SimulatedDevice(rate=200))
+    transport = AsyncSerialTransport(ser, consumer=stuck)
+    transport.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while not consumed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        tasks = list(transport._tasks)
+        transport.stop(timeout=0.2)
+        assert tasks and all(task.done() for task in tasks)
+        assert not transport.thread.is_alive()
+        assert transport.loop.is_closed()
+    finally:
+        ser.close()
@@ -0,0 +1,71 @@
+"""CaptureWriter / CaptureReader：原始数据记录和按接收时间查找数据包"""
+import pytest
+
+from rs485_protocol import build_packet
+from rs485_storage import CaptureWriter, CaptureReader
+
+T0 = 1700000000.0
+
+
+@pytest.fixture
+def capture(tmp_path):
+    """四次读取：第2个数据包跨两次读取，第3次读取前有噪声字节"""
+    packets = [build_packet(1, 0x04, bytes([i]) * 6) for i in range(4)]
+    reads = [
+        (T0, packets[0] + packets[1][:5]),
+        (T0 + 1.0, packets[1][5:]),
+        (T0 + 2.0, b'\xaa\xbb' + packets[2]),
+        (T0 + 3.5, packets[3] + b'PRDT'),  # 末尾半个包头不建立索引
+    ]
+    writer = CaptureWriter(str(tmp_path), 'capture')
+    for timestamp, data in reads:
+        writer.write(timestamp, data)
+    writer.close()
+    with CaptureReader(str(tmp_path / 'capture.bin')) as reader:
+        yield reader, packets, reads
+
+
+def test_packets_and_arrival_times(capture):
+    reader, packets, _ = capture
+    assert len(reader) == 4
+    assert [reader.packet(i) for i in range(4)] == packets
+    # 接收时间为数据包最后一个字节所在读取块的时间
+    assert [reader.packet_time(i) for i in range(4)] == [T0, T0 + 1.0, T0 + 2.0, T0 + 3.5]
+
+
+def test_find_time(capture):
+    reader, _, _ = capture
+    assert reader.find_time(T0 - 10) == 0
+    assert reader.find_time(T0) == 0
+    assert reader.find_time(T0 + 0.5) == 1
+    assert reader.find_time(T0 + 2.0) == 2
+    assert reader.find_time(T0 + 3.0) == 3
+    assert reader.find_time(T0 + 10) == 4
+
+
+def test_time_range_decode(capture):
+    reader, packets, _ = capture
+    start, stop = reader.find_time(T0 + 0.5), reader.find_time(T0 + 2.5)
+    records = reader.decode(start, stop)
+    assert [r.index for r in records] == [2, 3]
+    assert [r.timestamp for r in records] == [T0 + 1.0, T0 + 2.0]
+    assert all(r.checksum_valid for r in records)
+    assert [r.payload for r in records] == [bytes([1]) * 6, bytes([2]) * 6]
+
+
+def test_chunks_replay_original_reads(capture):
+    reader, _, reads = capture
+    assert list(reader.iter_chunks()) == reads
+    assert reader.size == sum(len(data) for _, data in reads)
+
+
+def test_reopen_appends(tmp_path):
+    packet = build_packet(2, 0x04, b'\x01\x02')
+    for timestamp in (T0, T0 + 5):
+        writer = CaptureWriter(str(tmp_path), 'capture')
+        writer.write(timestamp, packet)
+        writer.close()
+    with CaptureReader(str(tmp_path / 'capture')) as reader:
+        assert len(reader) == 2
+        assert [t for t, _ in reader.iter_packets()] == [T0, T0 + 5]
+        assert reader.find_time(T0 + 1) == 1
@@ -0,0 +1,68 @@
+"""ColumnStore：按天分区、按时间范围和通道读取列文件"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from rs485_columns import ColumnStore, channel_columns
+from rs485_protocol import FLOW1_SCHEMA
+from rs485_storage import TableWriter
+
+
+def write_partition(directory, day, times, columns, name='vodata'):
+    """直接写一个分区的列文件（TableWriter 只写当天的分区）"""
+    path = directory / f"{day:%Y%m%d}_{name}_columns"
+    path.mkdir()
+    np.arange(1, len(times) + 1, dtype=np.float64).tofile(path / 'PacketIndex.f64')
+    np.asarray(times, dtype=np.float64).tofile(path / 'Timestamp.f64')
+    for column, values in columns.items():
+        np.asarray(values, dtype=np.float32).tofile(path / f"{column}.f32")
+
+
+@pytest.fixture
+def store(tmp_path):
+    day1, day2 = datetime(2026, 10, 1), datetime(2026, 10, 2)
+    t1, t2 = day1.timestamp(), day2.timestamp()
+    write_partition(tmp_path, day1, [t1 + 10, t1 + 20, t1 + 30], {'CH1T1': [1, 2, 3], 'CH2PT': [4, 5, 6]})
+    # 第二天没有 CH2PT；CH1T1 比时间列多一行（写入中断），多出的行不读取
+    write_partition(tmp_path, day2, [t2 + 10, t2 + 20], {'CH1T1': [7, 8, 9]})
+    write_partition(tmp_path, day2, [t2], {'CH1T1': [0]}, name='dndata')
+    return ColumnStore(str(tmp_path), 'vodata'), t1, t2
+
+
+def test_read_time_range_across_partitions(store):
+    store, t1, t2 = store
+    data = store.read(t1 + 20, datetime(2026, 10, 2, 0, 0, 20), columns=['CH1T1', 'CH2PT'])
+    assert list(data) == ['PacketIndex', 'Timestamp', 'CH1T1', 'CH2PT']
+    assert data['Timestamp'].tolist() == [t1 + 20, t1 + 30, t2 + 10]
+    assert data['PacketIndex'].tolist() == [2, 3, 1]
+    assert data['CH1T1'].tolist() == [2, 3, 7]
+    assert data['CH2PT'][:2].tolist() == [5, 6] and np.isnan(data['CH2PT'][2])
+
+
+def test_partitions_and_columns(store):
+    store, _, _ = store
+    assert [day.day for day, _ in store.partitions()] == [1, 2]
+    assert [day.day for day, _ in store.partitions(start=datetime(2026, 10, 2, 12))] == [2]
+    assert store.columns() == ['CH1T1', 'CH2PT', 'PacketIndex', 'Timestamp']
+    assert len(store.read()['Timestamp']) == 5
+
+
+def test_channel_columns():
+    assert channel_columns([1, 3], ['T1', 'PT']) == ['CH1T1', 'CH1PT', 'CH3T1', 'CH3PT']
+    assert set(channel_columns()) <= set(FLOW1_SCHEMA.names)
+    with pytest.raises(ValueError):
+        channel_columns(signals=['X9'])
+
+
+def test_table_writer_columns_match_csv(tmp_path):
+    headers = ['PacketIndex', 'Timestamp', 'CH1T1', 'CH1B1']
+    now = datetime.now().timestamp()
+    writer = TableWriter(str(tmp_path), 'vodata', headers, time_column=1, binary=True, column_type='f')
+    writer.write_rows([[1, now, 0.1, 7], [2, now + 1, '超出上限', 8]])
+    writer.close()
+    data = ColumnStore(str(tmp_path)).read(columns=['CH1T1', 'CH1B1'])
+    assert data['Timestamp'].dtype == np.float64 and data['CH1T1'].dtype == np.float32
+    assert data['Timestamp'].tolist() == [now, now + 1]  # 时间戳列始终为 float64，不损失精度
+    assert data['CH1T1'][0] == pytest.approx(0.1) and np.isnan(data['CH1T1'][1])
+    assert data['CH1B1'].tolist() == [7, 8]
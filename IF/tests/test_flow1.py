@@ -0,0 +1,69 @@
+"""测试流程1：逐个解码（decode_packet）与批量解码（decode_flow1_batch）结果一致"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from rs485_protocol import FLOW1_SCHEMA, LTC2413_VREF, ADC12_FULL_SCALE, build_packet, decode_packet
+from rs485_numpy import decode_flow1_batch
+from rs485_sim import encode_ltc2413
+
+
+def flow1_payload(rng, over=(), under=()):
+    """生成测试流程1有用数据，over/under 中的 LTC2413 字段序号设为超出上限/下限"""
+    values = []
+    for i, (_, kind) in enumerate(FLOW1_SCHEMA.fields):
+        if kind == 'ltc2413':
+            values.append(encode_ltc2413(rng.uniform(0, LTC2413_VREF), i in over, i in under))
+        elif kind == 'adc12':
+            values.append(rng.randrange(ADC12_FULL_SCALE))
+        elif kind == 'byte':
+            values.append(rng.randrange(256))
+    return FLOW1_SCHEMA.struct.pack(*values)
+
+
+@pytest.fixture
+def payloads():
+    rng = random.Random(1)
+    ltc = [i for i, (_, kind) in enumerate(FLOW1_SCHEMA.fields) if kind == 'ltc2413']
+    return [
+        flow1_payload(rng),
+        flow1_payload(rng, over=ltc[:2]),
+        flow1_payload(rng, under=ltc[-1:]),
+        flow1_payload(rng, over=ltc[::2], under=ltc[1::2]),
+    ]
+
+
+def test_batch_matches_scalar_decoder(payloads):
+    batch = decode_flow1_batch(payloads)
+    assert batch.vodata.shape == (len(payloads), len(FLOW1_SCHEMA.names))
+    for row, payload in enumerate(payloads):
+        record = decode_packet(build_packet(1, 0x03, payload), row + 1)
+        assert record.checksum_valid and record.error is None
+        for col, (vo, dn) in enumerate(zip(record.values.vodata, record.values.dndata)):
+            if vo == "超出上限":
+                assert dn == "N/A"
+                assert batch.over_range[row, col] and not batch.under_range[row, col]
+                assert math.isnan(batch.vodata[row, col]) and math.isnan(batch.dndata[row, col])
+            elif vo == "超出下限":
+                assert dn == "N/A"
+                assert batch.under_range[row, col] and not batch.over_range[row, col]
+                assert math.isnan(batch.vodata[row, col]) and math.isnan(batch.dndata[row, col])
+            else:
+                assert not batch.over_range[row, col] and not batch.under_range[row, col]
+                assert batch.vodata[row, col] == pytest.approx(vo)
+                assert batch.dndata[row, col] == pytest.approx(dn)
+
+
+def test_out_of_range_fields_are_flagged(payloads):
+    batch = decode_flow1_batch(payloads)
+    assert not batch.over_range[0].any() and not batch.under_range[0].any()
+    assert batch.over_range[1].sum() == 2
+    assert batch.under_range[2].sum() == 1
+    assert np.isnan(batch.vodata[3]).sum() == batch.over_range[3].sum() + batch.under_range[3].sum()
+
+
+def test_short_payload_is_rejected():
+    with pytest.raises(ValueError):
+        decode_flow1_batch([b'\x00' * (FLOW1_SCHEMA.size - 1)])
@@ -0,0 +1,57 @@
+"""PacketFramer 分帧：重新同步、跨读取块的包尾和有用数据中的 "$$$$" """
+from rs485_protocol import PacketFramer, build_packet, PACKET_HEADER, PACKET_FOOTER
+
+
+def test_packet_split_at_every_byte():
+    packet = build_packet(1, 0x04, bytes(range(32)))
+    framer = PacketFramer()
+    packets = []
+    for i in range(len(packet)):
+        packets += framer.feed(packet[i:i + 1])
+    assert packets == [packet]
+    assert framer.pending_bytes() == 0
+
+
+def test_footer_split_across_reads():
+    first = build_packet(1, 0x04, b'\x01\x02\x03\x04')
+    second = build_packet(2, 0x04, b'\x05\x06')
+    stream = first + second
+    cut = stream.index(PACKET_FOOTER) + 2  # 第一个包尾 "$$" | "$$"
+    framer = PacketFramer()
+    assert framer.feed(stream[:cut]) == []
+    assert framer.feed(stream[cut:]) == [first, second]
+
+
+def test_footer_inside_payload_uses_declared_length():
+    packet = build_packet(1, 0x04, b'ab$$$$cd$')
+    framer = PacketFramer()
+    # 有用数据中的 "$$$$" 已收到、声明的包尾尚未收到时应等待
+    assert framer.feed(packet[:-8]) == []
+    assert framer.feed(packet[-8:]) == [packet]
+
+
+def test_garbage_before_packet_is_discarded():
+    packet = build_packet(1, 0x04, b'\x00' * 8)
+    framer = PacketFramer()
+    assert framer.feed(b'\xff\x00noise' + packet) == [packet]
+    assert framer.discarded_bytes == 7
+    assert framer.packet_count == 1
+
+
+def test_resync_after_false_header():
+    packet = build_packet(1, 0x04, b'\x10\x20')
+    framer = PacketFramer(max_packet_len=64)
+    # 假包头后没有包尾，超过 max_packet_len 后放弃并找到真正的包头
+    garbage = PACKET_HEADER + b'\x00' * 70
+    assert framer.feed(garbage) == []
+    assert framer.feed(packet) == [packet]
+    assert framer.discarded_bytes == len(garbage)
+
+
+def test_offsets_are_stream_positions():
+    packets = [build_packet(1, 0x04, bytes([i]) * 4) for i in range(3)]
+    stream = b'xx' + packets[0] + packets[1] + b'y' + packets[2]
+    framer = PacketFramer()
+    found = framer.feed_with_offsets(stream[:10]) + framer.feed_with_offsets(stream[10:])
+    assert [packet for _, packet in found] == packets
+    assert [offset for offset, _ in found] == [stream.index(p) for p in packets]
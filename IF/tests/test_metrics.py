@@ -0,0 +1,55 @@
+"""性能指标: 多线程计数和瞬时值的登记/取消"""
+import threading
+
+from rs485_async import AsyncSerialTransport
+from rs485_metrics import Metrics
+from rs485_sim import SimulatedDevice, SimulatedSerial
+from rs485_storage import LogWriter, TableWriter
+
+
+def test_count_from_several_threads():
+    metrics = Metrics()
+
+    def work():
+        for _ in range(20000):
+            metrics.count('log_write_dropped')
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert metrics.snapshot()['counters']['log_write_dropped'] == 80000
+
+
+def test_remove_gauge_keeps_newer_registration():
+    metrics = Metrics()
+    old, new = (lambda: 1), (lambda: 2)
+    metrics.gauge('result_queue', old)
+    metrics.gauge('result_queue', new)
+    metrics.remove_gauge('result_queue', old)
+    assert metrics.snapshot()['gauges'] == {'result_queue': 2}
+    metrics.remove_gauge('result_queue', new)
+    assert metrics.snapshot()['gauges'] == {}
+
+
+def test_writers_unregister_on_close(tmp_path):
+    metrics = Metrics()
+    log_writer = LogWriter(str(tmp_path), metrics=metrics)
+    old = TableWriter(str(tmp_path), 'vodata', metrics=metrics)
+    new = TableWriter(str(tmp_path), 'vodata', metrics=metrics)  # 重新打开时先建新的再关旧的
+    old.close()
+    assert set(metrics.snapshot()['gauges']) == {'log_write_queue', 'csv_write:vodata_queue'}
+    new.close()
+    log_writer.close()
+    assert metrics.snapshot()['gauges'] == {}
+
+
+def test_transport_unregisters_on_stop():
+    metrics = Metrics()
+    ser = SimulatedSerial(SimulatedDevice(rate=100))
+    transport = AsyncSerialTransport(ser, metrics=metrics)
+    transport.start()
+    assert {'frame_queue', 'result_queue'} <= set(metrics.snapshot()['gauges'])
+    transport.stop()
+    ser.close()
+    assert not {'frame_queue', 'result_queue'} & set(metrics.snapshot()['gauges'])
@@ -0,0 +1,46 @@
+"""NumPy 批量解码与逐个样本解码结果一致"""
+import math
+import random
+import struct
+
+import pytest
+
+from rs485_protocol import decode_ltc2413, decode_adc12, LTC2413_VREF
+from rs485_numpy import decode_ltc2413_array, decode_adc12_array
+from rs485_sim import encode_ltc2413
+
+
+def ltc_payload(n, seed=0):
+    rng = random.Random(seed)
+    words = [encode_ltc2413(rng.uniform(0, LTC2413_VREF), i % 7 == 3, i % 7 == 5) for i in range(n)]
+    # 符号位为0的数据按 VREF 减去提取值计算
+    words.append(0x00000000 | (rng.randrange(1 << 24) << 5))
+    return struct.pack(f'>{len(words)}I', *words)
+
+
+@pytest.mark.parametrize('tail', [b'', b'\x01\x02\x03'])
+def test_ltc2413_array_matches_scalar(tail):
+    payload = ltc_payload(16) + tail
+    samples = decode_ltc2413(payload)
+    array = decode_ltc2413_array(payload)
+    assert len(array.raw) == len(samples) == 17
+    for n, sample in enumerate(samples):
+        assert array.raw[n] == sample.combined
+        if sample.extracted == "N/A":
+            assert array.over_range[n] == (sample.value == "超出上限")
+            assert array.under_range[n] == (sample.value == "超出下限")
+            assert math.isnan(array.voltages[n])
+        else:
+            assert not (array.over_range[n] or array.under_range[n])
+            assert array.codes[n] == sample.extracted
+            assert array.voltages[n] == pytest.approx(sample.value, abs=1e-12)
+
+
+@pytest.mark.parametrize('tail', [b'', b'\x7f'])
+def test_adc12_array_matches_scalar(tail):
+    rng = random.Random(1)
+    payload = struct.pack('>16H', *(rng.randrange(4096) for _ in range(16))) + tail
+    samples = decode_adc12(payload)
+    array = decode_adc12_array(payload)
+    assert array.raw.tolist() == [sample.combined for sample in samples]
+    assert array.voltages.tolist() == pytest.approx([sample.value for sample in samples], abs=1e-12)
@@ -0,0 +1,69 @@
+"""实时曲线: 环形缓冲区和长时间窗口的分段最值历史"""
+import numpy as np
+import pytest
+
+from rs485_plot import RingBuffer, MinMaxHistory, StripChart, PLOT_FIELDS, PLOT_WINDOWS, minmax_decimate
+
+
+class FakeRoot:
+    def after(self, ms, func):
+        pass
+
+
+def test_ring_buffer_keeps_latest_rows():
+    buffer = RingBuffer(2, capacity=4)
+    assert buffer.view()[0].size == 0
+    for i in range(10):
+        buffer.append(float(i), [i, -i])
+    times, values = buffer.view()
+    assert times.tolist() == [6, 7, 8, 9]
+    assert values[:, 1].tolist() == [-6, -7, -8, -9]
+    assert buffer.window(7, 8)[0].tolist() == [7, 8]
+
+
+def test_history_keeps_min_and_max_per_interval():
+    history = MinMaxHistory(1, interval=10, capacity=3)
+    for t in range(50):
+        history.append(float(t), [100.0 if t == 23 else t % 10])
+    times, values = history.window()
+    # 容量3段，加上正在累计的一段
+    assert times.tolist() == [10, 10, 20, 20, 30, 30, 40, 40]
+    assert values[:, 0].tolist() == [0, 9, 0, 100, 0, 9, 0, 9]
+    assert history.window(25, 35)[0].tolist() == [30, 30]
+
+
+def test_history_ignores_nan():
+    history = MinMaxHistory(1, interval=10)
+    for t, v in ((0, np.nan), (1, 2.0), (2, np.nan), (3, -1.0)):
+        history.append(float(t), [v])
+    assert history.window()[1][:, 0].tolist() == [-1.0, 2.0]
+
+
+@pytest.mark.parametrize('window', sorted(PLOT_WINDOWS.values()))
+def test_window_is_filled_beyond_ring_buffer(window):
+    chart = StripChart(FakeRoot(), None, capacity=100, window=window)
+    chart.fields = [PLOT_FIELDS[0]]
+    column = chart._columns[0]
+    vodata = [0.0] * (max(chart._columns) + 1)
+    start = 1.7e9
+    duration = window + 600
+    for t in range(0, duration, 5):
+        vodata[column] = 50.0 if t == duration - window // 2 else 1.0
+        chart.add(start + t, vodata)
+    times, values = chart.visible(400)
+    t1 = start + duration - 5
+    # 窗口起点附近（一个分段以内）到最新的数据包都有数据
+    assert times[0] - (t1 - window) < 10
+    assert t1 - times[-1] <= (t1 - times[0]) / 400  # 最后一段的起点
+    assert values.max() == 50.0
+    assert np.all(np.diff(times) >= 0)
+
+
+def test_minmax_decimate_keeps_spikes():
+    times = np.arange(1000, dtype=float)
+    values = np.zeros((1000, 1), dtype=np.float32)
+    values[123] = 7
+    values[456] = -3
+    out_times, out_values = minmax_decimate(times, values, 50)
+    assert len(out_times) == 100
+    assert out_values.max() == 7 and out_values.min() == -3
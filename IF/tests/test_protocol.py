@@ -0,0 +1,103 @@
+"""decode_packet / PacketDecoder：各解析方式的解码结果、长度不足的数据包、校验和与命令状态对照表"""
+import pytest
+
+from rs485_protocol import (CommandTable, PacketDecoder, build_packet, calculate_checksum, decode_packet,
+                            ltc2413_word, status_payload, ADC12_VREF, COMMAND_COMPLETE, COMMAND_STARTED, LTC2413_OVER_RANGE, PACKET_FOOTER,
+                            PACKET_HEADER, WORKFLOW_COMMANDS)
+
+
+def test_decode_adc12_packet():
+    record = decode_packet(build_packet(3, 0x04, b'\x0f\xff\x08\x00\x01'), index=7)
+    assert (record.index, record.device_id, record.parse_mode, record.data_length) == (7, 3, 0x04, 5)
+    assert record.checksum_valid and record.complete and record.error is None
+    assert [sample.combined for sample in record.values] == [0x0FFF, 0x0800]  # 尾部单字节忽略
+    assert record.values[1].value == pytest.approx(ADC12_VREF / 2)
+
+
+def test_decode_ltc2413_packet():
+    words = [LTC2413_OVER_RANGE, 0x20000000 | (0x400000 << 5), 0x400000 << 5]  # 第3位为符号位
+    payload = b''.join(word.to_bytes(4, 'big') for word in words)
+    record = decode_packet(build_packet(1, 0x01, payload))
+    over, positive, negative = record.values
+    assert over.value == "超出上限" and over.result == "超出测量范围"
+    assert positive.extracted == 0x400000 and positive.value == pytest.approx(1.25)
+    assert negative.extracted == 0x400000 and negative.value == pytest.approx(3.75)
+    assert ltc2413_word(words[1])[2] == positive.value
+
+
+def test_unknown_mode_is_not_decoded():
+    record = decode_packet(build_packet(1, 0x66, b'\x01\x02'))
+    assert record.checksum_valid and record.values is None
+
+
+@pytest.mark.parametrize('content, missing', [
+    (b'', '数据长度'),
+    (b'\x00\x02', '设备号'),
+    (b'\x00\x02\x01', '解析方式'),
+])
+def test_short_packet_reports_missing_field(content, missing):
+    record = decode_packet(PACKET_HEADER + content + PACKET_FOOTER + b'\x00' * 4)
+    assert record.missing_field == missing
+    assert record.values is None
+
+
+def test_truncated_payload():
+    record = decode_packet(PACKET_HEADER + b'\x00\x04\x01\x04\x01\x02' + PACKET_FOOTER + (3).to_bytes(4, 'big'))
+    assert not record.complete
+    assert record.checksum_valid  # 校验和按实际收到的有用数据计算
+    assert record.messages == ['实际长度: 2 字节, 预期: 4 字节']
+
+
+def test_decoder_feed_counts_packets():
+    decoder = PacketDecoder()
+    stream = b''.join(build_packet(i, 0x04, bytes([i, i])) for i in range(5))
+    records = decoder.feed(stream[:30]) + decoder.feed(stream[30:])
+    assert [record.index for record in records] == [1, 2, 3, 4, 5]
+    assert [record.device_id for record in records] == [0, 1, 2, 3, 4]
+    assert decoder.packet_count == 5 and decoder.checksum_failures == 0
+
+
+def test_command_table_matches_status_packets():
+    table = CommandTable()
+    for workflow, command in WORKFLOW_COMMANDS.items():
+        started = table.decode(status_payload(command, COMMAND_STARTED))
+        complete = table.decode(status_payload(command, COMMAND_COMPLETE))
+        assert (started.workflow, started.complete, started.message) == (workflow, False, f"{workflow}开始采集")
+        assert (complete.workflow, complete.complete) == (workflow, True)
+    unknown = table.decode(b'\x00\x02\x01\x00\x00\x00\x09\x09')
+    assert unknown.workflow is None and unknown.message == "未知的命令: 00 02 01 00 00 00 09 09"
+
+
+def test_command_table_register_replaces_old_status():
+    table = CommandTable()
+    old = WORKFLOW_COMMANDS["流程1"]
+    table.register("流程1", "00 00 00 00 00 00 02 09")
+    assert table.decode(status_payload(old)).workflow is None
+    assert table.decode(status_payload(bytes.fromhex("00 00 00 00 00 00 02 09"))).workflow == "流程1"
+    assert table.hex_commands()["流程1"] == "00 00 00 00 00 00 02 09"
+    with pytest.raises(ValueError):
+        table.register("新流程", b'\x00\x01')
+
+
+def test_command_status_packet_decoded():
+    record = decode_packet(build_packet(1, 0x00, status_payload(WORKFLOW_COMMANDS["铂电阻"])))
+    assert record.values.workflow == "铂电阻" and record.values.complete
+
+
+def test_checksum_failures_counted_per_device():
+    good = build_packet(2, 0x04, b'\x01\x02')
+    bad = bytearray(build_packet(5, 0x04, b'\x01\x02'))
+    bad[-1] ^= 0xFF
+    decoder = PacketDecoder()
+    records = decoder.feed(good + bytes(bad) + bytes(bad))
+    assert [record.checksum_valid for record in records] == [True, False, False]
+    assert records[1].values is None  # 校验失败时不解码
+    assert records[1].calculated_checksum == 3 and records[1].received_checksum == 3 ^ 0xFF
+    assert decoder.checksum_failures == 2
+    assert decoder.checksum_failures_by_device == {5: 2}
+
+
+def test_checksum_wraps_to_32_bits():
+    payload = b'\xff' * 0x10000 + b'\x01'
+    assert calculate_checksum(payload) == calculate_checksum(memoryview(payload)) == 0xFF * 0x10000 + 1
+    assert calculate_checksum(b'\xff' * 0x1010102) == (0xFF * 0x1010102) & 0xFFFFFFFF
@@ -0,0 +1,77 @@
+"""rs485_replay：十六进制接收日志和原始抓包文件的批量解析结果与逐包解析一致"""
+import csv
+import math
+from datetime import datetime
+
+import pytest
+
+from rs485_protocol import FLOW1_SCHEMA, PacketFramer, decode_packet
+from rs485_replay import replay_file
+from rs485_sim import SimulatedDevice
+from rs485_storage import CaptureWriter
+
+T0 = datetime(2026, 10, 17, 8, 0, 0).timestamp()
+
+
+@pytest.fixture
+def stream():
+    """测试流程1和12位ADC数据包混合，含少量错误数据"""
+    return SimulatedDevice(modes=(0x03, 0x04), corrupt=0.05, seed=3).stream(200)
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def expected_rows(stream):
+    """逐包解析得到的测试流程1 vodata 行（不含序号和时间）"""
+    rows = []
+    for packet in PacketFramer().feed(stream):
+        record = decode_packet(packet)
+        if record.checksum_valid and record.parse_mode == 0x03 and record.complete:
+            rows.append(record.values.vodata)
+    return rows
+
+
+def assert_same_values(table, expected):
+    assert len(table) == len(expected) > 0
+    for row, values in zip(table, expected):
+        for text, value in zip(row[2:], values):
+            if isinstance(value, str):
+                assert text == value
+            else:
+                assert math.isclose(float(text), value, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def test_replay_hex_log(tmp_path, stream):
+    log = tmp_path / 'RS_20261017_receive.log'
+    with open(log, 'w', encoding='utf-8') as f:
+        f.write("[2026-10-17 07:59:59.000] [系统] 已连接\n")
+        for n, i in enumerate(range(0, len(stream), 500)):
+            stamp = datetime.fromtimestamp(T0 + n * 0.25).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            f.write(f"[{stamp}] {stream[i:i + 500].hex(' ').upper()}\n")
+    stats = replay_file(str(log), str(tmp_path / 'out'), chunk_size=4096)
+
+    vodata = read_csv(tmp_path / 'out' / 'RS_20261017_receive_vodata.csv')
+    dndata = read_csv(tmp_path / 'out' / 'RS_20261017_receive_dndata.csv')
+    assert vodata[0] == dndata[0] == FLOW1_SCHEMA.headers
+    assert_same_values(vodata[1:], expected_rows(stream))
+    assert [row[0] for row in vodata[1:]] == [str(i + 1) for i in range(len(vodata) - 1)]
+    assert vodata[1][1].startswith('2026-10-17 08:00:0') and len(vodata[1][1]) == len('2026-10-17 08:00:00')
+    assert stats['bytes'] == len(stream)
+    assert stats['flow1_rows'] == len(vodata) - 1
+    assert stats['checksum_failures'] > 0
+
+
+def test_replay_capture(tmp_path, stream):
+    writer = CaptureWriter(str(tmp_path), 'capture')
+    for n, i in enumerate(range(0, len(stream), 700)):
+        writer.write(T0 + n, stream[i:i + 700])
+    writer.close()
+    stats = replay_file(str(tmp_path / 'capture.bin'), str(tmp_path / 'out'), raw=True)
+
+    vodata = read_csv(tmp_path / 'out' / 'capture_vodata.csv')
+    assert_same_values(vodata[1:], expected_rows(stream))
+    assert vodata[1][1] == datetime.fromtimestamp(T0).strftime('%Y-%m-%d %H:%M:%S')
+    assert stats['bytes'] == len(stream)
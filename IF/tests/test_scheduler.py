@@ -0,0 +1,95 @@
+"""CommandScheduler：采集完成后发送下一条、超时重发、重试次数用完后停止"""
+import asyncio
+
+import pytest
+
+from rs485_protocol import WORKFLOW_COMMANDS
+from rs485_async import AsyncSerialTransport
+from rs485_scheduler import CommandScheduler
+from rs485_sim import SimulatedDevice, SimulatedSerial
+
+
+class SilentDevice(SimulatedDevice):
+    """前 ignore 条指令不响应的模拟设备"""
+
+    def __init__(self, ignore, **kwargs):
+        super().__init__(rate=0, acquisition_time=0.01, **kwargs)
+        self.ignore = ignore
+
+    def respond(self, data):
+        if self.ignore > 0:
+            self.ignore -= 1
+            return []
+        return super().respond(data)
+
+
+@pytest.fixture
+def make_transport():
+    opened = []
+
+    def make(ignore):
+        ser = SimulatedSerial(SilentDevice(ignore))
+        transport = AsyncSerialTransport(ser)
+        transport.start()
+        opened.append((ser, transport))
+        return transport
+    yield make
+    for ser, transport in opened:
+        transport.stop()
+        ser.close()
+
+
+def run(scheduler, coro, timeout=5.0):
+    """在传输的事件循环中执行协程"""
+    return asyncio.run_coroutine_threadsafe(coro, scheduler.transport.loop).result(timeout)
+
+
+def test_complete_without_retry(make_transport):
+    events = []
+    scheduler = CommandScheduler(make_transport(0), timeout=1.0, retries=2,
+                                 listener=lambda *event: events.append(event[:2]))
+    command = WORKFLOW_COMMANDS["流程1"]
+    record = run(scheduler, scheduler.execute("流程1", command))
+    assert record.parse_mode == 0x00 and record.payload[3:] == command[3:]
+    assert (scheduler.sent, scheduler.completed, scheduler.timeouts) == (1, 1, 0)
+    assert events == [('sent', "流程1"), ('complete', "流程1")]
+    assert scheduler.last_latency is not None
+
+
+def test_timeout_then_retry(make_transport):
+    events = []
+    scheduler = CommandScheduler(make_transport(1), timeout=0.2, retries=2,
+                                 listener=lambda event, workflow, detail: events.append((event, detail)))
+    run(scheduler, scheduler.execute("铂电阻", WORKFLOW_COMMANDS["铂电阻"]))
+    assert (scheduler.sent, scheduler.completed, scheduler.timeouts) == (2, 1, 1)
+    assert [event for event, _ in events] == ['sent', 'timeout', 'sent', 'complete']
+    assert events[2] == ('sent', 1)  # 第二次发送（重试序号1）
+
+
+def test_retries_exhausted(make_transport):
+    scheduler = CommandScheduler(make_transport(10), timeout=0.1, retries=2)
+    with pytest.raises(TimeoutError):
+        run(scheduler, scheduler.execute("热敏电阻", WORKFLOW_COMMANDS["热敏电阻"]))
+    assert (scheduler.sent, scheduler.completed, scheduler.timeouts) == (3, 0, 3)
+
+
+def test_sequence_cycles(make_transport):
+    events = []
+    scheduler = CommandScheduler(make_transport(0), timeout=1.0, retries=0,
+                                 listener=lambda event, workflow, detail: events.append((event, workflow)))
+    sequence = [("热敏电阻", WORKFLOW_COMMANDS["热敏电阻"]), ("流程1", WORKFLOW_COMMANDS["流程1"])]
+    scheduler.start(sequence, cycles=2).result(5.0)
+    assert not scheduler.running
+    assert scheduler.cycles == 2 and scheduler.completed == 4
+    assert [workflow for event, workflow in events if event == 'complete'] == ["热敏电阻", "流程1"] * 2
+    assert events[-1] == ('finished', None)
+
+
+def test_error_stops_sequence(make_transport):
+    events = []
+    scheduler = CommandScheduler(make_transport(10), timeout=0.05, retries=0,
+                                 listener=lambda event, workflow, detail: events.append(event))
+    future = scheduler.start([("流程1", WORKFLOW_COMMANDS["流程1"])])
+    with pytest.raises(TimeoutError):
+        future.result(5.0)
+    assert events == ['sent', 'timeout', 'error']
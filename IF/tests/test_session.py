@@ -0,0 +1,61 @@
+"""多串口采集: 按接收时间合并，二进制列文件保留串口名"""
+import time
+
+from rs485_columns import ColumnStore
+from rs485_session import MultiPortSession
+from rs485_sim import SimulatedDevice, SimulatedSerial
+
+
+def make_session(tmp_path, **kwargs):
+    ports = {f"SIM{i}": SimulatedSerial(SimulatedDevice(modes=(0x03,), rate=200, device_id=i, seed=i))
+             for i in (1, 2, 3)}
+    return MultiPortSession(ports, directory=str(tmp_path), **kwargs)
+
+
+def run(session, seconds):
+    items = []
+    session.start()
+    try:
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            time.sleep(0.05)
+            items += session.drain(10000)
+    finally:
+        session.stop()
+        for ser in session.ports.values():
+            ser.close()
+    return items + session.drain(10000)
+
+
+def test_merged_stream_is_time_ordered(tmp_path):
+    session = make_session(tmp_path)
+    items = run(session, 1.0)
+    times = [received for _, _, received, _ in items]
+    assert len({name for name, _, _, _ in items}) == 3
+    assert times == sorted(times)
+    assert session.late_results == 0
+
+
+def test_binary_columns_keep_port_names(tmp_path):
+    session = make_session(tmp_path, binary=True)
+    items = run(session, 0.5)
+    rows = [(name, received) for name, kind, received, item in items
+            if kind == 'record' and item.parse_mode == 0x03 and item.checksum_valid]
+    data = ColumnStore(str(tmp_path), 'session_vodata').read(columns=['Port', 'CH1T1'])
+    assert data['Port'].tolist() == [name for name, _ in rows]
+    assert data['PacketIndex'].tolist() == list(range(1, len(rows) + 1))
+    assert data['Timestamp'].tolist() == [received for _, received in rows]
+
+
+def test_label_codes_survive_reopen(tmp_path):
+    from rs485_storage import TableWriter
+    headers = ['Port', 'PacketIndex', 'Timestamp', 'CH1T1']
+    now = time.time()
+    for rows in ([['A', 1, now, 0.5], ['B', 2, now + 1, 0.6]], [['B', 3, now + 2, 0.7], ['C', 4, now + 3, 0.8]]):
+        writer = TableWriter(str(tmp_path), 'session_vodata', headers=headers, time_column=2, binary=True,
+                             label_columns=(0,))
+        writer.write_rows(rows)
+        writer.close()
+    data = ColumnStore(str(tmp_path), 'session_vodata').read(columns=['Port', 'CH1T1'])
+    assert data['Port'].tolist() == ['A', 'B', 'B', 'C']
+    assert data['PacketIndex'].dtype.itemsize == 8
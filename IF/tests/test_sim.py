@@ -0,0 +1,78 @@
+"""模拟设备和性能测试：生成的数据包可解码、响应工作流程指令、伪终端串口、基准对比"""
+import os
+import time
+
+import pytest
+
+from rs485_bench import bench_end_to_end, compare, generate_traffic, percentiles
+from rs485_protocol import PacketDecoder, PacketFramer, WORKFLOW_COMMANDS
+from rs485_sim import SimulatedDevice, SimulatedSerial, PtySerialLink, ALL_MODES
+
+
+def test_generated_frames_decode():
+    device = SimulatedDevice(seed=5)
+    records = PacketDecoder().feed(device.stream(500))
+    assert len(records) == 500
+    assert all(record.checksum_valid and record.error is None for record in records)
+    assert {record.parse_mode for record in records} == set(ALL_MODES)
+    assert SimulatedDevice(seed=5).stream(20) == SimulatedDevice(seed=5).stream(20)
+
+
+def test_checksum_corruption_is_detected():
+    device = SimulatedDevice(modes=(0x04,), corrupt=0.2, seed=2)
+    decoder = PacketDecoder()
+    decoder.feed(device.stream(1000))
+    assert device.corrupted['checksum'] > 0
+    assert decoder.checksum_failures >= device.corrupted['checksum']
+
+
+def test_serial_responds_to_workflow_command():
+    ser = SimulatedSerial(SimulatedDevice(rate=0, acquisition_time=0.01), timeout=0.5)
+    try:
+        ser.write(WORKFLOW_COMMANDS["流程1"])
+        data = b''
+        deadline = time.monotonic() + 2.0
+        while len(PacketFramer().feed(data)) < 3 and time.monotonic() < deadline:
+            data += ser.read(4096)
+        records = PacketDecoder().feed(data)
+        assert [record.parse_mode for record in records] == [0x00, 0x03, 0x00]
+        assert [record.values.complete for record in (records[0], records[2])] == [False, True]
+        assert records[2].values.workflow == "流程1"
+        ser.timeout = 0
+        assert ser.read(10) == b''  # timeout=0 时不等待
+    finally:
+        ser.close()
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='pseudo terminals are POSIX only')
+def test_pty_link_with_pyserial():
+    serial = pytest.importorskip('serial')
+    link = PtySerialLink(SimulatedDevice(rate=0, acquisition_time=0.01))
+    ser = serial.Serial(link.port, timeout=0.2)
+    try:
+        ser.write(WORKFLOW_COMMANDS["热敏电阻"])
+        decoder = PacketDecoder()
+        records = []
+        deadline = time.monotonic() + 2.0
+        while len(records) < 3 and time.monotonic() < deadline:
+            records += decoder.feed(ser.read(4096))
+        assert [record.parse_mode for record in records] == [0x00, 0x04, 0x00]
+    finally:
+        ser.close()
+        link.close()
+
+
+def test_bench_helpers():
+    data = generate_traffic(0.05)
+    assert len(data) >= 0.05 * 1024 * 1024
+    assert percentiles([0.001, 0.002, 0.003]) == {'p50': 2000.0, 'p90': 3000.0, 'p99': 3000.0}
+    regressions = compare({'framer': {'rate': 70}, 'decode': {'rate': 95}},
+                          {'framer': {'rate': 100}, 'decode': {'rate': 100}}, 0.2)
+    assert regressions == [('framer', 100, 70)]
+
+
+def test_bench_end_to_end():
+    received, elapsed, latencies, stats, device = bench_end_to_end(500, 0.5)
+    assert received > 0 and latencies
+    assert stats['checksum_failures'] == 0
+    assert received <= device.frames
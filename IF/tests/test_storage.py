@@ -0,0 +1,76 @@
+"""LogWriter：按类型写入、带时间戳、按大小切换文件；TableWriter：表头只写一次"""
+import csv
+import os
+from datetime import datetime
+
+from rs485_storage import LogWriter, TableWriter
+
+T0 = 1700000000.0
+
+
+def log_path(directory, log_type, suffix=''):
+    return os.path.join(directory, f"RS_{datetime.now():%Y%m%d}_{log_type}{suffix}.log")
+
+
+def test_lines_written_by_type(tmp_path):
+    writer = LogWriter(str(tmp_path))
+    writer.write('receive', '01 02', T0)
+    writer.write('status', '已连接', T0 + 0.25)
+    writer.write('unknown', 'ignored')
+    writer.write('receive', '03 04', T0 + 0.5)
+    assert writer.flush()
+    writer.close()
+    stamp = datetime.fromtimestamp(T0).strftime('%Y-%m-%d %H:%M:%S')
+    with open(log_path(tmp_path, 'receive'), encoding='utf-8') as f:
+        assert f.read().splitlines() == [f"[{stamp}.000] 01 02", f"[{stamp}.500] 03 04"]
+    with open(log_path(tmp_path, 'status'), encoding='utf-8') as f:
+        assert f.read() == f"[{stamp}.250] 已连接\n"
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(log_path(tmp_path, t))
+                                                  for t in ('receive', 'status'))
+    assert (writer.lines_written, writer.dropped) == (3, 0)
+
+
+def test_rotate_by_size_and_continue_last_file(tmp_path):
+    line_size = len(f"[2026-01-01 00:00:00.000] {'x' * 73}\n")  # 100 字节
+    writer = LogWriter(str(tmp_path), max_bytes=250)
+    for _ in range(5):
+        writer.write('parse', 'x' * 73, T0)
+        writer.flush()  # 每行单独写盘，逐行判断是否超过 max_bytes
+    writer.close()
+    sizes = [os.path.getsize(log_path(tmp_path, 'parse', suffix)) for suffix in ('', '_1', '_2')]
+    assert sizes == [2 * line_size, 2 * line_size, line_size]
+
+    # 重新打开时接着当天最后一个文件写
+    writer = LogWriter(str(tmp_path), max_bytes=250)
+    writer.write('parse', 'x' * 73, T0)
+    writer.flush()
+    writer.close()
+    assert os.path.getsize(log_path(tmp_path, 'parse', '_2')) == 2 * line_size
+    assert not os.path.exists(log_path(tmp_path, 'parse', '_3'))
+
+
+def test_table_header_written_once(tmp_path):
+    headers = ['PacketIndex', 'Timestamp', 'CH1T1']
+    for rows in ([[1, T0, 0.5], [2, T0 + 1, '超出上限']], [[3, T0 + 2, 1.25]]):
+        writer = TableWriter(str(tmp_path), 'vodata', headers, time_column=1)
+        writer.write_rows(rows)
+        writer.close()
+    with open(writer.path, newline='', encoding='utf-8') as f:
+        table = list(csv.reader(f))
+    assert os.path.basename(writer.path) == f"{datetime.now():%Y%m%d}_vodata.csv"
+    stamp = datetime.fromtimestamp(T0 + 2).strftime('%Y-%m-%d %H:%M:%S')
+    assert table[0] == headers
+    assert [row[0] for row in table[1:]] == ['1', '2', '3']
+    assert table[2][2] == '超出上限' and table[3][1:] == [stamp, '1.25']
+    assert writer.rows_written == 1
+
+
+def test_table_without_headers(tmp_path):
+    writer = TableWriter(str(tmp_path), 'dndata')
+    writer.write(['a', 1])
+    assert writer.flush()
+    writer.write(['b', 2])
+    writer.close()
+    with open(writer.path, newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f)) == [['a', '1'], ['b', '2']]
+    assert writer.rows_written == 2
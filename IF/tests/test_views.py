@@ -0,0 +1,142 @@
+"""解析区/数据显示区（BoundedTreeView）只保留最近的行组，旧行交给 on_evict；接收区（BoundedTextView）合并插入、只保留最近的行"""
+import importlib
+
+import pytest
+
+
+class FakeRoot:
+    """记录 after() 回调，由测试调用 tick() 执行一次界面刷新"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, func):
+        self.callbacks.append(func)
+
+    def tick(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for func in callbacks:
+            func()
+
+
+class FakeTree:
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 0
+        self.seen = None
+
+    def insert(self, parent, index, values):
+        self.next_id += 1
+        item = f"I{self.next_id}"
+        self.rows[item] = values
+        return item
+
+    def delete(self, *items):
+        for item in items:
+            del self.rows[item]
+
+    def get_children(self):
+        return tuple(self.rows)
+
+    def see(self, item):
+        self.seen = item
+
+
+class FakeText:
+    """只支持 BoundedTextView 用到的 Text 方法"""
+
+    def __init__(self):
+        self.content = ''
+        self.inserts = 0
+
+    def config(self, **options):
+        pass
+
+    def index(self, position):
+        assert position == 'end-1c'
+        return f"{self.content.count(chr(10)) + 1}.0"
+
+    def insert(self, position, text):
+        self.content += text
+        self.inserts += 1
+
+    def delete(self, start, end):
+        if end == 'end':
+            self.content = ''
+        else:
+            line = int(str(end).split('.')[0])
+            self.content = ''.join(self.content.splitlines(keepends=True)[line - 1:])
+
+    def see(self, position):
+        pass
+
+
+@pytest.fixture
+def ifrad(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 导入时创建的 rs485_tool.log 写到临时目录
+    return importlib.import_module('ifrad')
+
+
+def test_tree_view_keeps_latest_groups(ifrad):
+    root, tree, evicted = FakeRoot(), FakeTree(), []
+    view = ifrad.BoundedTreeView(root, tree, max_groups=3, on_evict=evicted.extend)
+    for n in range(5):
+        view.add([(n, 'a'), (n, 'b')])
+    assert not tree.rows  # 只在刷新时插入
+    root.tick()
+    # 待显示队列同样有界：超过 max_groups 的最早的组直接交给 on_evict
+    assert [row[0] for row in tree.rows.values()] == [2, 2, 3, 3, 4, 4]
+    assert evicted == [[(0, 'a'), (0, 'b')], [(1, 'a'), (1, 'b')]]
+    assert tree.seen == list(tree.rows)[-1]
+
+    view.add([(5, 'a')])
+    root.tick()
+    assert [row[0] for row in tree.rows.values()] == [3, 3, 4, 4, 5]
+    assert evicted[-1] == [(2, 'a'), (2, 'b')]
+
+
+def test_tree_view_clear_and_no_scroll(ifrad):
+    root, tree = FakeRoot(), FakeTree()
+    view = ifrad.BoundedTreeView(root, tree, max_groups=10, auto_scroll=lambda: False)
+    view.add([(1,)])
+    root.tick()
+    view.add([(2,)])
+    view.clear()
+    view.add([(3,)])
+    root.tick()
+    assert list(tree.rows.values()) == [(3,)]
+    assert tree.seen is None
+    assert len(root.callbacks) == 1  # 每次刷新后重新登记
+
+
+def test_text_view_coalesces_and_trims(ifrad):
+    root, text = FakeRoot(), FakeText()
+    view = ifrad.BoundedTextView(root, text, max_lines=5)
+    for n in range(3):
+        view.add(f"line {n}\n")
+    root.tick()
+    assert text.content == "line 0\nline 1\nline 2\n" and text.inserts == 1
+    for n in range(3, 8):
+        view.add(f"line {n}\n")
+    root.tick()
+    # 待显示内容超过 max_lines 时先丢弃最早的，控件也被清空重写；控件最多 max_lines 行（含末尾空行）
+    lines = text.content.splitlines()
+    assert lines == [f"line {n}" for n in range(8 - len(lines), 8)]
+    assert text.index('end-1c') == '5.0'
+
+
+def test_text_view_pause_and_replace(ifrad):
+    root, text = FakeRoot(), FakeText()
+    view = ifrad.BoundedTextView(root, text, max_lines=100)
+    view.add("old\n")
+    root.tick()
+    view.paused = True
+    view.add("kept while paused\n")
+    root.tick()
+    assert text.content == "old\n"
+    view.paused = False
+    root.tick()
+    assert text.content == "old\nkept while paused\n"
+    view.add("new\n", replace=True)
+    root.tick()
+    assert text.content == "new\n"